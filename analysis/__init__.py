@@ -0,0 +1,3 @@
+"""
+Analysis toolkit for the enhanced German art schools dataset
+"""
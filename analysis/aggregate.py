@@ -0,0 +1,202 @@
+"""
+Single-pass multi-metric aggregation over the dataset
+
+Every metric is a reducer that declares which part of the JSON file it reads
+(`source`), consumes entries one at a time and keeps only what it reports: a
+bounded top-k heap for rankings, interned edge columns for the collaboration
+network. aggregate() streams the file once and feeds each entry to the
+reducers of its section, then collects their results in an AggregateResult
+that prints as text or serializes for an API.
+"""
+
+import heapq
+import json
+from array import array
+
+from analysis.catalog import DATA_PATH, _Interner
+from analysis.collaboration import CollaborationGraph
+from analysis.instrument import span, traced
+from analysis.stream import iter_paths
+
+UNIVERSITIES = ('universities',)
+COLLABORATIONS = ('relationships', 'academic_collaborations')
+PROGRAM_OVERLAP = ('similarity_matrix', 'program_overlap')
+
+
+class TopK:
+    """Bounded heap of the k best records by `key`
+
+    `extract(name, uni)` turns a university into a record dict, or None to
+    skip it. Ties keep the earlier record, matching a stable sort.
+    """
+
+    source = UNIVERSITIES
+
+    def __init__(self, name, extract, key='score', k=5, largest=True):
+        self.name = name
+        self.extract = extract
+        self.key = key
+        self.k = k
+        self.largest = largest
+        self.heap = []
+        self.seen = 0
+
+    def add(self, entry):
+        record = self.extract(*entry)
+        if record is None:
+            return
+        self.seen += 1
+        value = record[self.key]
+        # The heap root is always the worst kept record: lowest (or highest) value, latest arrival
+        item = (value if self.largest else -value, -self.seen, record)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, item)
+
+    def result(self):
+        return [record for _, _, record in sorted(self.heap, key=lambda item: item[:2], reverse=True)]
+
+
+class CollaborationDegree:
+    """Collaboration network rankings: most collaborations and highest PageRank
+
+    Entries are interned as they stream in; result() builds one
+    CollaborationGraph and ranks institutions with array operations.
+    """
+
+    source = COLLABORATIONS
+
+    def __init__(self, name='collaboration_degree', k=5):
+        self.name = name
+        self.k = k
+        self.interner = _Interner()
+        self.left = array('i')
+        self.right = array('i')
+        self.strength = array('d')
+
+    def add(self, entry):
+        inst1, inst2, strength = entry
+        self.left.append(self.interner(inst1))
+        self.right.append(self.interner(inst2))
+        self.strength.append(strength)
+
+    def result(self):
+        graph = CollaborationGraph(self.interner.values, self.left, self.right, self.strength)
+        return {
+            'partnerships': graph.partnerships,
+            'top': [{'name': name, 'count': count} for name, count in graph.top(graph.appearances, self.k)],
+            'central': [{'name': name, 'pagerank': score} for name, score in graph.top(graph.pagerank(), self.k)],
+        }
+
+
+class Clusters:
+    """Named program-overlap clusters, as listed in the dataset"""
+
+    source = PROGRAM_OVERLAP
+
+    def __init__(self, name='clusters'):
+        self.name = name
+        self.clusters = {}
+
+    def add(self, entry):
+        cluster_name, institutions = entry
+        self.clusters[cluster_name] = institutions
+
+    def result(self):
+        return self.clusters
+
+
+class AggregateResult:
+    """Results of one aggregation pass, keyed by reducer name"""
+
+    def __init__(self, metrics, universities):
+        self.metrics = metrics
+        self.universities = universities
+
+    def __getitem__(self, name):
+        return self.metrics[name]
+
+    def __contains__(self, name):
+        return name in self.metrics
+
+    def to_dict(self):
+        return {'universities': self.universities, 'metrics': self.metrics}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), ensure_ascii=False, **kwargs)
+
+
+def _employment(name, uni):
+    if 'employment_outcomes' in uni:
+        return {'name': name, 'rate': uni['employment_outcomes']['employment_rate_1_year']}
+
+
+def _living_cost(name, uni):
+    if 'financial_data' in uni:
+        return {'city': uni.get('city', 'Unknown'), 'cost': uni['financial_data']['living_costs_city']}
+
+
+def _international(name, uni):
+    if 'international_profile' in uni:
+        return {'name': name, 'percentage': uni['international_profile']['international_students_percentage']}
+
+
+def _sustainability(name, uni):
+    if 'sustainability' in uni:
+        renewable = uni['sustainability']['renewable_energy_percentage']
+        carbon_target = uni['sustainability']['carbon_neutral_target']
+        # Composite sustainability score
+        score = renewable * 0.6 + (2040 - carbon_target) / 20 * 0.4
+        return {'name': name, 'score': score, 'carbon_target': carbon_target}
+
+
+def _research(name, uni):
+    if 'research_innovation' in uni:
+        projects = uni['research_innovation']['research_projects_active']
+        funding = uni['research_innovation']['research_funding_millions']
+        # Composite research score
+        score = projects * 0.3 + funding * 0.7
+        return {'name': name, 'score': score, 'projects': projects, 'funding': funding}
+
+
+def _digital(name, uni):
+    if 'digital_infrastructure' in uni:
+        labs = uni['digital_infrastructure']['digital_fabrication_labs']
+        vr_ar = uni['digital_infrastructure']['vr_ar_facilities']
+        budget = uni['digital_infrastructure']['tech_equipment_budget_per_student']
+        # Composite digital score
+        score = labs * 10 + vr_ar * 5 + budget * 0.01
+        return {'name': name, 'score': score, 'labs': labs, 'vr_ar': vr_ar, 'budget': budget}
+
+
+def enhanced_reducers(k=5):
+    """The reducers behind the enhanced-dataset feature report"""
+    return [
+        TopK('employment', _employment, key='rate', k=k),
+        TopK('living_cost', _living_cost, key='cost', k=k, largest=False),
+        TopK('international', _international, key='percentage', k=k),
+        TopK('sustainability', _sustainability, k=k),
+        TopK('research', _research, k=k),
+        TopK('digital', _digital, k=k),
+        CollaborationDegree(k=k),
+        Clusters(),
+    ]
+
+
+def aggregate(path=DATA_PATH, reducers=None):
+    """Run every reducer over one streaming pass of the dataset file"""
+    reducers = enhanced_reducers() if reducers is None else reducers
+    by_source = {}
+    for reducer in reducers:
+        by_source.setdefault(tuple(reducer.source), []).append(reducer)
+
+    universities = 0
+    with span('aggregate.stream', path=path):
+        for source, entry in iter_paths(path, *by_source):
+            if source == UNIVERSITIES:
+                universities += 1
+            for reducer in by_source[source]:
+                reducer.add(entry)
+    with span('aggregate.results'):
+        return AggregateResult({reducer.name: reducer.result() for reducer in reducers}, universities)
@@ -0,0 +1,356 @@
+"""
+Compact columnar store for the enhanced German art schools dataset
+
+Instead of walking `uni.get('stats', {}).get('students')` chains over nested
+dicts, every numeric field becomes a float64 NumPy column with a boolean
+`present` mask, categoricals (type, state, city, ...) become int32 codes into
+an interned category list, and programs live in their own columnar table
+linked to schools through CSR offsets. SchoolRow is a `__slots__` view for
+code that still wants per-school attribute access.
+"""
+
+import json
+
+import numpy as np
+
+from analysis.instrument import span, traced
+
+DATA_PATH = 'src/data/enhanced_german_art_schools.json'
+
+# Column name -> path inside a university record
+NUMERIC_FIELDS = {
+    'ranking': ('ranking', 'national'),
+    'students': ('stats', 'students'),
+    'acceptance_rate': ('stats', 'acceptance_rate'),
+    'student_staff_ratio': ('stats', 'student_staff_ratio'),
+    'founded': ('stats', 'founded'),
+    'lat': ('coordinates', 'lat'),
+    'lng': ('coordinates', 'lng'),
+    'employment_rate_1_year': ('employment_outcomes', 'employment_rate_1_year'),
+    'living_costs_city': ('financial_data', 'living_costs_city'),
+    'international_students_percentage': ('international_profile', 'international_students_percentage'),
+    'renewable_energy_percentage': ('sustainability', 'renewable_energy_percentage'),
+    'carbon_neutral_target': ('sustainability', 'carbon_neutral_target'),
+    'research_projects_active': ('research_innovation', 'research_projects_active'),
+    'research_funding_millions': ('research_innovation', 'research_funding_millions'),
+    'digital_fabrication_labs': ('digital_infrastructure', 'digital_fabrication_labs'),
+    'vr_ar_facilities': ('digital_infrastructure', 'vr_ar_facilities'),
+    'tech_equipment_budget_per_student': ('digital_infrastructure', 'tech_equipment_budget_per_student'),
+}
+
+CATEGORICAL_FIELDS = ('type', 'state', 'city')
+
+# Top-level sections whose presence (non-empty) is tracked per school
+SECTIONS = (
+    'ranking', 'stats', 'coordinates', 'programs', 'employment_outcomes', 'financial_data',
+    'international_profile', 'sustainability', 'research_innovation', 'digital_infrastructure',
+)
+
+
+def _lookup(record, path):
+    for key in path:
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+class _Interner:
+    """Map strings to dense int codes in first-seen order"""
+
+    def __init__(self):
+        self.codes = {}
+
+    def __call__(self, value):
+        return self.codes.setdefault(value, len(self.codes))
+
+    @property
+    def values(self):
+        return list(self.codes)
+
+
+class Catalog:
+    """Columnar, NumPy-backed view of the `universities` mapping"""
+
+    def __init__(self, names, ids, numeric, present, integer_fields, codes, categories, nc_frei, layouts,
+                 layout_codes, sections, programs, collaborations, extras):
+        self.names = names
+        self.ids = ids
+        self.index = {name: i for i, name in enumerate(names)}
+        self.numeric = numeric          # field -> float64 array (NaN where missing)
+        self.present = present          # field -> bool mask
+        self.integer_fields = integer_fields  # fields that only held JSON integers
+        self.codes = codes              # categorical field -> int32 codes (-1 where missing)
+        self.categories = categories    # categorical field -> list of values
+        self.nc_frei = nc_frei          # int8: -1 missing, 0 false, 1 true
+        self.layouts = layouts          # distinct tuples of top-level keys
+        self.layout_codes = layout_codes
+        self.sections = sections        # section -> bool mask (present and non-empty)
+        self.programs = programs        # ProgramTable
+        self.collaborations = collaborations  # (inst1 codes, inst2 codes, strength, institution names)
+        self.extras = extras            # small top-level objects kept as-is (statistics, similarity_matrix)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    @traced('load.encode')
+    def from_data(cls, data):
+        """Build from the parsed top-level JSON object"""
+        universities = data.get('universities', {})
+        n = len(universities)
+        names = list(universities)
+        ids = []
+        numeric = {field: np.full(n, np.nan) for field in NUMERIC_FIELDS}
+        integer_fields = set(NUMERIC_FIELDS)
+        interners = {field: _Interner() for field in CATEGORICAL_FIELDS}
+        codes = {field: np.full(n, -1, dtype=np.int32) for field in CATEGORICAL_FIELDS}
+        nc_frei = np.full(n, -1, dtype=np.int8)
+        layouts = _Interner()
+        layout_codes = np.empty(n, dtype=np.int32)
+        sections = {section: np.zeros(n, dtype=bool) for section in SECTIONS}
+        programs = ProgramTable.builder()
+
+        for i, uni in enumerate(universities.values()):
+            ids.append(uni.get('id'))
+            for field, path in NUMERIC_FIELDS.items():
+                value = _lookup(uni, path)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    numeric[field][i] = value
+                    if isinstance(value, float):
+                        integer_fields.discard(field)
+            for field in CATEGORICAL_FIELDS:
+                value = uni.get(field)
+                if value is not None:
+                    codes[field][i] = interners[field](value)
+            if isinstance(uni.get('ncFrei'), bool):
+                nc_frei[i] = uni['ncFrei']
+            layout_codes[i] = layouts(tuple(uni))
+            for section in SECTIONS:
+                sections[section][i] = bool(uni.get(section))
+            programs.add_school(uni.get('programs', []))
+
+        collab = _Interner()
+        left, right, strength = [], [], []
+        for inst1, inst2, weight in data.get('relationships', {}).get('academic_collaborations', []):
+            left.append(collab(inst1))
+            right.append(collab(inst2))
+            strength.append(weight)
+        collaborations = (np.asarray(left, dtype=np.int32), np.asarray(right, dtype=np.int32),
+                          np.asarray(strength, dtype=np.float64), collab.values)
+
+        extras = {key: value for key, value in data.items() if key not in ('universities', 'relationships')}
+        present = {field: ~np.isnan(values) for field, values in numeric.items()}
+        return cls(names, ids, numeric, present, integer_fields, codes, {f: interners[f].values for f in CATEGORICAL_FIELDS},
+                   nc_frei, layouts.values, layout_codes, sections, programs.build(), collaborations, extras)
+
+    @classmethod
+    def from_universities(cls, universities):
+        """Build from a bare `universities` mapping"""
+        return cls.from_data({'universities': universities})
+
+    def rows(self, names):
+        """Map university names to row indices"""
+        return np.asarray([self.index[name] for name in names], dtype=np.int64)
+
+    def column(self, field):
+        """(values, present mask) of a numeric field"""
+        return self.numeric[field], self.present[field]
+
+    def category(self, field, row):
+        """Categorical value of one school, or None"""
+        code = self.codes[field][row]
+        return self.categories[field][code] if code >= 0 else None
+
+    def row(self, row):
+        """SchoolRow view by index or name"""
+        return SchoolRow(self, self.index[row] if isinstance(row, str) else row)
+
+    def __iter__(self):
+        return (SchoolRow(self, i) for i in range(len(self)))
+
+    def nbytes(self):
+        """Approximate memory held by the columns and interned strings"""
+        total = sum(a.nbytes for a in self.numeric.values()) + sum(a.nbytes for a in self.present.values())
+        total += sum(a.nbytes for a in self.codes.values()) + sum(a.nbytes for a in self.sections.values())
+        total += self.nc_frei.nbytes + self.layout_codes.nbytes + self.programs.nbytes()
+        total += sum(a.nbytes for a in self.collaborations[:3])
+        strings = self.names + [i for i in self.ids if i] + self.collaborations[3]
+        strings += [v for values in self.categories.values() for v in values]
+        return total + sum(len(s.encode('utf-8')) for s in strings)
+
+
+class ProgramTable:
+    """Programs of all schools in one columnar table
+
+    School i owns programs `offsets[i]:offsets[i + 1]`; program j owns
+    specializations `spec_offsets[j]:spec_offsets[j + 1]` (codes into
+    `specializations`). String fields are interned except free-text descriptions.
+    """
+
+    FIELDS = ('name', 'degree', 'language', 'duration')
+
+    def __init__(self, offsets, codes, categories, spec_offsets, spec_codes, specializations,
+                 descriptions, deadlines, deadline_dates):
+        self.offsets = offsets
+        self.codes = codes                  # field -> int32 codes
+        self.categories = categories        # field -> list of values
+        self.spec_offsets = spec_offsets
+        self.spec_codes = spec_codes
+        self.specializations = specializations
+        self.descriptions = descriptions
+        self.deadlines = deadlines          # term -> (start codes, end codes), -1 where missing
+        self.deadline_dates = deadline_dates  # interned date strings
+
+    def __len__(self):
+        return len(self.offsets) - 1 if len(self.offsets) else 0
+
+    @property
+    def school(self):
+        """School row of every program"""
+        return np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets))
+
+    def of_school(self, row):
+        return range(self.offsets[row], self.offsets[row + 1])
+
+    def specializations_of(self, program):
+        return [self.specializations[c] for c in self.spec_codes[self.spec_offsets[program]:self.spec_offsets[program + 1]]]
+
+    def school_token_sets(self, field):
+        """Per-school CSR (indptr, sorted unique codes) of program names or specializations"""
+        if field == 'specializations':
+            owner = np.repeat(self.school, np.diff(self.spec_offsets))
+            codes, vocabulary = self.spec_codes, self.specializations
+        else:
+            owner, codes, vocabulary = self.school, self.codes[field], self.categories[field]
+        n = len(self.offsets) - 1
+        width = max(len(vocabulary), 1)
+        pairs = np.unique(owner.astype(np.int64) * width + codes)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(pairs // width, minlength=n))
+        return indptr, (pairs % width).astype(np.int32), vocabulary
+
+    def nbytes(self):
+        total = self.offsets.nbytes + self.spec_offsets.nbytes + self.spec_codes.nbytes
+        total += sum(a.nbytes for a in self.codes.values())
+        total += sum(a.nbytes + b.nbytes for a, b in self.deadlines.values())
+        strings = self.specializations + self.deadline_dates + self.descriptions
+        strings += [v for values in self.categories.values() for v in values]
+        return total + sum(len(s.encode('utf-8')) for s in strings if s)
+
+    @classmethod
+    def builder(cls):
+        return _ProgramTableBuilder()
+
+
+class _ProgramTableBuilder:
+    def __init__(self):
+        self.offsets = [0]
+        self.interners = {field: _Interner() for field in ProgramTable.FIELDS}
+        self.codes = {field: [] for field in ProgramTable.FIELDS}
+        self.spec_offsets = [0]
+        self.spec_codes = []
+        self.specializations = _Interner()
+        self.descriptions = []
+        self.dates = _Interner()
+        self.deadlines = {}
+
+    def add_school(self, programs):
+        for program in programs:
+            count = len(self.descriptions)
+            for field in ProgramTable.FIELDS:
+                # Missing names intern as '' like `p.get('name', '')` in the original scripts
+                self.codes[field].append(self.interners[field](program.get(field, '' if field == 'name' else None)))
+            specs = program.get('specializations', [])
+            self.spec_codes.extend(self.specializations(s) for s in specs)
+            self.spec_offsets.append(len(self.spec_codes))
+            self.descriptions.append(program.get('description'))
+            for term, window in (program.get('applicationDeadlines') or {}).items():
+                if term not in self.deadlines:
+                    self.deadlines[term] = ([-1] * count, [-1] * count)
+                starts, ends = self.deadlines[term]
+                starts.append(self.dates(window.get('start')))
+                ends.append(self.dates(window.get('end')))
+            for starts, ends in self.deadlines.values():
+                if len(starts) == count:
+                    starts.append(-1)
+                    ends.append(-1)
+        self.offsets.append(len(self.descriptions))
+
+    def build(self):
+        categories = {field: interner.values for field, interner in self.interners.items()}
+        codes = {field: np.asarray(values, dtype=np.int32) for field, values in self.codes.items()}
+        deadlines = {term: (np.asarray(s, dtype=np.int32), np.asarray(e, dtype=np.int32))
+                     for term, (s, e) in self.deadlines.items()}
+        return ProgramTable(np.asarray(self.offsets, dtype=np.int64), codes, categories,
+                            np.asarray(self.spec_offsets, dtype=np.int64), np.asarray(self.spec_codes, dtype=np.int32),
+                            self.specializations.values, self.descriptions, deadlines, self.dates.values)
+
+
+class SchoolRow:
+    """Read-only per-school view over a Catalog (attribute access, None when missing)"""
+
+    __slots__ = ('catalog', 'row')
+
+    def __init__(self, catalog, row):
+        self.catalog = catalog
+        self.row = row
+
+    @property
+    def name(self):
+        return self.catalog.names[self.row]
+
+    @property
+    def id(self):
+        return self.catalog.ids[self.row]
+
+    @property
+    def nc_frei(self):
+        value = self.catalog.nc_frei[self.row]
+        return None if value < 0 else bool(value)
+
+    @property
+    def program_count(self):
+        offsets = self.catalog.programs.offsets
+        return int(offsets[self.row + 1] - offsets[self.row])
+
+    def specializations(self):
+        """Union of the specializations of all programs, in first-seen order"""
+        table = self.catalog.programs
+        seen = {}
+        for program in table.of_school(self.row):
+            for spec in table.specializations_of(program):
+                seen.setdefault(spec)
+        return list(seen)
+
+    def keys(self):
+        """Top-level keys of the original record"""
+        return self.catalog.layouts[self.catalog.layout_codes[self.row]]
+
+    def __getattr__(self, field):
+        catalog = self.catalog
+        if field in catalog.numeric:
+            if not catalog.present[field][self.row]:
+                return None
+            value = catalog.numeric[field][self.row].item()
+            return int(value) if field in catalog.integer_fields else value
+        if field in catalog.codes:
+            return catalog.category(field, self.row)
+        raise AttributeError(field)
+
+    def __repr__(self):
+        return f"SchoolRow({self.name!r})"
+
+
+def load_catalog(path=DATA_PATH, cache=True):
+    """Load the enhanced dataset as a Catalog
+
+    With `cache` the arrays come from a memory-mapped binary snapshot that is
+    rebuilt only when the JSON file changes (see analysis.snapshot).
+    """
+    if cache:
+        from analysis.snapshot import cached_catalog
+        return cached_catalog(path)
+    with open(path, 'r', encoding='utf-8') as f, span('load.parse', path=path):
+        data = json.load(f)
+    return Catalog.from_data(data)
@@ -0,0 +1,200 @@
+"""
+Community detection on the sparse similarity graph
+
+The dense thresholded graph links nearly every pair of same-type schools, so
+clustering runs on the symmetrized top-k neighbour graph instead: each school
+keeps its `k` best neighbours that pass the profile threshold, weighted by
+score. louvain() finds communities on that graph with the Louvain method
+(local moving plus aggregation, repeated until nothing moves), and
+stable_labels() numbers them deterministically, reusing earlier IDs by
+overlap so a cluster keeps its ID when the catalog changes a little.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from analysis.graph import symmetric_csr
+from analysis.instrument import traced
+from analysis.lsh import approximate_index
+from analysis.neighbors import NeighborIndex
+from analysis.similarity import get_profile
+
+# Neighbours per school in the clustering graph
+CLUSTER_K = 10
+
+
+def knn_edges(neighbors, scores, profile, k=None):
+    """Undirected (lo, hi, weight) edges of the top-k lists that pass the profile threshold"""
+    profile = get_profile(profile)
+    neighbors, scores = neighbors[:, :k], scores[:, :k]
+    rows = np.repeat(np.arange(len(neighbors)), neighbors.shape[1])
+    cols, weights = neighbors.ravel(), scores.ravel()
+    keep = (cols >= 0) & profile.passes(weights)
+    rows, cols, weights = rows[keep], cols[keep].astype(np.int64), weights[keep]
+    lo, hi = np.minimum(rows, cols), np.maximum(rows, cols)
+    # A pair listed by both schools appears twice with the same score
+    _, first = np.unique(lo * len(neighbors) + hi, return_index=True)
+    return lo[first], hi[first], weights[first]
+
+
+def _local_moving(indptr, indices, weights, resolution):
+    """One Louvain level: move nodes between communities while modularity improves"""
+    n = len(indptr) - 1
+    bounds, indices, weights = indptr.tolist(), indices.tolist(), weights.tolist()
+    adjacency = [(indices[bounds[i]:bounds[i + 1]], weights[bounds[i]:bounds[i + 1]]) for i in range(n)]
+    strength = [sum(w) for _, w in adjacency]
+    m2 = sum(strength)
+    community = list(range(n))
+    total = list(strength)
+    queued = [True] * n
+    queue = deque(range(n))
+    moved = False
+    while queue:
+        i = queue.popleft()
+        queued[i] = False
+        ci, ki = community[i], strength[i]
+        neighbors, neighbor_weights = adjacency[i]
+        links = {}
+        for j, w in zip(neighbors, neighbor_weights):
+            if j != i:
+                c = community[j]
+                links[c] = links.get(c, 0.0) + w
+        total[ci] -= ki
+        scale = resolution * ki / m2
+        best, best_gain = ci, links.get(ci, 0.0) - total[ci] * scale
+        for c, w in links.items():
+            gain = w - total[c] * scale
+            if gain > best_gain + 1e-12 or (gain > best_gain - 1e-12 and c < best and best != ci):
+                best, best_gain = c, gain
+        total[best] += ki
+        if best != ci:
+            community[i] = best
+            moved = True
+            for j in neighbors:
+                if not queued[j] and community[j] != best:
+                    queued[j] = True
+                    queue.append(j)
+    return np.asarray(community), moved
+
+
+def _aggregate(indptr, indices, weights, labels, count):
+    """Collapse communities into nodes; internal weight becomes a self-loop"""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    keys = labels[rows].astype(np.int64) * count + labels[indices]
+    unique, inverse = np.unique(keys, return_inverse=True)
+    merged = np.bincount(inverse, weights=weights)
+    new_indptr = np.zeros(count + 1, dtype=np.int64)
+    new_indptr[1:] = np.cumsum(np.bincount(unique // count, minlength=count))
+    return new_indptr, (unique % count).astype(np.int64), merged
+
+
+@traced('clustering.louvain')
+def louvain(indptr, indices, weights, resolution=1.0, max_levels=20):
+    """Community label of every node of a symmetric weighted CSR graph
+
+    Deterministic for a given graph: nodes are visited in index order and
+    ties go to the current (then lowest-numbered) community.
+    """
+    n = len(indptr) - 1
+    labels = np.arange(n)
+    if n == 0 or len(indices) == 0:
+        return labels
+    for _ in range(max_levels):
+        community, moved = _local_moving(indptr, indices, weights, resolution)
+        if not moved:
+            break
+        _, community = np.unique(community, return_inverse=True)
+        count = int(community.max()) + 1
+        labels = community[labels]
+        indptr, indices, weights = _aggregate(indptr, indices, weights, community, count)
+    return labels
+
+
+def modularity(indptr, indices, weights, labels, resolution=1.0):
+    """Newman modularity of a partition of a symmetric weighted CSR graph"""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    m2 = weights.sum()
+    if m2 == 0:
+        return 0.0
+    internal = weights[labels[rows] == labels[indices]].sum()
+    totals = np.bincount(labels, weights=np.bincount(rows, weights=weights, minlength=len(labels)))
+    return float(internal / m2 - resolution * np.sum((totals / m2) ** 2))
+
+
+def stable_labels(labels, previous=None):
+    """Deterministic cluster IDs
+
+    Without `previous`, clusters are numbered in order of their first member.
+    With `previous` (earlier IDs per node, -1 for new nodes), each cluster
+    takes over the old ID it shares the most members with, greedily by
+    overlap; the rest get fresh IDs above the old ones, in first-member order.
+    """
+    labels = np.asarray(labels)
+    clusters, first = np.unique(labels, return_index=True)
+    order = clusters[np.argsort(first, kind='stable')]
+    ids = {}
+    next_id = 0
+    if previous is not None:
+        previous = np.asarray(previous)
+        known = previous >= 0
+        if known.any():
+            next_id = int(previous[known].max()) + 1
+            pairs, counts = np.unique(np.stack((labels[known], previous[known])), axis=1, return_counts=True)
+            taken = set()
+            for c in np.lexsort((pairs[1], pairs[0], -counts)).tolist():
+                label, old = int(pairs[0, c]), int(pairs[1, c])
+                if label not in ids and old not in taken:
+                    ids[label] = old
+                    taken.add(old)
+    for label in order.tolist():
+        if label not in ids:
+            ids[label] = next_id
+            next_id += 1
+    lookup = np.zeros(int(labels.max()) + 1 if len(labels) else 0, dtype=np.int32)
+    for label, cluster_id in ids.items():
+        lookup[label] = cluster_id
+    return lookup[labels]
+
+
+def cluster_knn(neighbors, scores, profile, k=None, resolution=1.0, previous=None):
+    """Stable community IDs from top-k neighbour lists (see knn_edges)"""
+    n = len(neighbors)
+    indptr, indices, weights = symmetric_csr(n, *knn_edges(neighbors, scores, profile, k))
+    return stable_labels(louvain(indptr, indices, weights, resolution), previous)
+
+
+def dominant_tokens(labels, token_index, top=2, min_count=2):
+    """{cluster id: the `top` tokens most over-represented among its members}
+
+    Ranks tokens by how much more common they are inside the cluster than in
+    the whole catalog (share difference); useful as a human-readable label.
+    """
+    labels = np.asarray(labels)
+    n = len(labels)
+    owners = np.repeat(np.arange(n), np.diff(token_index.doc_indptr))
+    overall = np.bincount(token_index.doc_tokens, minlength=len(token_index.tokens)) / max(n, 1)
+    names = {}
+    for cluster in np.unique(labels).tolist():
+        members = labels == cluster
+        counts = np.bincount(token_index.doc_tokens[members[owners]], minlength=len(token_index.tokens))
+        lift = counts / members.sum() - overall
+        candidates = np.flatnonzero(counts >= min_count)
+        best = candidates[np.lexsort((candidates, -lift[candidates]))][:top]
+        names[cluster] = [token_index.tokens[t] for t in best.tolist()]
+    return names
+
+
+def cluster_catalog(engine, profile=None, k=CLUSTER_K, resolution=1.0, approximate=False):
+    """Community ID of every school in the engine's catalog
+
+    The exact neighbour graph scores all N² pairs, which dominates at large
+    N; with `approximate` the graph comes from analysis.lsh.approximate_index,
+    which only scores candidate pairs (and warns when its sampled recall is low).
+    """
+    profile = get_profile(profile) if profile is not None else engine.profile
+    if approximate:
+        index = approximate_index(engine, k_max=k, profile=profile)
+    else:
+        index = NeighborIndex.build(engine, k_max=k, profile=profile)
+    return cluster_knn(index.indices, index.scores, profile, resolution=resolution)
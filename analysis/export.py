@@ -0,0 +1,161 @@
+"""
+Build stage: precomputed similarity graphs for the D3 and 3D network views
+
+The thresholded similarity graph of each scoring profile is computed once
+and written as symmetric CSR arrays in one little-endian binary file, plus a
+small JSON manifest with the school ids/names and where each array lives in
+the binary. A view fetches both and wraps the arrays with typed-array views
+(`new Int32Array(buffer, offset, length)`), so nothing O(N²) runs in the
+browser. Edge weights are quantized to uint16; weight = value * scale. Each
+graph also carries an int32 community ID per school (analysis.clustering),
+stable across re-exports, and precomputed float32 x/y/z positions per school
+(analysis.layout, interleaved, N x 3) so the 3D view can render the settled
+layout immediately instead of running its force simulation.
+
+    python -m analysis.export --out public/data
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH, load_catalog
+from analysis.clustering import CLUSTER_K, cluster_knn
+from analysis.graph import symmetric_csr
+from analysis.instrument import span
+from analysis.layout import compute_layout
+from analysis.neighbors import NeighborIndex
+from analysis.similarity import SimilarityEngine, get_profile
+
+GRAPH_FORMAT_VERSION = 1
+DEFAULT_PROFILES = ('d3', '3d-clustering')
+OUT_DIR = 'public/data'
+BASENAME = 'similarity_graph'
+
+
+def quantize(weights, levels=65535):
+    """uint16 codes and the scale that maps them back to scores"""
+    top = float(weights.max()) if len(weights) else 0.0
+    scale = top / levels if top > 0 else 1.0
+    return np.round(weights / scale).astype(np.uint16), scale
+
+
+def graph_edges(engine, profile, workers=1):
+    """Thresholded upper-triangle edges, serially or across a process pool"""
+    if workers == 1:
+        return engine.edges(profile=profile)
+    from analysis.parallel import parallel_edges
+    return parallel_edges(engine, profile=profile, workers=workers)
+
+
+def export_graphs(catalog, out_dir=OUT_DIR, profiles=DEFAULT_PROFILES, workers=1, basename=BASENAME):
+    """Write <basename>.bin and <basename>.json; returns the manifest"""
+    profiles = [get_profile(p) for p in profiles]
+    engine = SimilarityEngine(catalog, profiles)
+    n = len(catalog)
+
+    chunks = []
+    offset = 0
+
+    def add(array):
+        # Typed-array views need offsets aligned to the element size
+        nonlocal offset
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+        pad = -offset % 4
+        chunks.append(b'\0' * pad)
+        offset += pad
+        entry = {'offset': offset, 'length': len(array), 'dtype': array.dtype.name}
+        chunks.append(array.tobytes())
+        offset += array.nbytes
+        return entry
+
+    graphs = {}
+    for profile in profiles:
+        with span('export.edges', profile=profile.name):
+            indptr, indices, weights = symmetric_csr(n, *graph_edges(engine, profile, workers))
+        codes, scale = quantize(weights)
+        with span('export.neighbors', profile=profile.name):
+            index = NeighborIndex.build(engine, k_max=CLUSTER_K, profile=profile)
+        with span('export.clusters', profile=profile.name):
+            clusters = cluster_knn(index.indices, index.scores, profile).astype(np.int32)
+        with span('export.layout', profile=profile.name):
+            positions, stress = compute_layout(index, profile, catalog)
+        graphs[profile.name] = {
+            'threshold': profile.threshold,
+            'inclusive': profile.inclusive,
+            'edges': int(len(indices) // 2),
+            'scale': scale,
+            'indptr': add(indptr),
+            'indices': add(indices),
+            'weights': add(codes),
+            'clusters': add(clusters),
+            'cluster_count': int(clusters.max()) + 1 if n else 0,
+            'positions': add(positions.ravel()),
+            'layout_stress': round(stress, 4),
+        }
+
+    manifest = {
+        'version': GRAPH_FORMAT_VERSION,
+        'binary': f'{basename}.bin',
+        'ids': catalog.ids,
+        'names': catalog.names,
+        'graphs': graphs,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, f'{basename}.bin'), 'wb') as f:
+        f.write(b''.join(chunks))
+    with open(os.path.join(out_dir, f'{basename}.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    return manifest
+
+
+def load_graph(out_dir, profile, basename=BASENAME):
+    """Read one exported graph back as (manifest, indptr, indices, weights, clusters)"""
+    with open(os.path.join(out_dir, f'{basename}.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    graph = manifest['graphs'][profile]
+    with open(os.path.join(out_dir, manifest['binary']), 'rb') as f:
+        data = f.read()
+
+    def array(entry):
+        return np.frombuffer(data, dtype=np.dtype(entry['dtype']).newbyteorder('<'),
+                             count=entry['length'], offset=entry['offset'])
+
+    weights = array(graph['weights']) * graph['scale']
+    return manifest, array(graph['indptr']), array(graph['indices']), weights, array(graph['clusters'])
+
+
+def load_layout(out_dir, profile, basename=BASENAME):
+    """Precomputed layout of one exported graph as (ids, N x 3 float32 positions)"""
+    with open(os.path.join(out_dir, f'{basename}.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    entry = manifest['graphs'][profile]['positions']
+    with open(os.path.join(out_dir, manifest['binary']), 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['length'] * 4)
+    positions = np.frombuffer(data, dtype=np.dtype(entry['dtype']).newbyteorder('<')).reshape(-1, 3)
+    return manifest['ids'], positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export thresholded similarity graphs for the frontend")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--out', default=OUT_DIR)
+    parser.add_argument('--profiles', nargs='+', default=list(DEFAULT_PROFILES))
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    manifest = export_graphs(load_catalog(args.data), args.out, args.profiles, args.workers)
+    size = os.path.getsize(os.path.join(args.out, manifest['binary']))
+    print(f"📦 Exported similarity graphs for {len(manifest['names'])} schools to {args.out}")
+    for name, graph in manifest['graphs'].items():
+        cutoff = '>=' if graph['inclusive'] else '>'
+        print(f"   {name}: {graph['edges']} edges (score {cutoff} {graph['threshold']}), "
+              f"{graph['cluster_count']} clusters, layout stress {graph['layout_stress']}")
+    print(f"   Binary payload: {size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
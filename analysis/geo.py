@@ -0,0 +1,149 @@
+"""
+Geodesic distances and a spatial index for school coordinates
+
+Distances are great-circle (haversine) kilometres rather than Euclidean
+distances over raw lat/lng degrees, which overstate east-west gaps by ~60% at
+German latitudes. GeoIndex is a KD-tree over unit-sphere (x, y, z) points:
+chord length is monotonic in great-circle distance, so radius and
+k-nearest queries prune whole subtrees instead of scanning every school.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km, broadcasting over NumPy arrays (NaN stays NaN)"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def unit_vectors(lat, lng):
+    """Project lat/lng degrees onto the unit sphere as an N x 3 array"""
+    lat, lng = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lng, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def _chord(radius_km):
+    return 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class GeoIndex:
+    """KD-tree over school coordinates; rows without coordinates are left out"""
+
+    def __init__(self, lat, lng, leaf_size=16):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        rows = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lng))
+        points = unit_vectors(self.lat[rows], self.lng[rows])
+
+        order = np.arange(len(rows))
+        # Node table: start, end, left child, right child (-1 for leaves), bounding box
+        self._start, self._end, self._left, self._right, self._box = [], [], [], [], []
+
+        def build(start, end):
+            node = len(self._start)
+            subset = order[start:end]
+            lo, hi = points[subset].min(axis=0), points[subset].max(axis=0)
+            self._start.append(start)
+            self._end.append(end)
+            self._left.append(-1)
+            self._right.append(-1)
+            self._box.append((tuple(lo.tolist()), tuple(hi.tolist())))
+            if end - start > leaf_size:
+                dim = int(np.argmax(hi - lo))
+                mid = (start + end) // 2
+                order[start:end] = subset[np.argpartition(points[subset, dim], mid - start)]
+                self._left[node] = build(start, mid)
+                self._right[node] = build(mid, end)
+            return node
+
+        if len(rows):
+            build(0, len(rows))
+        self.points = points[order]
+        self.rows = rows[order]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _box_distance(self, node, q):
+        lo, hi = self._box[node]
+        total = 0.0
+        for axis in range(3):
+            if q[axis] < lo[axis]:
+                total += (lo[axis] - q[axis]) ** 2
+            elif q[axis] > hi[axis]:
+                total += (q[axis] - hi[axis]) ** 2
+        return math.sqrt(total)
+
+    @staticmethod
+    def _query_point(lat, lng):
+        q = unit_vectors([lat], [lng])[0]
+        return q, tuple(q.tolist())
+
+    def within(self, lat, lng, radius_km):
+        """Schools within `radius_km` of (lat, lng) as (row, km) pairs, nearest first"""
+        if not len(self.rows):
+            return []
+        q, qt = self._query_point(lat, lng)
+        limit = _chord(radius_km)
+        hits = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, qt) > limit:
+                continue
+            if self._left[node] < 0:
+                start, end = self._start[node], self._end[node]
+                chord = np.sqrt(((self.points[start:end] - q) ** 2).sum(axis=1))
+                hits.append(np.arange(start, end)[chord <= limit])
+            else:
+                stack.append(self._left[node])
+                stack.append(self._right[node])
+        slots = np.concatenate(hits) if hits else np.empty(0, dtype=np.int64)
+        rows = self.rows[slots]
+        km = haversine_km(lat, lng, self.lat[rows], self.lng[rows])
+        order = np.lexsort((rows, km))
+        return list(zip(rows[order].tolist(), km[order].tolist()))
+
+    def nearest(self, lat, lng, k=10, mask=None):
+        """The k schools closest to (lat, lng) as (row, km) pairs
+
+        `mask` is an optional boolean array over catalog rows; only rows where it
+        is True are returned. Ties are broken by lower row index.
+        """
+        if not len(self.rows) or k <= 0:
+            return []
+        q, qt = self._query_point(lat, lng)
+        best = []  # max-heap of (-chord, -row) holding the current k nearest
+        frontier = [(0.0, 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if len(best) == k and bound > -best[0][0]:
+                break
+            if self._left[node] < 0:
+                start, end = self._start[node], self._end[node]
+                rows = self.rows[start:end]
+                chord = np.sqrt(((self.points[start:end] - q) ** 2).sum(axis=1))
+                if mask is not None:
+                    keep = mask[rows]
+                    rows, chord = rows[keep], chord[keep]
+                for row, d in zip(rows.tolist(), chord.tolist()):
+                    item = (-d, -row)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+            else:
+                for child in (self._left[node], self._right[node]):
+                    heapq.heappush(frontier, (self._box_distance(child, qt), child))
+        rows = np.asarray([-row for _, row in best], dtype=np.int64)
+        km = haversine_km(lat, lng, self.lat[rows], self.lng[rows])
+        order = np.lexsort((rows, km))
+        return list(zip(rows[order].tolist(), km[order].tolist()))
@@ -0,0 +1,63 @@
+"""
+Sparse graph helpers shared by the similarity and collaboration analyses
+"""
+
+import numpy as np
+
+
+def symmetric_csr(n, lo, hi, weights):
+    """Symmetric CSR (indptr, indices, weights) from an undirected edge list
+
+    Each edge is stored in both directions and every row's columns are sorted.
+    """
+    rows = np.concatenate((lo, hi)).astype(np.int64)
+    cols = np.concatenate((hi, lo)).astype(np.int64)
+    weights = np.concatenate((weights, weights))
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+    return indptr, cols[order].astype(np.int32), weights[order]
+
+
+def bucket_pairs(buckets, members, max_bucket):
+    """Pairs (a, b) of members that share a bucket key
+
+    Each member is paired with at most the next max_bucket - 1 members of its
+    bucket (in the given member order), which keeps huge buckets linear.
+    """
+    order = np.argsort(buckets, kind='stable')
+    buckets, members = buckets[order], members[order]
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)]
+    end_of = np.repeat(ends, ends - starts)
+    position = np.arange(len(buckets))
+    partners = np.minimum(end_of - position - 1, max_bucket - 1)
+    left = np.repeat(position, partners)
+    right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(partners) - partners, partners)
+    return members[left], members[right]
+
+
+def connected_components(n, rows, cols):
+    """Component label of every node, numbered in order of each component's first node
+
+    Vectorized hooking plus pointer jumping: every round hooks the larger
+    root of each edge under the smaller one and then flattens the forest, so
+    it converges in a handful of rounds instead of one pass per edge.
+    """
+    parent = np.arange(n)
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    while True:
+        a, b = parent[rows], parent[cols]
+        differ = a != b
+        if not differ.any():
+            break
+        a, b = a[differ], b[differ]
+        np.minimum.at(parent, np.maximum(a, b), np.minimum(a, b))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    # Roots are the smallest node of their component, so this keeps first-node order
+    return np.unique(parent, return_inverse=True)[1].astype(np.int32)
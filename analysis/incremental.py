@@ -0,0 +1,354 @@
+"""
+Incremental similarity results for a catalog that changes a few schools at a time
+
+AnalysisState persists, per scoring profile, the thresholded similarity
+edges, the top-`k_max` neighbour lists and the community (cluster) IDs,
+together with a fingerprint of every university record keyed by its
+institution `id` (or name when it has none). update() diffs a new dataset
+against that state and only rescores the rows of schools that were added or
+edited; every other row keeps its stored results, patched with the new
+scores against the edited columns. Neighbour lists that lost a member to an
+edit or removal are the only other rows that get rescored. Communities are
+re-detected on the (cheap, sparse) neighbour graph and keep their previous
+IDs wherever they overlap the old ones.
+
+    python -m analysis.incremental            # refresh the stored state
+    python -m analysis.incremental --full     # rebuild it from scratch
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH, Catalog
+from analysis.clustering import CLUSTER_K, cluster_knn
+from analysis.instrument import traced
+from analysis.neighbors import NeighborIndex, select_top_k
+from analysis.similarity import SimilarityEngine, _auto_block_size, _concat_edges, get_profile, threshold_edges
+from analysis.snapshot import snapshot_dir, write_arrays
+
+STATE_VERSION = 2
+STATE_DIR = os.environ.get('ANALYSIS_STATE_DIR', '.cache/state')
+DEFAULT_PROFILES = ('d3', '3d-clustering')
+K_MAX = 32
+# Above this share of edited schools a full rebuild is cheaper than patching
+FULL_REBUILD_FRACTION = 0.25
+
+
+def record_fingerprint(record):
+    """Content hash of one university record, independent of key order"""
+    text = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def school_keys(catalog):
+    """Stable identity of every row: the institution id, falling back to the name"""
+    return [school_id or name for school_id, name in zip(catalog.ids, catalog.names)]
+
+
+class ProfileResults:
+    """Thresholded edges (lo < hi), neighbour lists and cluster labels of one profile"""
+
+    def __init__(self, edges, neighbors, neighbor_scores, clusters):
+        self.edges = edges
+        self.neighbors = neighbors
+        self.neighbor_scores = neighbor_scores
+        self.clusters = clusters
+
+
+class Changes:
+    """What update() found and how much it recomputed"""
+
+    def __init__(self, added, changed, removed, rescored=0, full=False):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.rescored = rescored
+        self.full = full
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self):
+        return (f"Changes(added={len(self.added)}, changed={len(self.changed)}, "
+                f"removed={len(self.removed)}, rescored={self.rescored}, full={self.full})")
+
+
+class AnalysisState:
+    """Persisted similarity results keyed by institution id"""
+
+    def __init__(self, keys, names, fingerprints, profiles, k_max, results):
+        self.keys = keys
+        self.names = names
+        self.fingerprints = fingerprints
+        self.profiles = profiles
+        self.k_max = k_max
+        self.results = results    # profile name -> ProfileResults
+
+    def __len__(self):
+        return len(self.keys)
+
+    def neighbor_index(self, profile):
+        """NeighborIndex over the stored neighbour lists of one profile"""
+        result = self.results[profile]
+        return NeighborIndex(self.names, result.neighbors, result.neighbor_scores, profile=profile)
+
+    def clusters(self, profile):
+        """{cluster id: [school names]} of one profile"""
+        groups = {}
+        for name, label in zip(self.names, self.results[profile].clusters.tolist()):
+            groups.setdefault(label, []).append(name)
+        return groups
+
+    def save(self, directory):
+        arrays = {}
+        for profile, result in self.results.items():
+            arrays[f'{profile}.lo'], arrays[f'{profile}.hi'], arrays[f'{profile}.scores'] = result.edges
+            arrays[f'{profile}.neighbors'] = result.neighbors
+            arrays[f'{profile}.neighbor_scores'] = result.neighbor_scores
+            arrays[f'{profile}.clusters'] = result.clusters
+        meta = {
+            'version': STATE_VERSION,
+            'keys': self.keys,
+            'names': self.names,
+            'fingerprints': self.fingerprints,
+            'profiles': self.profiles,
+            'k_max': self.k_max,
+        }
+        write_arrays(directory, arrays, meta)
+
+    @classmethod
+    def load(cls, directory):
+        """Stored state, or None when there is none or it has an old format"""
+        try:
+            with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except OSError:
+            return None
+        if meta.get('version') != STATE_VERSION:
+            return None
+
+        def array(stem):
+            return np.load(os.path.join(directory, f'{stem}.npy'))
+
+        results = {
+            profile: ProfileResults(
+                (array(f'{profile}.lo'), array(f'{profile}.hi'), array(f'{profile}.scores')),
+                array(f'{profile}.neighbors'), array(f'{profile}.neighbor_scores'), array(f'{profile}.clusters'),
+            )
+            for profile in meta['profiles']
+        }
+        return cls(meta['keys'], meta['names'], meta['fingerprints'], meta['profiles'], meta['k_max'], results)
+
+
+def _merge_edges(n, kept, fresh):
+    """Merge two disjoint edge lists into (lo, hi) order
+
+    The kept edges are usually still sorted (rows keep their relative order
+    unless entries were reordered in the file), so the few fresh edges are
+    inserted by binary search instead of re-sorting the whole list.
+    """
+    def by_key(edges):
+        key = edges[0].astype(np.int64) * n + edges[1]
+        if len(key) > 1 and (np.diff(key) < 0).any():
+            order = np.argsort(key, kind='stable')
+            return key[order], tuple(column[order] for column in edges)
+        return key, edges
+
+    key, kept = by_key(kept)
+    fresh_key, fresh = by_key(fresh)
+    at = np.searchsorted(key, fresh_key)
+    return tuple(np.insert(old, at, new) for old, new in zip(kept, fresh))
+
+
+def _block_scores(engine, rows, profiles, block_size=None):
+    """{profile: len(rows) x N scores} for an arbitrary set of rows, tile by tile"""
+    n = len(engine.catalog)
+    block_size = block_size or _auto_block_size(n)
+    tiles = [engine.score_profiles(rows[start:start + block_size], profiles)
+             for start in range(0, len(rows), block_size)]
+    return {p: np.concatenate([t[p] for t in tiles]) if tiles else np.empty((0, n)) for p in profiles}
+
+
+def _exclude_self(scores, rows):
+    scores[np.arange(len(rows)), rows] = -np.inf
+    return scores
+
+
+@traced('incremental.compute')
+def compute(catalog, fingerprints, profiles=DEFAULT_PROFILES, k_max=K_MAX, block_size=None):
+    """Full rebuild of every profile's results"""
+    profiles = [get_profile(p).name for p in profiles]
+    engine = SimilarityEngine(catalog, profiles)
+    n = len(catalog)
+    k = min(k_max, n)
+    block_size = block_size or _auto_block_size(n)
+    edges = {p: [] for p in profiles}
+    neighbors = {p: np.full((n, k), -1, dtype=np.int32) for p in profiles}
+    neighbor_scores = {p: np.full((n, k), -np.inf, dtype=np.float64) for p in profiles}
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(start + block_size, n))
+        for profile, scores in engine.score_profiles(rows, profiles).items():
+            edges[profile].append(threshold_edges(rows, scores, get_profile(profile)))
+            neighbors[profile][rows], neighbor_scores[profile][rows] = select_top_k(_exclude_self(scores, rows), k)
+
+    results = {}
+    for profile in profiles:
+        lo, hi, scores = _concat_edges(edges[profile])
+        clusters = cluster_knn(neighbors[profile], neighbor_scores[profile], profile, CLUSTER_K)
+        results[profile] = ProfileResults((lo, hi, scores), neighbors[profile], neighbor_scores[profile], clusters)
+    return AnalysisState(school_keys(catalog), list(catalog.names), list(fingerprints), profiles, k_max, results)
+
+
+def diff(state, keys, fingerprints):
+    """Changes plus the row mapping between the stored state and the new catalog
+
+    Returns (changes, old_to_new, dirty): old_to_new maps stored rows to new
+    rows (-1 when removed) and dirty flags new rows that were added or edited.
+    """
+    old_rows = {key: i for i, key in enumerate(state.keys)}
+    old_to_new = np.full(len(state.keys), -1, dtype=np.int64)
+    dirty = np.zeros(len(keys), dtype=bool)
+    added, changed = [], []
+    for j, (key, fingerprint) in enumerate(zip(keys, fingerprints)):
+        i = old_rows.get(key)
+        if i is None:
+            added.append(key)
+            dirty[j] = True
+            continue
+        old_to_new[i] = j
+        if state.fingerprints[i] != fingerprint:
+            changed.append(key)
+            dirty[j] = True
+    removed = [key for i, key in enumerate(state.keys) if old_to_new[i] < 0]
+    return Changes(added, changed, removed), old_to_new, dirty
+
+
+@traced('incremental.update')
+def update(state, catalog, fingerprints, block_size=None):
+    """Patch `state` for a new catalog; returns (new state, Changes)"""
+    keys = school_keys(catalog)
+    changes, old_to_new, dirty = diff(state, keys, fingerprints)
+    n = len(catalog)
+    if min(state.k_max, n) != min(state.k_max, len(state)) or dirty.sum() > FULL_REBUILD_FRACTION * n:
+        new = compute(catalog, fingerprints, state.profiles, state.k_max, block_size)
+        changes.rescored, changes.full = n, True
+        return new, changes
+
+    engine = SimilarityEngine(catalog, state.profiles)
+    dirty_rows = np.flatnonzero(dirty)
+    dirty_scores = _block_scores(engine, dirty_rows, state.profiles, block_size)
+    stale = (old_to_new < 0) | dirty[np.maximum(old_to_new, 0)]
+    new_to_old = np.full(n, -1, dtype=np.int64)
+    new_to_old[old_to_new[old_to_new >= 0]] = np.flatnonzero(old_to_new >= 0)
+    clean_rows = np.flatnonzero(~dirty)
+
+    # Clean rows whose stored neighbour list points at an edited or removed school
+    rescan = {}
+    for profile in state.profiles:
+        old = state.results[profile].neighbors[new_to_old[clean_rows]]
+        rescan[profile] = clean_rows[((old >= 0) & stale[np.maximum(old, 0)]).any(axis=1)]
+    rescan_rows = np.unique(np.concatenate([rescan[p] for p in state.profiles]))
+    rescan_scores = _block_scores(engine, rescan_rows, state.profiles, block_size)
+    changes.rescored = len(dirty_rows) + len(rescan_rows)
+
+    results = {}
+    for profile in state.profiles:
+        old = state.results[profile]
+        k = old.neighbors.shape[1]
+
+        # Edges: drop pairs touching edited/removed schools, add the rescored ones
+        lo, hi, scores = old.edges
+        keep = ~stale[lo] & ~stale[hi]
+        a, b = old_to_new[lo[keep]], old_to_new[hi[keep]]
+        fresh = threshold_edges(dirty_rows, dirty_scores[profile], get_profile(profile), in_block=dirty)
+        edges = _merge_edges(n, (np.minimum(a, b).astype(np.int32), np.maximum(a, b).astype(np.int32), scores[keep]),
+                             fresh)
+
+        # Neighbours: clean rows merge their stored list with the new scores against dirty columns
+        neighbors = np.full((n, k), -1, dtype=np.int32)
+        neighbor_scores = np.full((n, k), -np.inf, dtype=np.float64)
+        merge = np.setdiff1d(clean_rows, rescan[profile])
+        if len(merge):
+            stored = old.neighbors[new_to_old[merge]]
+            cand_cols = np.concatenate([np.where(stored >= 0, old_to_new[np.maximum(stored, 0)], -1),
+                                        np.broadcast_to(dirty_rows, (len(merge), len(dirty_rows)))], axis=1)
+            cand_scores = np.concatenate([old.neighbor_scores[new_to_old[merge]],
+                                          dirty_scores[profile][:, merge].T], axis=1)
+            order = np.lexsort((cand_cols, -cand_scores), axis=1)[:, :k]
+            neighbors[merge] = np.take_along_axis(cand_cols, order, axis=1)
+            neighbor_scores[merge] = np.take_along_axis(cand_scores, order, axis=1)
+            neighbors[merge] = np.where(np.isfinite(neighbor_scores[merge]), neighbors[merge], -1)
+        rescored = np.concatenate([dirty_rows, rescan[profile]])
+        blocks = np.concatenate([dirty_scores[profile], rescan_scores[profile][np.isin(rescan_rows, rescan[profile])]])
+        neighbors[rescored], neighbor_scores[rescored] = select_top_k(_exclude_self(blocks, rescored), k)
+
+        previous = np.full(n, -1, dtype=np.int32)
+        previous[old_to_new[old_to_new >= 0]] = old.clusters[old_to_new >= 0]
+        clusters = cluster_knn(neighbors, neighbor_scores, profile, CLUSTER_K, previous=previous)
+        results[profile] = ProfileResults(edges, neighbors, neighbor_scores, clusters)
+
+    new = AnalysisState(keys, list(catalog.names), list(fingerprints), state.profiles, state.k_max, results)
+    return new, changes
+
+
+def read_source(path=DATA_PATH):
+    """(Catalog, record fingerprints) from a single parse of the data file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    fingerprints = [record_fingerprint(uni) for uni in data.get('universities', {}).values()]
+    return Catalog.from_data(data), fingerprints
+
+
+def refresh(path=DATA_PATH, state_dir=None, profiles=DEFAULT_PROFILES, k_max=K_MAX, full=False, source=None):
+    """Bring the stored state for `path` up to date and persist it; returns (state, Changes)
+
+    `source` is a read_source(path) result the caller already holds, so the
+    state is built from exactly that version of the file.
+    """
+    catalog, fingerprints = source or read_source(path)
+    directory = snapshot_dir(path, state_dir or STATE_DIR)
+    profiles = [get_profile(p).name for p in profiles]
+
+    state = None if full else AnalysisState.load(directory)
+    if state is None or state.profiles != profiles or state.k_max != k_max:
+        state = compute(catalog, fingerprints, profiles, k_max)
+        changes = Changes(school_keys(catalog), [], [], rescored=len(catalog), full=True)
+    else:
+        state, changes = update(state, catalog, fingerprints)
+        if not changes and state.keys == school_keys(catalog) and not changes.rescored:
+            return state, changes
+    state.save(directory)
+    return state, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally refresh stored similarity results")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--state', default=None, help="state directory root (default: $ANALYSIS_STATE_DIR or .cache/state)")
+    parser.add_argument('--full', action='store_true', help="ignore the stored state and rebuild")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state, changes = refresh(args.data, args.state, full=args.full)
+    elapsed = (time.perf_counter() - start) * 1e3
+
+    if changes.full:
+        print(f"🔄 Full rebuild: {len(state)} schools")
+    elif changes:
+        print(f"♻️  Incremental update: {len(changes.added)} added, {len(changes.changed)} changed, "
+              f"{len(changes.removed)} removed")
+    else:
+        print("✅ No changes since the last run")
+    print(f"   Rows rescored: {changes.rescored} of {len(state)} in {elapsed:.0f} ms")
+    for profile in state.profiles:
+        result = state.results[profile]
+        print(f"   {profile}: {len(result.edges[0])} edges, {len(state.clusters(profile))} clusters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Opt-in tracing of the analysis hot paths
+
+The library marks its stages with span() and tallies work with count()
+(pairs scored, pairs passing a threshold, candidates, ...). Both are no-ops
+costing one global check until tracing is enabled, either with environment
+variables, read once at import:
+
+    ANALYSIS_TRACE=trace.json ANALYSIS_TRACE_FORMAT=chrome python analyze_bremen_connections.py
+
+or by running a script (or, with -m, a module) under the tracer:
+
+    python -m analysis.instrument --trace trace.json --format chrome --profile cprofile test_3d_clustering.py
+    python -m analysis.instrument --trace export.json -m analysis.export --out /tmp/graphs
+
+Every finished span records its start, duration, nesting depth, the counters
+incremented inside it and the process memory high-water mark. The trace is
+written at exit as plain JSON or in Chrome's trace-event format (open it in
+chrome://tracing or Perfetto). Capture modes (ANALYSIS_PROFILE or --profile,
+comma separated) add per-stage reports for every top-level span next to the
+trace (under the runner, the stages inside the script): "cprofile" writes
+.prof files with a text summary, "tracemalloc" measures the exact
+Python/NumPy peak of every span and writes the top allocation sites of each
+stage.
+"""
+
+import argparse
+import atexit
+import cProfile
+import functools
+import io
+import json
+import multiprocessing
+import os
+import pstats
+import runpy
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_ENV = 'ANALYSIS_TRACE'
+FORMAT_ENV = 'ANALYSIS_TRACE_FORMAT'
+PROFILE_ENV = 'ANALYSIS_PROFILE'
+FORMATS = ('json', 'chrome')
+MODES = ('cprofile', 'tracemalloc')
+
+_tracer = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+
+def _slug(name):
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+
+
+class _Span:
+    """One timed stage; created by span() only while tracing"""
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.counters = {}
+        self.peak = 0
+
+    def __enter__(self):
+        tracer = self.tracer
+        self.parent = tracer.stack[-1] if tracer.stack else None
+        self.depth = len(tracer.stack)
+        tracer.stack.append(self)
+        self.profiler = self.snapshot = None
+        if tracer.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.base = current
+            if self.depth == tracer.stage_depth:
+                self.snapshot = tracemalloc.take_snapshot()
+        if tracer.cprofile and self.depth == tracer.stage_depth:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        tracer = self.tracer
+        if self.profiler is not None:
+            self.profiler.disable()
+        record = {
+            'name': self.name,
+            'start': self.start - tracer.origin,
+            'duration': end - self.start,
+            'depth': self.depth,
+            'args': self.args,
+            'counters': self.counters,
+            'max_rss_mb': _max_rss_mb(),
+        }
+        if tracer.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            tracemalloc.reset_peak()
+            record['peak_mb'] = round((self.peak - self.base) / 2**20, 3)
+            record['retained_mb'] = round((current - self.base) / 2**20, 3)
+        tracer.stack.pop()
+        if self.parent is not None:
+            self.parent.peak = max(self.parent.peak, self.peak)
+            for name, value in self.counters.items():
+                self.parent.counters[name] = self.parent.counters.get(name, 0) + value
+        index = len(tracer.spans)
+        tracer.spans.append(record)
+        if self.profiler is not None:
+            tracer.write_profile(index, self.name, self.profiler)
+        if self.snapshot is not None:
+            tracer.write_allocations(index, self.name, self.snapshot)
+        return False
+
+
+class Tracer:
+    """Collects spans and counters and writes them as a trace file"""
+
+    def __init__(self, path, fmt='json', profile=(), stage_depth=0):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown trace format {fmt!r}; expected one of {FORMATS}")
+        unknown = set(profile) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown profile modes {sorted(unknown)}; expected {MODES}")
+        self.path = path
+        self.format = fmt
+        self.cprofile = 'cprofile' in profile
+        self.memory = 'tracemalloc' in profile
+        self.report_dir = os.path.splitext(path)[0] + '.profiles' if profile else None
+        self.stage_depth = stage_depth  # spans at this nesting level get capture reports
+        self.origin = time.perf_counter()
+        self.created = time.time()
+        self.stack = []
+        self.spans = []
+        self.counters = {}
+        self.counter_events = []
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def count(self, name, value):
+        total = self.counters[name] = self.counters.get(name, 0) + value
+        self.counter_events.append((time.perf_counter() - self.origin, name, total))
+        if self.stack:
+            counters = self.stack[-1].counters
+            counters[name] = counters.get(name, 0) + value
+
+    def _report_path(self, index, name, suffix):
+        os.makedirs(self.report_dir, exist_ok=True)
+        return os.path.join(self.report_dir, f"{index:03d}-{_slug(name)}{suffix}")
+
+    def write_profile(self, index, name, profiler):
+        profiler.dump_stats(self._report_path(index, name, '.prof'))
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(30)
+        with open(self._report_path(index, name, '.cprofile.txt'), 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+
+    def write_allocations(self, index, name, before):
+        stats = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+        with open(self._report_path(index, name, '.tracemalloc.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Top allocation sites retained by {name}\n")
+            for stat in stats[:30]:
+                f.write(f"{stat}\n")
+
+    def to_dict(self):
+        """Plain JSON trace: spans in start order plus counter totals"""
+        return {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.created)),
+            'argv': sys.argv,
+            'spans': sorted(self.spans, key=lambda s: s['start']),
+            'counters': self.counters,
+        }
+
+    def to_chrome(self):
+        """Chrome trace-event format: complete events per span, counter tracks"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': os.path.basename(sys.argv[0]) or 'analysis'}}]
+        for s in self.spans:
+            args = dict(s['args'], **s['counters'])
+            args.update({key: s[key] for key in ('max_rss_mb', 'peak_mb', 'retained_mb') if s.get(key) is not None})
+            events.append({'name': s['name'], 'ph': 'X', 'pid': pid, 'tid': 0,
+                           'ts': s['start'] * 1e6, 'dur': s['duration'] * 1e6, 'args': args})
+        for ts, name, total in self.counter_events:
+            events.append({'name': name, 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': ts * 1e6, 'args': {name: total}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self):
+        trace = self.to_chrome() if self.format == 'chrome' else self.to_dict()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False, default=str)
+        return self.path
+
+
+def span(name, **args):
+    """Context manager timing one stage (a shared no-op while tracing is off)"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, args)
+
+
+def count(name, value=1):
+    """Add `value` to a counter of the current span and the run"""
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def active():
+    """True while tracing; guards counters that cost something to compute"""
+    return _tracer is not None
+
+
+def traced(name):
+    """Decorator form of span() for whole functions"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(_tracer, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(path, fmt='json', profile=(), stage_depth=0):
+    """Start tracing; the trace is written by disable() or at interpreter exit"""
+    global _tracer
+    if _tracer is not None:
+        disable()
+    _tracer = Tracer(path, fmt, profile, stage_depth)
+    atexit.register(disable)
+    return _tracer
+
+
+def disable():
+    """Stop tracing and write the trace; returns its path (None if not tracing)"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    atexit.unregister(disable)
+    return tracer.write()
+
+
+def _modes(value):
+    return tuple(mode.strip() for mode in (value or '').split(',') if mode.strip())
+
+
+def _configure_from_env():
+    path = os.environ.get(TRACE_ENV)
+    # Worker processes inherit the environment; only the parent writes the trace
+    if path and _tracer is None and multiprocessing.parent_process() is None:
+        enable(path, os.environ.get(FORMAT_ENV, 'json'), _modes(os.environ.get(PROFILE_ENV)))
+
+
+if __name__ != '__main__':  # under `python -m`, the imported module configures itself
+    _configure_from_env()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Python script or module with analysis tracing enabled")
+    parser.add_argument('--trace', default='analysis-trace.json', help="trace output file")
+    parser.add_argument('--format', choices=FORMATS, default='json')
+    parser.add_argument('--profile', type=_modes, default=(), help="capture modes: cprofile,tracemalloc")
+    parser.add_argument('-m', '--module', action='store_true', help="target is a module name, as with python -m")
+    parser.add_argument('target')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    # The library imports analysis.instrument, not this __main__ copy, so trace through it
+    from analysis import instrument
+    instrument.enable(args.trace, args.format, args.profile, stage_depth=1)
+    sys.argv = [args.target] + args.args
+    try:
+        with instrument.span(args.target):
+            if args.module:
+                runpy.run_module(args.target, run_name='__main__', alter_sys=True)
+            else:
+                sys.path.insert(0, os.path.dirname(os.path.abspath(args.target)))
+                runpy.run_path(args.target, run_name='__main__')
+    finally:
+        path = instrument.disable()
+        print(f"📊 Trace written to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
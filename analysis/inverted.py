@@ -0,0 +1,119 @@
+"""
+Interned-token inverted index for program names and specializations
+
+Tokens are interned to integer ids once at load time. Each school keeps its
+sorted token ids and each token keeps a posting list of school ids, both in
+CSR form, so overlap counts for an anchor come from accumulating the posting
+lists of its own tokens: only schools sharing at least one token are touched.
+"""
+
+import numpy as np
+
+
+def _csr(lists, dtype=np.int32):
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(items) for items in lists])
+    indices = np.fromiter((i for items in lists for i in items), dtype=dtype, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def _gather(indptr, data, ids):
+    """Concatenate the CSR slices of `ids`; returns (values, slice lengths)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    starts, ends = indptr[ids], indptr[ids + 1]
+    lengths = ends - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return data[np.arange(lengths.sum()) + offsets], lengths
+
+
+class TokenIndex:
+    """School -> tokens and token -> schools posting lists over interned tokens"""
+
+    ARRAYS = ('doc_indptr', 'doc_tokens', 'post_indptr', 'post_docs')
+
+    def __init__(self, token_sets):
+        self.vocabulary = {}
+        documents = []
+        for tokens in token_sets:
+            ids = {self.vocabulary.setdefault(token, len(self.vocabulary)) for token in tokens}
+            documents.append(sorted(ids))
+        self.tokens = list(self.vocabulary)
+        self.doc_indptr, self.doc_tokens = _csr(documents)
+
+        postings = [[] for _ in self.tokens]
+        for doc, ids in enumerate(documents):
+            for token in ids:
+                postings[token].append(doc)
+        self.post_indptr, self.post_docs = _csr(postings)
+
+    @classmethod
+    def from_documents(cls, doc_indptr, doc_tokens, tokens):
+        """Build from per-school CSR token ids that are already interned into `tokens`"""
+        index = cls.__new__(cls)
+        index.tokens = list(tokens)
+        index.vocabulary = {token: i for i, token in enumerate(index.tokens)}
+        index.doc_indptr = np.asarray(doc_indptr, dtype=np.int64)
+        index.doc_tokens = np.asarray(doc_tokens, dtype=np.int32)
+        owners = np.repeat(np.arange(len(index.doc_indptr) - 1, dtype=np.int32), np.diff(index.doc_indptr))
+        order = np.argsort(index.doc_tokens, kind='stable')
+        index.post_docs = owners[order]
+        index.post_indptr = np.zeros(len(index.tokens) + 1, dtype=np.int64)
+        index.post_indptr[1:] = np.cumsum(np.bincount(index.doc_tokens, minlength=len(index.tokens)))
+        return index
+
+    @classmethod
+    def from_arrays(cls, doc_indptr, doc_tokens, post_indptr, post_docs, tokens=()):
+        """Wrap existing CSR arrays (e.g. views into shared memory) without copying"""
+        index = cls.__new__(cls)
+        index.tokens = list(tokens)
+        index.vocabulary = {token: i for i, token in enumerate(index.tokens)}
+        index.doc_indptr, index.doc_tokens = doc_indptr, doc_tokens
+        index.post_indptr, index.post_docs = post_indptr, post_docs
+        return index
+
+    def arrays(self):
+        """The four CSR arrays, in ARRAYS (and from_arrays()) order"""
+        return tuple(getattr(self, part) for part in self.ARRAYS)
+
+    def __len__(self):
+        return len(self.doc_indptr) - 1
+
+    def tokens_of(self, row):
+        """Token ids of one school"""
+        return self.doc_tokens[self.doc_indptr[row]:self.doc_indptr[row + 1]]
+
+    def postings(self, token_ids):
+        """Concatenated posting lists (school ids, with repeats) of the given tokens"""
+        return _gather(self.post_indptr, self.post_docs, token_ids)[0]
+
+    def schools_with(self, token_ids):
+        """Sorted ids of schools holding at least one of the tokens"""
+        return np.unique(self.postings(token_ids))
+
+    def overlap(self, row):
+        """Sparse overlap of one school: (school ids, shared token counts)"""
+        return np.unique(self.postings(self.tokens_of(row)), return_counts=True)
+
+    def overlap_block(self, rows):
+        """Dense len(rows) x N shared-token counts for a block of anchor rows"""
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        n = len(self)
+        token_ids, token_counts = _gather(self.doc_indptr, self.doc_tokens, rows)
+        owners = np.repeat(np.arange(len(rows)), token_counts)
+        docs, posting_lengths = _gather(self.post_indptr, self.post_docs, token_ids)
+        flat = np.repeat(owners, posting_lengths) * n + docs
+        return np.bincount(flat, minlength=len(rows) * n).reshape(len(rows), n)
+
+    def overlap_pairs(self, a, b):
+        """Shared token counts of the school pairs (a[i], b[i])"""
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        left, left_counts = _gather(self.doc_indptr, self.doc_tokens, a)
+        right, right_counts = _gather(self.doc_indptr, self.doc_tokens, b)
+        pairs = np.arange(len(a))
+        vocabulary = len(self.post_indptr) - 1
+        # Token sets are duplicate-free, so a (pair, token) key seen twice is shared
+        keys = np.sort(np.concatenate((np.repeat(pairs, left_counts) * vocabulary + left,
+                                       np.repeat(pairs, right_counts) * vocabulary + right)))
+        shared = keys[1:][keys[1:] == keys[:-1]]
+        return np.bincount(shared // vocabulary, minlength=len(a))
@@ -0,0 +1,135 @@
+"""
+Offline 3D layout of the similarity network
+
+The 3D network view starts a d3 force simulation from geographic positions
+and lets similarity links pull schools together; with many schools that
+settles slowly and differently on every load. This module computes the
+layout once, from the same ingredients, by sparse stress majorization:
+
+- every top-k similarity edge that passes the profile threshold wants the
+  view's link distance, 2.0 - 1.5 * min(score / 20, 1);
+- every school is pulled weakly towards its map position (the view's
+  (lng - 10) * 0.8, (lat - 50) * 0.8) and towards z = 0; schools without
+  coordinates towards the centre;
+- schools closer than `min_distance` push apart. Close pairs are found per
+  iteration by hashing positions into a grid, so no step is O(N²).
+
+Each iteration is one Jacobi step of the majorization: every school moves to
+the weighted mean of the positions its edges, collisions and anchor want for
+it, computed for all schools at once with bincount.
+"""
+
+import numpy as np
+
+from analysis.clustering import knn_edges
+from analysis.graph import bucket_pairs
+from analysis.instrument import span, traced
+
+GEO_ORIGIN = (10.0, 50.0)   # lng, lat mapped to (0, 0)
+GEO_SCALE = 0.8
+STRENGTH_SCALE = 20.0       # link strength = min(score / 20, 1)
+# Grid cell members paired per collision step (see graph.bucket_pairs)
+_CELL_PAIRS = 16
+
+
+def geo_anchors(lat, lng):
+    """(N x 3 anchor positions, mask of schools with coordinates) in view units"""
+    located = ~(np.isnan(lat) | np.isnan(lng))
+    anchors = np.zeros((len(lat), 3))
+    anchors[located, 0] = (lng[located] - GEO_ORIGIN[0]) * GEO_SCALE
+    anchors[located, 1] = (lat[located] - GEO_ORIGIN[1]) * GEO_SCALE
+    return anchors, located
+
+
+def link_distances(scores):
+    """Target distance of each similarity edge, as the 3D view's link force"""
+    return 2.0 - 1.5 * np.minimum(np.asarray(scores, dtype=np.float64) / STRENGTH_SCALE, 1.0)
+
+
+def close_pairs(positions, radius, shift=0.0):
+    """Pairs (a, b) of points closer than `radius`, found through a hashed grid
+
+    Only points sharing a cell are compared (at most _CELL_PAIRS per point),
+    so pairs straddling a cell border are missed; callers alternate `shift`
+    to catch them on the next step.
+    """
+    cells = np.floor(positions / radius + shift).astype(np.int64)
+    keys = (cells * np.array([73856093, 19349663, 83492791], dtype=np.int64)).sum(axis=1)
+    a, b = bucket_pairs(keys, np.arange(len(positions)), _CELL_PAIRS)
+    close = np.einsum('ij,ij->i', positions[a] - positions[b], positions[a] - positions[b]) < radius * radius
+    return a[close], b[close]
+
+
+def layout_stress(positions, lo, hi, distances):
+    """Normalized edge stress: sqrt(mean(((|xi - xj| - d) / d)²))"""
+    if len(lo) == 0:
+        return 0.0
+    lengths = np.linalg.norm(positions[lo] - positions[hi], axis=1)
+    return float(np.sqrt(np.mean(((lengths - distances) / distances) ** 2)))
+
+
+@traced('layout.stress')
+def stress_layout(n, lo, hi, distances, anchors=None, located=None, anchor_weight=0.05,
+                  min_distance=0.5, repulsion=1.0, iterations=300, tol=1e-3, seed=0):
+    """N x 3 positions minimizing edge stress plus weak anchoring and collisions
+
+    `anchors`/`located` come from geo_anchors(); without them every school is
+    anchored to the centre. Iteration stops once no school moves more than
+    `tol` view units.
+    """
+    rng = np.random.default_rng(seed)
+    if anchors is None:
+        anchors, located = np.zeros((n, 3)), np.zeros(n, dtype=bool)
+    lo, hi = np.asarray(lo, dtype=np.int64), np.asarray(hi, dtype=np.int64)
+    distances = np.asarray(distances, dtype=np.float64)
+
+    # Per-dimension anchor pull: map position in x/y, the z = 0 plane, the centre for unlocated schools
+    pull = np.where(located[:, None], anchor_weight, 0.1 * anchor_weight) * np.array([1.0, 1.0, 0.5])
+    target = anchors * pull
+
+    # Start as the view does: map position with jitter, unlocated schools spread around the centre
+    positions = anchors + rng.uniform(-0.5, 0.5, (n, 3)) * np.array([1.0, 1.0, 3.0])
+    positions[~located, :2] = rng.uniform(-4, 4, (int((~located).sum()), 2))
+
+    edge_weight = 1.0 / distances ** 2
+    for step in range(iterations):
+        a, b = close_pairs(positions, min_distance, shift=0.5 * (step % 2))
+        left = np.concatenate((lo, a))
+        right = np.concatenate((hi, b))
+        want = np.concatenate((distances, np.full(len(a), min_distance)))
+        weight = np.concatenate((edge_weight, np.full(len(a), repulsion / min_distance ** 2)))
+
+        diff = positions[left] - positions[right]
+        length = np.linalg.norm(diff, axis=1)
+        # Coincident points get a random direction instead of a division by zero
+        stuck = length < 1e-9
+        if stuck.any():
+            diff[stuck] = rng.normal(size=(int(stuck.sum()), 3))
+            length[stuck] = np.linalg.norm(diff[stuck], axis=1)
+        offset = diff * (want / length)[:, None]
+
+        num = target.copy()
+        for dim in range(3):
+            num[:, dim] += np.bincount(left, weight * (positions[right, dim] + offset[:, dim]), minlength=n)
+            num[:, dim] += np.bincount(right, weight * (positions[left, dim] - offset[:, dim]), minlength=n)
+        den = pull + (np.bincount(left, weight, minlength=n) + np.bincount(right, weight, minlength=n))[:, None]
+        moved = num / den
+        shift = np.abs(moved - positions).max(initial=0.0)
+        positions = moved
+        if shift < tol:
+            break
+    return positions
+
+
+def compute_layout(index, profile, catalog, k=None, **options):
+    """float32 N x 3 positions from a NeighborIndex's top-k lists and the catalog coordinates
+
+    Returns (positions, edge stress of the result).
+    """
+    lo, hi, scores = knn_edges(index.indices, index.scores, profile, k)
+    distances = link_distances(scores)
+    anchors, located = geo_anchors(catalog.numeric['lat'], catalog.numeric['lng'])
+    positions = stress_layout(len(catalog), lo, hi, distances, anchors, located, **options)
+    with span('layout.stress_metric'):
+        stress = layout_stress(positions, lo, hi, distances)
+    return positions.astype(np.float32), stress
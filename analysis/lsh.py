@@ -0,0 +1,269 @@
+"""
+Approximate neighbour search with MinHash sketches, LSH banding and hubs
+
+Exact neighbour lists score every school against the whole catalog. The
+approximate mode only scores candidate pairs from three sources, each
+covering part of the profile score:
+
+- MinHash/LSH: each school's program-name and specialization sets are
+  sketched, every signature is split into bands and schools that land in
+  the same bucket of some band are paired, so candidate generation grows
+  with the bucket sizes instead of N². This finds near-duplicate token sets.
+- Hubs: the shared-program and shared-specialization terms are raw overlap
+  counts, so most of the score mass of a typical school's best neighbours
+  comes from the few schools with the largest token sets, whose Jaccard
+  similarity to it is low. The `hub_share` of schools with the largest
+  weighted token sets is scored against the whole catalog (dense tiles).
+- Attribute blocking: within each school type, schools sorted by every
+  windowed factor the profile weights (ranking, acceptance rate, student
+  count) are paired with their `window` nearest neighbours in that order.
+
+Candidates are scored exactly, so every reported score is exact; only
+neighbours that never became candidates can be missed. recall() measures
+that against an exact index; approximate_index() estimates it on sampled
+anchors and warns when the estimate falls below `min_recall`.
+
+With `bands` b of `rows` r each, two sets of Jaccard similarity s become
+LSH candidates with probability 1 - (1 - s^r)^b.
+"""
+
+import math
+import warnings
+
+import numpy as np
+
+from analysis.graph import bucket_pairs
+from analysis.instrument import count, span, traced
+from analysis.neighbors import NeighborIndex, select_top_k, top_k_pairs
+from analysis.similarity import _auto_block_size, get_profile
+
+# Mersenne prime for the (a * x + b) mod p hash family; token ids stay below it
+_PRIME = (1 << 31) - 1
+# Token x permutation hash values gathered per chunk when computing signatures
+_CHUNK = 1 << 20
+# Candidate pairs re-scored and merged into the running top-k per step
+_PAIR_CHUNK = 1 << 20
+FIELDS = ('programs', 'specializations')
+# Windowed factors used for attribute blocking: (weight attribute, catalog column)
+BLOCKING = (('ranking_weight', 'ranking'), ('selectivity_weight', 'acceptance_rate'), ('student_weight', 'students'))
+
+
+def _distinct(keys):
+    """Sorted distinct values; a plain sort beats np.unique's hashing on large int arrays"""
+    keys = np.sort(keys)
+    return keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+
+
+def minhash_signatures(token_index, num_perm=96, seed=0):
+    """N x num_perm uint32 MinHash signatures of every school's token set
+
+    Schools without tokens get all-max signatures and never become candidates.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+    vocabulary = np.arange(len(token_index.post_indptr) - 1, dtype=np.uint64)
+    hashes = ((vocabulary[:, None] * a + b) % _PRIME).astype(np.uint32)
+
+    indptr = token_index.doc_indptr
+    counts = np.diff(indptr)
+    signatures = np.full((len(counts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    filled = np.flatnonzero(counts > 0)
+    per_chunk = max(1, _CHUNK // (num_perm * int(counts.max(initial=1))))
+    for start in range(0, len(filled), per_chunk):
+        docs = filled[start:start + per_chunk]
+        lo, hi = indptr[docs[0]], indptr[docs[-1] + 1]
+        values = hashes[token_index.doc_tokens[lo:hi]]
+        signatures[docs] = np.minimum.reduceat(values, indptr[docs] - lo, axis=0)
+    return signatures
+
+
+def band_pairs(signatures, bands, max_bucket=32, seed=0):
+    """Unique candidate pairs (lo, hi) sharing a bucket in at least one band
+
+    Buckets larger than `max_bucket` (e.g. many schools with identical sets)
+    only pair each member with the next max_bucket - 1 members in the bucket,
+    which bounds the work at O(N * bands * max_bucket); members are shuffled
+    per band so different bands pair different windows.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    valid = np.flatnonzero((signatures != np.iinfo(np.uint32).max).any(axis=1))
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 1 << 63, rows, dtype=np.uint64) | np.uint64(1)
+    keys = np.empty(0, np.int64)
+    for band in range(bands):
+        members = rng.permutation(valid)
+        block = signatures[members, band * rows:(band + 1) * rows].astype(np.uint64)
+        bucket = (block * multipliers).sum(axis=1)  # wraps mod 2^64; collisions only add candidates
+        a, b = bucket_pairs(bucket, members, max_bucket)
+        # Merge band by band so memory follows the distinct pairs, not bands x pairs
+        keys = _distinct(np.concatenate((keys, np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b))))
+    return keys // n, keys % n
+
+
+def hub_rows(engine, profile=None, share=0.04):
+    """Sorted rows of the `share` of schools with the largest weighted token sets
+
+    A school's program and specialization weights times its set sizes bound
+    what the overlap terms can add to any of its scores.
+    """
+    profile = get_profile(profile) if profile is not None else engine.profile
+    c = engine.catalog
+    potential = (profile.program_weight * np.diff(c.programs.doc_indptr)
+                 + profile.specialization_weight * np.diff(c.specializations.doc_indptr))
+    hubs = math.ceil(share * len(c)) if potential.any() else 0
+    return np.sort(np.argsort(-potential, kind='stable')[:hubs])
+
+
+def attribute_pairs(engine, profile=None, window=16):
+    """Pairs (lo, hi) of schools within `window` places of each other in a per-type sort order
+
+    One order per windowed factor the profile weights; schools missing the
+    value sort last within their type. Types are ignored when the profile
+    does not weight them.
+    """
+    profile = get_profile(profile) if profile is not None else engine.profile
+    c = engine.catalog
+    n = len(c)
+    types = c.type_codes if profile.type_weight else np.zeros(n, dtype=np.int64)
+    lo, hi = [], []
+    for weight, column in BLOCKING:
+        if not getattr(profile, weight):
+            continue
+        order = np.lexsort((getattr(c, column), types))
+        for offset in range(1, min(window, n - 1) + 1):
+            a, b = order[:-offset], order[offset:]
+            lo.append(np.minimum(a, b))
+            hi.append(np.maximum(a, b))
+    if not lo:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(lo).astype(np.int64), np.concatenate(hi).astype(np.int64)
+
+
+def _candidate_keys(engine, profile, num_perm, bands, max_bucket, window, fields, seed):
+    """Sorted distinct LSH and attribute-blocking pair keys lo * N + hi"""
+    n = len(engine.catalog)
+    keys = []
+    for field in fields:
+        with span('lsh.signatures', field=field):
+            signatures = minhash_signatures(getattr(engine.catalog, field), num_perm, seed)
+        with span('lsh.bands', field=field):
+            lo, hi = band_pairs(signatures, bands, max_bucket, seed)
+        keys.append(lo * n + hi)
+        del lo, hi
+    with span('lsh.blocking'):
+        lo, hi = attribute_pairs(engine, profile, window)
+        keys.append(lo * n + hi)
+    keys = _distinct(np.concatenate(keys))
+    count('candidate_pairs', len(keys))
+    return keys
+
+
+def candidate_pairs(engine, num_perm=96, bands=32, max_bucket=32, fields=FIELDS, seed=0, profile=None, window=16):
+    """LSH candidates over the program-name and specialization sketches, unioned with attribute blocking"""
+    keys = _candidate_keys(engine, profile, num_perm, bands, max_bucket, window, fields, seed)
+    return keys // len(engine.catalog), keys % len(engine.catalog)
+
+
+def _merge_top_k(indices, best, extra_indices, extra_scores):
+    """Best k per row of two disjoint candidate lists, ordered like top_k_pairs"""
+    k = indices.shape[1]
+    cols = np.concatenate((indices, extra_indices), axis=1)
+    values = np.concatenate((best, extra_scores), axis=1)
+    order = np.lexsort((np.where(cols < 0, np.iinfo(np.int32).max, cols), -values), axis=1)[:, :k]
+    return (np.take_along_axis(cols, order, axis=1).astype(np.int32),
+            np.take_along_axis(values, order, axis=1))
+
+
+@traced('lsh.hubs')
+def _hub_top_k(engine, hubs, indices, best, profile, block_size):
+    """Score the hub rows against everything; hub rows become exact, the rest merge the hub columns"""
+    n = len(engine.catalog)
+    k = indices.shape[1]
+    is_hub = np.zeros(n, dtype=bool)
+    is_hub[hubs] = True
+    others = np.flatnonzero(~is_hub)
+    for start in range(0, len(hubs), block_size):
+        rows = hubs[start:start + block_size]
+        block = engine.block(rows, profile)
+        block[np.arange(len(rows)), rows] = -np.inf
+        top, values = select_top_k(block, k)
+        indices[rows], best[rows] = top, values
+        top, values = select_top_k(block[:, others].T, k)
+        top = np.where(top >= 0, rows[np.maximum(top, 0)], -1)
+        indices[others], best[others] = _merge_top_k(indices[others], best[others], top, values)
+    return is_hub
+
+
+def _recall(approximate_scores, exact_scores):
+    """Tie-aware recall of approximate against exact best-first score rows"""
+    wanted = np.isfinite(exact_scores).sum(axis=1)
+    kth = exact_scores[np.arange(len(exact_scores)), np.maximum(wanted - 1, 0)]
+    hits = (approximate_scores >= kth[:, None]).sum(axis=1)
+    rows = wanted > 0
+    return float(np.minimum(hits, wanted)[rows].sum() / max(wanted[rows].sum(), 1))
+
+
+def estimate_recall(index, k=10, sample=200, seed=0):
+    """recall() of an approximate index against exact rows of `sample` random anchors
+
+    Costs sample / N of an exact build; the index must carry its engine.
+    """
+    n = len(index.names)
+    k = min(k, index.k_max)
+    rows = np.sort(np.random.default_rng(seed).choice(n, min(sample, n), replace=False))
+    with span('lsh.estimate_recall', anchors=len(rows)):
+        block = index.engine.block(rows, index.profile)
+        block[np.arange(len(rows)), rows] = -np.inf
+        exact = select_top_k(block, k)[1]
+    return _recall(index.scores[rows, :k], exact)
+
+
+@traced('lsh.index')
+def approximate_index(engine, k_max=32, profile=None, num_perm=96, bands=32, max_bucket=32,
+                      hub_share=0.04, window=16, seed=0, sample=200, min_recall=0.9, block_size=None):
+    """NeighborIndex from hub rows plus LSH and blocking candidates, all scored exactly
+
+    Candidate pairs are scored and merged into the running top-k chunk by
+    chunk, so memory stays at the candidate keys plus N x k_max. With
+    `sample` > 0, recall@min(10, k_max) is estimated on that many anchors
+    (see estimate_recall) and stored as `estimated_recall` on the index; a
+    RuntimeWarning is raised when it is below `min_recall`.
+    """
+    profile = get_profile(profile) if profile is not None else engine.profile
+    n = len(engine.catalog)
+    indices = np.full((n, min(k_max, n)), -1, dtype=np.int32)
+    best = np.full(indices.shape, -np.inf, dtype=np.float64)
+    hubs = hub_rows(engine, profile, hub_share)
+    is_hub = _hub_top_k(engine, hubs, indices, best, profile, block_size or _auto_block_size(n))
+
+    keys = _candidate_keys(engine, profile, num_perm, bands, max_bucket, window, FIELDS, seed)
+    lo, hi = np.divmod(keys, n)
+    keys = keys[~is_hub[lo] & ~is_hub[hi]]  # pairs with a hub are already scored
+    del lo, hi
+    for start in range(0, len(keys), _PAIR_CHUNK):
+        lo, hi = np.divmod(keys[start:start + _PAIR_CHUNK], n)
+        scores = engine.pair_scores(lo, hi, profile)
+        # Only pairs reaching the current k-th best of either end can change a row
+        keep = scores >= np.minimum(best[lo, -1], best[hi, -1])
+        indices, best = top_k_pairs(n, lo[keep], hi[keep], scores[keep], indices.shape[1], indices, best)
+    index = NeighborIndex(engine.catalog.names, indices, best, engine, profile)
+
+    k = min(10, index.k_max)
+    estimate = index.estimated_recall = estimate_recall(index, k, sample, seed) if sample and n > 1 else None
+    if estimate is not None and min_recall is not None and estimate < min_recall:
+        warnings.warn(f"approximate neighbour lists: estimated recall@{k} {estimate:.3f} is below {min_recall} "
+                      f"(raise hub_share or window)", RuntimeWarning, stacklevel=3)
+    return index
+
+
+def recall(approximate, exact, k=10):
+    """Share of the exact top-k neighbour slots the approximate index fills
+
+    Tie-aware: an approximate neighbour counts when it scores at least the
+    exact k-th best score of its row, so swapping equally scored schools is
+    not a miss. Rows with no exact neighbours are ignored.
+    """
+    k = min(k, exact.k_max, approximate.k_max)
+    return _recall(approximate.scores[:, :k], exact.scores[:, :k])
@@ -0,0 +1,142 @@
+"""
+Top-k "most similar institutions" queries over a precomputed neighbour index
+
+The index keeps the best `k_max` neighbours of every school, so a query is a
+dictionary lookup plus a slice. Larger `k` falls back to scoring the anchor
+row and selecting with a bounded heap instead of sorting the whole catalog.
+"""
+
+import heapq
+
+import numpy as np
+
+from analysis.instrument import traced
+
+
+@traced('neighbors.select')
+def select_top_k(block, k):
+    """Partial selection of the k best columns per row of a score block
+
+    Returns (indices, scores), both len(block) x k, ordered by descending score
+    with ties broken by lower column index (the order a stable sort gives).
+    Slots without a finite score are filled with -1 / -inf.
+    """
+    block = np.atleast_2d(block)
+    b, n = block.shape
+    k = min(k, n)
+    indices = np.full((b, k), -1, dtype=np.int64)
+    scores = np.full((b, k), -np.inf, dtype=np.float64)
+    if k == 0 or b == 0:
+        return indices, scores
+
+    kth = np.partition(block, n - k, axis=1)[:, n - k]
+    rows, cols = np.nonzero((block >= kth[:, None]) & np.isfinite(block))
+    values = block[rows, cols]
+    order = np.lexsort((cols, -values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+
+    rank = np.arange(len(rows)) - np.searchsorted(rows, np.arange(b))[rows]
+    keep = rank < k
+    indices[rows[keep], rank[keep]] = cols[keep]
+    scores[rows[keep], rank[keep]] = values[keep]
+    return indices, scores
+
+
+@traced('neighbors.merge_pairs')
+def top_k_pairs(n, lo, hi, scores, k, indices=None, best=None):
+    """Best k neighbours per node of an undirected scored pair list
+
+    Returns N x k (indices, scores) with the same ordering and padding as
+    select_top_k. Pass earlier `indices` / `best` to merge a further chunk of
+    pairs into them (pairs must not repeat across chunks).
+    """
+    rows = np.concatenate((lo, hi)).astype(np.int64)
+    cols = np.concatenate((hi, lo)).astype(np.int64)
+    values = np.concatenate((scores, scores))
+    if indices is not None:
+        filled = indices >= 0
+        rows = np.concatenate((np.nonzero(filled)[0], rows))
+        cols = np.concatenate((indices[filled].astype(np.int64), cols))
+        values = np.concatenate((best[filled], values))
+    order = np.lexsort((cols, -values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    indices = np.full((n, min(k, n)), -1, dtype=np.int32)
+    best = np.full(indices.shape, -np.inf, dtype=np.float64)
+    indices[rows[keep], rank[keep]] = cols[keep]
+    best[rows[keep], rank[keep]] = values[keep]
+    return indices, best
+
+
+class NeighborIndex:
+    """Best `k_max` neighbours of every school, stored as N x k_max arrays"""
+
+    def __init__(self, names, indices, scores, engine=None, profile=None):
+        self.names = list(names)
+        self.position = {name: i for i, name in enumerate(self.names)}
+        self.indices = indices
+        self.scores = scores
+        self.engine = engine
+        self.profile = profile
+
+    @property
+    def k_max(self):
+        return self.indices.shape[1]
+
+    @classmethod
+    @traced('neighbors.build')
+    def build(cls, engine, k_max=32, block_size=None, profile=None):
+        """Score the catalog tile by tile and keep only the top `k_max` per row"""
+        n = len(engine.catalog)
+        indices = np.full((n, min(k_max, n)), -1, dtype=np.int32)
+        scores = np.full(indices.shape, -np.inf, dtype=np.float64)
+        for row_slice, block in engine.iter_blocks(block_size, profile):
+            rows = np.arange(row_slice.start, row_slice.stop)
+            block[np.arange(len(rows)), rows] = -np.inf  # never list a school as its own neighbour
+            top, values = select_top_k(block, indices.shape[1])
+            indices[row_slice] = top
+            scores[row_slice] = values
+        return cls(engine.catalog.names, indices, scores, engine, profile)
+
+    @classmethod
+    def from_pairs(cls, engine, lo, hi, scores, k_max=32, profile=None):
+        """Keep the top `k_max` of a scored candidate pair list per school
+
+        Schools only see the pairs they appear in; rows with fewer candidates
+        are padded with -1 / -inf like a catalog smaller than k_max.
+        """
+        indices, best = top_k_pairs(len(engine.catalog), lo, hi, scores, k_max)
+        return cls(engine.catalog.names, indices, best, engine, profile)
+
+    def _row(self, i, k, min_score):
+        if k > self.k_max and self.engine is not None:
+            return self._scan(i, k, min_score)
+        idx = self.indices[i, :k]
+        values = self.scores[i, :k]
+        keep = idx >= 0
+        if min_score is not None:
+            keep &= values >= min_score
+        names = self.names
+        return [(names[j], float(s)) for j, s in zip(idx[keep].tolist(), values[keep].tolist())]
+
+    def _scan(self, i, k, min_score):
+        """Score one anchor live and keep the best k with a bounded heap"""
+        row = self.engine.block([i], self.profile)[0]
+        row[i] = -np.inf
+        candidates = np.flatnonzero(row >= min_score) if min_score is not None else np.flatnonzero(np.isfinite(row))
+        values = row.tolist()
+        best = heapq.nlargest(k, candidates.tolist(), key=values.__getitem__)
+        return [(self.names[j], values[j]) for j in best]
+
+    def neighbors(self, name, k=10, min_score=None):
+        """The k schools most similar to `name` as (name, score), best first
+
+        Only neighbours scoring at least `min_score` are returned.
+        """
+        return self._row(self.position[name], k, min_score)
+
+    def neighbors_batch(self, names=None, k=10, min_score=None):
+        """Neighbour lists for many anchors at once (all schools by default)"""
+        anchors = self.names if names is None else names
+        return {name: self.neighbors(name, k, min_score) for name in anchors}
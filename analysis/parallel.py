@@ -0,0 +1,152 @@
+"""
+Parallel tiled all-pairs similarity over a shared-memory worker pool
+
+The encoded catalog arrays are packed once into a single shared-memory block.
+Each worker process attaches to it in the pool initializer and rebuilds a
+SimilarityEngine on zero-copy views, so a task is only a (start, stop) row
+range: nothing about the catalog is pickled per task. Dense results are
+written straight into a shared N x N output buffer; sparse results come back
+as the (row, col, score) edges of each tile that pass the profile threshold.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from analysis.instrument import traced
+from analysis.similarity import EncodedCatalog, SimilarityEngine, _auto_block_size, _concat_edges, get_profile
+
+_ALIGN = 64
+
+
+class SharedArrays:
+    """Named NumPy arrays packed into one shared-memory block
+
+    `layout` maps each name to (offset, dtype, shape) and is all another
+    process needs, besides the block name, to attach to the same arrays.
+    """
+
+    def __init__(self, shm, layout):
+        self.shm = shm
+        self.layout = layout
+        self.arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in layout.items()
+        }
+
+    @classmethod
+    def create(cls, arrays):
+        """Allocate a block and copy `arrays` ({name: array or (dtype, shape)}) into it"""
+        layout = {}
+        size = 0
+        for name, array in arrays.items():
+            dtype, shape = (np.dtype(array[0]), tuple(array[1])) if isinstance(array, tuple) \
+                else (array.dtype, array.shape)
+            size = -(-size // _ALIGN) * _ALIGN
+            layout[name] = (size, dtype.str, shape)
+            size += dtype.itemsize * int(np.prod(shape))
+        shared = cls(shared_memory.SharedMemory(create=True, size=max(size, 1)), layout)
+        for name, array in arrays.items():
+            if not isinstance(array, tuple):
+                shared.arrays[name][...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, name, layout):
+        return cls(shared_memory.SharedMemory(name=name), layout)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def close(self):
+        self.arrays = {}
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+
+
+# Per-worker state, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(inputs_name, inputs_layout, output_name, output_layout, profile):
+    inputs = SharedArrays.attach(inputs_name, inputs_layout)
+    _worker['inputs'] = inputs
+    _worker['engine'] = SimilarityEngine(EncodedCatalog.from_arrays(inputs.arrays), [profile])
+    _worker['output'] = SharedArrays.attach(output_name, output_layout) if output_name else None
+
+
+def _dense_tile(start, stop):
+    _worker['output']['scores'][start:stop] = _worker['engine'].block(np.arange(start, stop))
+    return stop - start
+
+
+def _edge_tile(start, stop):
+    return _worker['engine'].tile_edges(np.arange(start, stop))
+
+
+def _tiles(n, workers, block_size):
+    """Row ranges: small enough to fit the tile budget and to balance the pool"""
+    block_size = block_size or min(_auto_block_size(n), max(1, -(-n // (workers * 4))))
+    return [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+
+
+@traced('parallel.run')
+def _run(engine, task, workers, block_size, profile, output=None):
+    profile = get_profile(profile) if profile is not None else engine.profile
+    workers = workers or os.cpu_count() or 1
+    inputs = SharedArrays.create(engine.catalog.arrays())
+    try:
+        tiles = _tiles(len(engine.catalog), workers, block_size)
+        init = (inputs.name, inputs.layout,
+                output.name if output else None, output.layout if output else None, profile)
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init) as pool:
+            return list(pool.map(task, *zip(*tiles))) if tiles else []
+    finally:
+        inputs.unlink()
+
+
+def shared_matrix(n):
+    """SharedArrays holding an uninitialised n x n float64 'scores' array, for parallel_matrix(out=...)"""
+    return SharedArrays.create({'scores': (np.float64, (n, n))})
+
+
+def parallel_matrix(engine, profile=None, workers=None, block_size=None, out=None):
+    """Full N x N similarity matrix, tiles computed across a process pool
+
+    With `out` a SharedArrays from shared_matrix(N) the workers write straight
+    into out['scores'], which is returned; the caller owns the block and
+    unlinks it once the array is no longer referenced. Otherwise (None or a preallocated float64 array) the workers
+    fill a temporary shared buffer that is copied out once at the end, so peak
+    memory is two N x N matrices (2 * N² * 8 bytes).
+    """
+    n = len(engine.catalog)
+    if isinstance(out, SharedArrays):
+        _run(engine, _dense_tile, workers, block_size, profile, out)
+        return out['scores']
+    output = shared_matrix(n)
+    try:
+        _run(engine, _dense_tile, workers, block_size, profile, output)
+        if out is None:
+            out = np.empty((n, n), dtype=np.float64)
+        out[...] = output['scores']
+    finally:
+        output.unlink()
+    return out
+
+
+def parallel_edges(engine, profile=None, workers=None, block_size=None):
+    """Pairs that pass the profile threshold as (rows, cols, scores), row < col
+
+    Edges are sorted by row, then column, and only they ever leave the
+    workers, so memory stays proportional to the graph rather than N².
+    """
+    return _concat_edges(_run(engine, _edge_tile, workers, block_size, profile))
@@ -0,0 +1,178 @@
+"""
+Batch connection reports for any set of anchor schools
+
+analyze_bremen_connections and test_3d_clustering report on one hard-coded
+anchor, and rerunning them per school repeats the load and the all-pairs
+scoring N times. connection_reports() shares that work:
+
+1. one tiled pass over the catalog scores every row once and keeps, per row,
+   the number of connections and the best max(top, CLUSTER_K) connected
+   columns, plus, for anchor rows, the geographically nearest connected
+   columns (N x k arrays, never N x N);
+2. communities are detected once from those top-k lists, exactly as
+   analysis.clustering.cluster_catalog would;
+3. reports are then built anchor chunk by anchor chunk, with the factor
+   breakdown of the top connections from pair scoring (analysis.similarity).
+
+Reports are yielded one at a time and written as JSON Lines, so memory stays
+at the N x k arrays however many anchors are requested.
+
+    python -m analysis.reports --out reports.jsonl                       # every school
+    python -m analysis.reports --out bremen.jsonl --anchors "Hochschule für Künste Bremen"
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH, load_catalog
+from analysis.clustering import CLUSTER_K, cluster_knn, dominant_tokens
+from analysis.instrument import count, span
+from analysis.neighbors import select_top_k
+from analysis.similarity import SimilarityEngine, _auto_block_size, get_profile
+
+# Anchors whose reports are assembled together (pair scoring of their top lists)
+_REPORT_CHUNK = 256
+
+
+def _optional(value):
+    """JSON-friendly float: None for NaN"""
+    return None if np.isnan(value) else float(value)
+
+
+class _ConnectionPass:
+    """Per-row connection counts, top connected columns and (for anchors) nearest connected columns
+
+    Everything comes from one scoring pass over the catalog.
+    """
+
+    def __init__(self, engine, profile, k, geo_k, anchors, block_size=None):
+        n = len(engine.catalog)
+        self.k = min(k, max(n - 1, 0))
+        self.geo_k = min(geo_k, max(n - 1, 0))
+        self.counts = np.zeros(n, dtype=np.int64)
+        self.indices = np.full((n, self.k), -1, dtype=np.int32)
+        self.scores = np.full((n, self.k), -np.inf)
+        self.near = np.full((n, self.geo_k), -1, dtype=np.int32)
+        self.near_km = np.full((n, self.geo_k), np.inf)
+        with span('reports.score', rows=n):
+            for row_slice, block in engine.iter_blocks(block_size or _auto_block_size(n), profile):
+                rows = np.arange(row_slice.start, row_slice.stop)
+                block[np.arange(len(rows)), rows] = -np.inf  # never a school's own connection
+                passing = profile.passes(block)
+                self.counts[row_slice] = passing.sum(axis=1)
+                top, values = select_top_k(np.where(passing, block, -np.inf), self.k)
+                self.indices[row_slice] = top
+                self.scores[row_slice] = values
+                wanted = anchors[row_slice]
+                if self.geo_k and wanted.any():
+                    # Nearest first, ties by lower row: the order GeoIndex.nearest gives
+                    km = engine.distances(rows[wanted])
+                    near, negative = select_top_k(np.where(passing[wanted] & ~np.isnan(km), -km, -np.inf), self.geo_k)
+                    self.near[rows[wanted]] = near
+                    self.near_km[rows[wanted]] = -negative
+
+
+def connection_reports(catalog, anchors=None, profile='d3', top=15, geo_k=10, block_size=None):
+    """Yield a report dict per anchor name (every school by default), in anchor order
+
+    Each report lists the anchor's `top` strongest connections with their
+    factor breakdown, its `geo_k` geographically nearest connected schools
+    and its community with the top connections that share it.
+    """
+    profile = get_profile(profile)
+    engine = SimilarityEngine(catalog, (profile,))
+    rows = np.arange(len(catalog)) if anchors is None else engine.rows(anchors)
+    encoded = engine.catalog
+
+    anchor_mask = np.zeros(len(catalog), dtype=bool)
+    anchor_mask[rows] = True
+    connections = _ConnectionPass(engine, profile, max(top, CLUSTER_K), geo_k, anchor_mask, block_size)
+    with span('reports.clusters'):
+        clusters = cluster_knn(connections.indices[:, :CLUSTER_K], connections.scores[:, :CLUSTER_K], profile)
+        labels = dominant_tokens(clusters, encoded.specializations)
+        sizes = np.bincount(clusters)
+
+    for start in range(0, len(rows), _REPORT_CHUNK):
+        chunk = rows[start:start + _REPORT_CHUNK]
+        with span('reports.chunk', anchors=len(chunk)):
+            # Factor breakdown of every (anchor, top connection) pair of the chunk at once
+            top_cols = connections.indices[chunk, :top]
+            valid = top_cols >= 0
+            a = np.repeat(chunk, valid.sum(axis=1))
+            b = top_cols[valid].astype(np.int64)
+            terms = engine.pair_terms(a, b)
+            factors = engine.pair_contributions(a, b, profile, terms)
+            offsets = np.r_[0, np.cumsum(valid.sum(axis=1))]
+            for i, anchor in enumerate(chunk.tolist()):
+                pairs = range(offsets[i], offsets[i + 1])
+                top_connections = [{
+                    'name': encoded.names[b[p]],
+                    'score': float(connections.scores[anchor, p - offsets[i]]),
+                    'shared_programs': int(terms['shared_programs'][p]),
+                    'shared_specializations': int(terms['shared_specializations'][p]),
+                    'distance_km': _optional(terms['distance'][p]),
+                    'factors': {factor: round(float(values[p]), 4) for factor, values in factors.items() if values[p]},
+                } for p in pairs]
+                geo_neighbors = [{'name': encoded.names[j], 'distance_km': km} for j, km in
+                                 zip(connections.near[anchor, :geo_k].tolist(), connections.near_km[anchor, :geo_k].tolist())
+                                 if j >= 0]
+                yield _report(catalog, profile, anchor, connections, top_connections, geo_neighbors,
+                              clusters, labels, sizes)
+                count('reports')
+
+
+def _report(catalog, profile, anchor, connections, top_connections, geo_neighbors, clusters, labels, sizes):
+    school = catalog.row(anchor)
+    cluster = int(clusters[anchor])
+    # Connected members of the anchor's community, from its (score-ordered) top list
+    members = [c['name'] for c in top_connections if clusters[catalog.index[c['name']]] == cluster]
+    return {
+        'name': school.name,
+        'id': school.id,
+        'type': school.type,
+        'city': school.city,
+        'state': school.state,
+        'profile': profile.name,
+        'connections': int(connections.counts[anchor]),
+        'top_connections': top_connections,
+        'geographic_neighbors': geo_neighbors,
+        'cluster': {'id': cluster, 'label': labels.get(cluster, []), 'size': int(sizes[cluster]),
+                    'top_members': members},
+    }
+
+
+def write_reports(path, reports):
+    """Stream reports to a JSON Lines file; returns how many were written"""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for report in reports:
+            f.write(json.dumps(report, ensure_ascii=False))
+            f.write('\n')
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write per-school connection reports as JSON Lines")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--anchors', nargs='+', help="school names (default: every school)")
+    parser.add_argument('--profile', default='d3')
+    parser.add_argument('--top', type=int, default=15, help="top connections per school")
+    parser.add_argument('--geo', type=int, default=10, help="nearest connected schools per school")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.data)
+    missing = [name for name in args.anchors or [] if name not in catalog.index]
+    if missing:
+        parser.error(f"unknown schools: {', '.join(missing)}")
+    start = time.perf_counter()
+    written = write_reports(args.out, connection_reports(catalog, args.anchors, args.profile, args.top, args.geo))
+    print(f"📝 Wrote {written} connection reports to {args.out} in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
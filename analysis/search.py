@@ -0,0 +1,443 @@
+"""
+Full-text and faceted search over the programs of every school
+
+The catalog's program table (analysis.catalog.ProgramTable) is indexed once
+per version of the data file:
+
+- an inverted index over the words of every program's name, specializations
+  and description, with term frequencies, ranked with BM25;
+- facet columns per program: degree, language, school type and state as
+  interned codes, and the opening and closing day of every application
+  deadline term as a day of the year.
+
+The arrays are stored as .npy files next to the catalog snapshot
+(analysis.snapshot) and memory-mapped on later loads. Postings carry their
+precomputed BM25 weight, so a query only adds up the posting lists of its
+own words, and each facet filter is one lookup-table gather: answers take
+milliseconds even over hundreds of thousands of programs.
+
+    python -m analysis.search "media art" --language English --degree MFA --term winter --closes-after March
+    python -m analysis.search "English-language MFA programs in media art with winter deadlines after March"
+"""
+
+import argparse
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH
+from analysis.instrument import span, traced
+from analysis.inverted import _csr, _gather
+from analysis.neighbors import select_top_k
+from analysis.snapshot import cached_catalog, read_meta, snapshot_dir, source_key, write_arrays
+
+SEARCH_VERSION = 1
+FACETS = ('degree', 'language', 'type', 'state')
+# BM25 term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+_WORD = re.compile(r'\w+')
+STOPWORDS = frozenset('a an and as at by for from in into of on or the to with '
+                      'und der die das des mit für im von zu'.split())
+
+DEGREE_ALIASES = {
+    'BA': 'Bachelor of Arts', 'MA': 'Master of Arts',
+    'BFA': 'Bachelor of Fine Arts', 'MFA': 'Master of Fine Arts',
+    'BSc': 'Bachelor of Science', 'MSc': 'Master of Science',
+    'BMus': 'Bachelor of Music', 'MMus': 'Master of Music',
+    'BEng': 'Bachelor of Engineering', 'MEd': 'Master of Education',
+    'MArch': 'Master of Architecture',
+}
+_ALIASES = {alias.upper(): degree for alias, degree in DEGREE_ALIASES.items()}
+
+_MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+           'august', 'september', 'october', 'november', 'december')
+_MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_MONTH_START = np.cumsum((0,) + _MONTH_DAYS[:-1]).tolist()
+
+
+def tokenize(text):
+    """Lower-cased words of a text, without one-letter words and stopwords"""
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def _month(word):
+    word = word.lower()
+    for i, month in enumerate(_MONTHS):
+        if len(word) >= 3 and month.startswith(word):
+            return i
+    return None
+
+
+def day_of_year(text, end_of_month=False):
+    """Day of a non-leap year (1-365) for '15 January', 'January 15' or a bare month
+
+    A bare month is its first day, or its last with `end_of_month`; -1 when
+    the text is not a date.
+    """
+    if not text:
+        return -1
+    parts = text.replace(',', ' ').replace('.', ' ').split()
+    months = [m for m in map(_month, parts) if m is not None]
+    days = [int(p) for p in parts if p.isdigit()]
+    if len(months) != 1 or len(days) > 1:
+        return -1
+    month = months[0]
+    day = days[0] if days else (_MONTH_DAYS[month] if end_of_month else 1)
+    return _MONTH_START[month] + min(max(day, 1), _MONTH_DAYS[month])
+
+
+def _matches(facet, wanted, value):
+    """Facet filter test: equal ignoring case, one '/'-separated part equal, or a degree abbreviation"""
+    if value is None:
+        return False
+    if facet == 'degree':
+        wanted = _ALIASES.get(wanted.upper().replace('.', ''), wanted)
+    wanted, value = wanted.casefold(), value.casefold()
+    return wanted == value or wanted in (part.strip() for part in value.split('/'))
+
+
+def _token_csr(texts, vocabulary):
+    """CSR (indptr, term ids) of the words of every text, interning new words into `vocabulary`"""
+    return _csr([[vocabulary.setdefault(word, len(vocabulary)) for word in tokenize(text)] if text else []
+                 for text in texts])
+
+
+def index_dir(path, cache_dir=None):
+    """Search index directory for a data file, next to its catalog snapshot"""
+    return snapshot_dir(path, cache_dir) + '-search'
+
+
+class ProgramSearch:
+    """BM25 text index plus facet columns over every program of a catalog"""
+
+    def __init__(self, catalog, arrays, meta):
+        self.catalog = catalog
+        self.arrays = arrays
+        self.terms = {term: i for i, term in enumerate(meta['terms'])}
+        self.facet_values = meta['facets']
+        self.deadline_terms = meta['deadline_terms']
+        self.avgdl = meta['avgdl']
+        self.count = meta['programs']
+
+    @classmethod
+    @traced('search.build')
+    def build(cls, catalog):
+        """Index the program table of a Catalog"""
+        programs = catalog.programs
+        vocabulary = {}
+        texts = {}
+        description_ids = np.asarray([texts.setdefault(text, len(texts)) for text in programs.descriptions],
+                                     dtype=np.int64)
+        count = len(description_ids)
+        program = np.arange(count)
+        spec_owner = np.repeat(program, np.diff(programs.spec_offsets))
+
+        # Each distinct name, specialization and description is tokenized once,
+        # then spread over the programs using it
+        docs, words = [], []
+        for owners, codes, vocabulary_texts in (
+                (program, programs.codes['name'], programs.categories['name']),
+                (spec_owner, programs.spec_codes, programs.specializations),
+                (program, description_ids, list(texts))):
+            indptr, term_ids = _token_csr(vocabulary_texts, vocabulary)
+            found, lengths = _gather(indptr, term_ids, codes)
+            docs.append(np.repeat(owners, lengths))
+            words.append(found.astype(np.int64))
+        docs, words = np.concatenate(docs), np.concatenate(words)
+        width = max(len(vocabulary), 1)
+
+        # (program, term) frequencies by sorting, then posting lists in term order
+        keys = np.sort(docs * width + words)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        tf = np.diff(np.r_[starts, len(keys)])
+        doc, term = keys[starts] // width, keys[starts] % width
+        order = np.argsort(term, kind='stable')
+        post_indptr = np.zeros(width + 1, dtype=np.int64)
+        post_indptr[1:] = np.cumsum(np.bincount(term, minlength=width))
+        doc_length = np.bincount(docs, minlength=count)
+        avgdl = float(doc_length.mean()) if count else 0.0
+        # Everything in a BM25 term weight but the query is known now: store the
+        # weight of every posting, idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        df = np.diff(post_indptr)[term]
+        idf = np.log(1 + (count - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * doc_length[doc] / max(avgdl, 1e-9))
+        impact = idf * tf * (K1 + 1) / (tf + norm)
+
+        school = programs.school
+        facet_values = {'degree': programs.categories['degree'], 'language': programs.categories['language'],
+                       'type': catalog.categories['type'], 'state': catalog.categories['state']}
+        arrays = {
+            'text.post_indptr': post_indptr,
+            'text.post_docs': doc[order].astype(np.int32),
+            'text.post_impact': impact[order].astype(np.float32),
+            'programs.school': school,
+            'facet.degree': np.asarray(programs.codes['degree'], dtype=np.int32),
+            'facet.language': np.asarray(programs.codes['language'], dtype=np.int32),
+            'facet.type': np.asarray(catalog.codes['type'], dtype=np.int32)[school],
+            'facet.state': np.asarray(catalog.codes['state'], dtype=np.int32)[school],
+        }
+        for facet in FACETS:
+            codes = arrays[f'facet.{facet}']
+            arrays[f'facet_total.{facet}'] = np.bincount(codes[codes >= 0], minlength=len(facet_values[facet]))
+        days = np.asarray([day_of_year(d) for d in programs.deadline_dates] + [-1], dtype=np.int16)
+        for term, (opens, closes) in programs.deadlines.items():
+            arrays[f'deadline.{term}.opens'] = days[np.asarray(opens)]  # code -1 reads the trailing -1
+            arrays[f'deadline.{term}.closes'] = days[np.asarray(closes)]
+        meta = {
+            'version': SEARCH_VERSION,
+            'programs': count,
+            'terms': list(vocabulary),
+            'facets': facet_values,
+            'deadline_terms': list(programs.deadlines),
+            'avgdl': avgdl,
+        }
+        return cls(catalog, arrays, meta), meta
+
+    @classmethod
+    @traced('search.load')
+    def load(cls, directory, catalog, meta=None):
+        """Open a saved index with every array memory-mapped read-only"""
+        meta = meta or read_meta(directory)
+        stems = [name[:-4] for name in os.listdir(directory) if name.endswith('.npy')]
+        # Plain ndarray views of the maps: np.memmap indexing adds per-call overhead
+        arrays = {stem: np.asarray(np.load(os.path.join(directory, f'{stem}.npy'), mmap_mode='r')) for stem in stems}
+        return cls(catalog, arrays, meta)
+
+    def scores(self, text):
+        """BM25 score of every program for the words of `text` (0 where none occurs)"""
+        scores = np.zeros(self.count)
+        indptr = self.arrays['text.post_indptr']
+        for term in sorted({self.terms[w] for w in tokenize(text) if w in self.terms}):
+            lo, hi = int(indptr[term]), int(indptr[term + 1])
+            # A program appears once per posting list, so plain fancy-index addition is exact
+            scores[self.arrays['text.post_docs'][lo:hi]] += self.arrays['text.post_impact'][lo:hi]
+        return scores
+
+    def mask(self, degree=None, language=None, type=None, state=None, term=None,
+             opens_after=None, opens_before=None, closes_after=None, closes_before=None):
+        """Programs passing every given facet filter
+
+        Facet filters take one value or a list (any of them); deadline bounds
+        are dates ('31 March', 'March') or days of the year, compared strictly,
+        on the given deadline term or on any term.
+        """
+        keep = np.ones(self.count, dtype=bool)
+        for facet, wanted in zip(FACETS, (degree, language, type, state)):
+            if wanted is None:
+                continue
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            values = self.facet_values[facet]
+            allowed = np.zeros(len(values) + 1, dtype=bool)  # the last slot catches code -1 (missing)
+            allowed[:len(values)] = [any(_matches(facet, w, v) for w in wanted) for v in values]
+            keep &= allowed[self.arrays[f'facet.{facet}']]
+
+        bounds = [(bound, field, op) for bound, field, op in (
+            (opens_after, 'opens', np.greater), (opens_before, 'opens', np.less),
+            (closes_after, 'closes', np.greater), (closes_before, 'closes', np.less)) if bound is not None]
+        if term is None and not bounds:
+            return keep
+        terms = self.deadline_terms if term is None else [term] if term in self.deadline_terms else []
+        deadline = np.zeros(self.count, dtype=bool)
+        for name in terms:
+            window = self.arrays[f'deadline.{name}.closes'] >= 0
+            for bound, field, op in bounds:
+                day = bound if isinstance(bound, int) else day_of_year(bound, end_of_month=op is np.greater)
+                if day < 0:
+                    raise ValueError(f"not a date: {bound!r}")
+                window &= op(self.arrays[f'deadline.{name}.{field}'], day)
+            deadline |= window
+        return keep & deadline
+
+    def facet_counts(self, programs):
+        """{facet: {value: programs}} over a sorted set of program ids, most common first"""
+        # Broad matches are counted as the catalog totals minus the programs left out
+        complement = len(programs) > self.count // 2
+        if complement:
+            keep = np.ones(self.count, dtype=bool)
+            keep[programs] = False
+            programs = np.flatnonzero(keep)
+        counts = {}
+        for facet in FACETS:
+            # Shifted by one so missing values (-1) land in a slot that is dropped
+            found = np.bincount(self.arrays[f'facet.{facet}'][programs] + 1,
+                                minlength=len(self.facet_values[facet]) + 1)[1:]
+            if complement:
+                found = self.arrays[f'facet_total.{facet}'] - found
+            order = np.lexsort((np.arange(len(found)), -found))
+            counts[facet] = {self.facet_values[facet][c]: int(found[c]) for c in order.tolist() if found[c]}
+        return counts
+
+    def describe(self, program, score=None):
+        """Plain dict of one program and its school"""
+        programs = self.catalog.programs
+        school = int(self.arrays['programs.school'][program])
+        result = {
+            'school': self.catalog.names[school],
+            'program': programs.categories['name'][programs.codes['name'][program]],
+            'degree': programs.categories['degree'][programs.codes['degree'][program]],
+            'language': programs.categories['language'][programs.codes['language'][program]],
+            'type': self.catalog.category('type', school),
+            'state': self.catalog.category('state', school),
+            'deadlines': {term: [programs.deadline_dates[c] if c >= 0 else None
+                                 for c in (programs.deadlines[term][0][program], programs.deadlines[term][1][program])]
+                          for term in self.deadline_terms if programs.deadlines[term][1][program] >= 0},
+        }
+        if score is not None:
+            result['score'] = round(float(score), 4)
+        return result
+
+    def search(self, text='', limit=10, facets=True, **filters):
+        """Best `limit` programs for a text query under facet filters (see mask())
+
+        Text queries rank by BM25 and only match programs containing a query
+        word; without text every program passing the filters matches, in
+        catalog order. Returns {'total', 'results', 'facets'}.
+        """
+        with span('search.query'):
+            keep = self.mask(**filters)
+            if tokenize(text):
+                scores = self.scores(text)
+                keep &= scores > 0
+                # Integer gathers are much cheaper than boolean ones on large masks
+                matched = np.flatnonzero(keep)
+                # Ranked among the matches only; ascending ids keep ties in catalog order
+                best, values = select_top_k(scores[matched], limit)
+                hits = [(p, s) for p, s in zip(matched[best[0][best[0] >= 0]].tolist(), values[0].tolist())]
+            else:
+                matched = np.flatnonzero(keep)
+                hits = [(p, None) for p in matched[:limit].tolist()]
+            return {
+                'total': len(matched),
+                'results': [self.describe(p, s) for p, s in hits],
+                'facets': self.facet_counts(matched) if facets else {},
+            }
+
+
+def program_search(path=DATA_PATH, cache_dir=None, catalog=None):
+    """ProgramSearch for a data file, from a fresh saved index when possible, rebuilding it otherwise
+
+    Pass `catalog` to reuse an already loaded Catalog of the same file.
+    """
+    catalog = catalog if catalog is not None else cached_catalog(path, cache_dir)
+    directory = index_dir(path, cache_dir)
+    key = source_key(path)
+    if os.path.isfile(os.path.join(directory, 'meta.json')):
+        meta = read_meta(directory)
+        if meta.get('version') == SEARCH_VERSION and meta.get('source') == key:
+            return ProgramSearch.load(directory, catalog, meta)
+
+    search, meta = ProgramSearch.build(catalog)
+    try:
+        write_arrays(directory, search.arrays, dict(meta, source=key))
+    except OSError:
+        return search  # read-only checkout: keep working without a saved index
+    return ProgramSearch.load(directory, catalog)
+
+
+_DEADLINE = re.compile(r'\b(winter|summer)(?:\s+semester|\s+term)?\s+(?:application\s+)?deadlines?'
+                       r'(?:\s+(after|before)\s+((?:\d{1,2}\s+)?[a-z]+(?:\s+\d{1,2})?))?', re.IGNORECASE)
+_FILLER = frozenset('program programs course courses degree degrees study studies taught'.split())
+
+
+def parse_query(text, search):
+    """Split a free-text question into (words to rank by, facet filters)
+
+    Recognizes '<Language>-language' and 'taught in <Language>', degree
+    abbreviations (MFA, BA, ...) and full degree names, state names, and
+    '<winter|summer> deadline(s) [after|before <date or month>]'.
+    """
+    filters = {}
+
+    def take(pattern, facet, value, flags=re.IGNORECASE):
+        """Cut every match of `pattern` out of the text, filtering `facet` on `value`"""
+        nonlocal text
+        match = re.search(pattern, text, flags)
+        while match:
+            if value not in filters.setdefault(facet, []):
+                filters[facet].append(value)
+            text = text[:match.start()] + ' ' + text[match.end():]
+            match = re.search(pattern, text, flags)
+
+    match = _DEADLINE.search(text)
+    if match:
+        filters['term'] = match.group(1).lower()
+        if match.group(2):
+            filters['closes_after' if match.group(2).lower() == 'after' else 'closes_before'] = match.group(3)
+        text = text[:match.start()] + ' ' + text[match.end():]
+
+    languages = sorted({part.strip() for value in search.facet_values['language'] if value
+                        for part in value.split('/')}, key=len, reverse=True)
+    for language in languages:
+        take(rf'\b{re.escape(language)}(?:[- ]language| ?-?taught)\b|\btaught in {re.escape(language)}\b',
+             'language', language)
+
+    degrees = sorted((v for v in search.facet_values['degree'] if v), key=len, reverse=True)
+    for degree in degrees:
+        take(rf'\b{re.escape(degree)}\b', 'degree', degree)
+    for alias in DEGREE_ALIASES:
+        # Abbreviations only count as written ('MFA', 'M.F.A.', 'MSc'), so 'ma' or 'march' stay text
+        take(r'(?<![\w.])' + r'\.?'.join(alias) + r'\.?(?!\w)', 'degree', alias, flags=0)
+
+    states = sorted((v for v in search.facet_values['state'] if v), key=len, reverse=True)
+    for state in states:
+        take(rf'\b{re.escape(state)}\b', 'state', state)
+
+    words = [w for w in tokenize(text) if w not in _FILLER]
+    return ' '.join(words), filters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search programs by text with degree, language, type, state and deadline facets")
+    parser.add_argument('query', nargs='?', default='', help="free text; facets in it are recognized unless --literal")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--literal', action='store_true', help="rank by the whole query, no facet parsing")
+    parser.add_argument('--limit', type=int, default=10)
+    for facet in FACETS:
+        parser.add_argument(f'--{facet}', action='append')
+    parser.add_argument('--term', help="deadline term (winter, summer)")
+    for bound in ('opens-after', 'opens-before', 'closes-after', 'closes-before'):
+        parser.add_argument(f'--{bound}', help="date such as '31 March' or a month")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the saved index first")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.rebuild:
+        shutil.rmtree(index_dir(args.data), ignore_errors=True)
+    search = program_search(args.data)
+    loaded = time.perf_counter() - start
+
+    text, filters = (args.query, {}) if args.literal else parse_query(args.query, search)
+    for name in FACETS + ('term', 'opens_after', 'opens_before', 'closes_after', 'closes_before'):
+        if getattr(args, name) is not None:
+            filters[name] = getattr(args, name)
+    start = time.perf_counter()
+    try:
+        found = search.search(text, args.limit, **filters)
+    except ValueError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - start
+
+    print(f"📚 {search.count} programs indexed (opened in {loaded * 1e3:.1f} ms)")
+    shown = ', '.join(f"{name}={value}" for name, value in filters.items())
+    print(f"🔎 text {text!r}" + (f", filters {shown}" if shown else ""))
+    print(f"✅ {found['total']} programs match ({elapsed * 1e3:.2f} ms)")
+    for i, result in enumerate(found['results'], 1):
+        deadlines = '; '.join(f"{term} {start}–{end}" for term, (start, end) in result['deadlines'].items())
+        score = f"  [{result['score']:.2f}]" if 'score' in result else ''
+        print(f"{i:2d}. {result['program']} ({result['degree']}, {result['language']}) — {result['school']}, "
+              f"{result['state']}{score}")
+        if deadlines:
+            print(f"    Deadlines: {deadlines}")
+    for facet, counts in found['facets'].items():
+        top = ', '.join(f"{value} ({n})" for value, n in list(counts.items())[:5])
+        if top:
+            print(f"   {facet}: {top}")
+
+
+if __name__ == "__main__":
+    main()
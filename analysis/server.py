@@ -0,0 +1,421 @@
+"""
+Local query server over a resident catalog
+
+Instead of re-running a script from `json.load` for every question, the
+server keeps the catalog, the similarity engine and
+the stored neighbour lists (analysis.incremental) in memory and answers
+small JSON queries over HTTP on localhost:
+
+    GET /neighbors?name=...&k=10&profile=d3&min_score=2
+    GET /rank?field=students&k=5&order=desc&type=kunsthochschule&state=Berlin
+    GET /aggregate?metric=employment&k=5      (the feature-report reducers)
+    GET /summary?field=acceptance_rate&by=state
+    GET /clusters?profile=3d-clustering
+    GET /search?q=media+art&language=English&term=winter&closes_after=March
+    GET /status
+
+Responses are cached as encoded bytes in a bounded LRU keyed by (dataset
+version, endpoint, parameters). The version is the data file's size and
+mtime, checked on every request; when it changes the cache is dropped and
+the dataset reloaded once: the file is parsed once and the neighbour state is
+patched incrementally from that same parse where possible. Cache hits are answered on the event loop;
+misses run on a single worker thread so NumPy work never blocks other
+clients, and identical misses in flight are computed once.
+
+    python -m analysis.server --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from analysis.aggregate import aggregate, enhanced_reducers
+from analysis.catalog import CATEGORICAL_FIELDS, DATA_PATH, NUMERIC_FIELDS
+from analysis.incremental import DEFAULT_PROFILES, K_MAX, read_source, refresh, school_keys
+from analysis.instrument import count, span
+from analysis.neighbors import NeighborIndex
+from analysis.search import FACETS, parse_query, program_search
+from analysis.similarity import SimilarityEngine, get_profile
+from analysis.snapshot import source_key
+
+HOST = '127.0.0.1'
+PORT = 8765
+CACHE_SIZE = 4096
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class QueryError(Exception):
+    """A request the service cannot answer, with the HTTP status to report"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry
+
+    Thread-safe: the event loop reads while the worker thread fills and clears.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _int(params, key, default, low=0, high=10_000):
+    try:
+        value = int(params.get(key, default))
+    except ValueError:
+        raise QueryError(400, f"{key} must be an integer")
+    if not low <= value <= high:
+        raise QueryError(400, f"{key} must be between {low} and {high}")
+    return value
+
+
+def _float(params, key):
+    if key not in params:
+        return None
+    try:
+        return float(params[key])
+    except ValueError:
+        raise QueryError(400, f"{key} must be a number")
+
+
+def _choice(params, key, choices, default=None):
+    value = params.get(key, default)
+    if value not in choices:
+        raise QueryError(400, f"{key} must be one of {sorted(choices)}")
+    return value
+
+
+class Dataset:
+    """Everything loaded for one version of the data file"""
+
+    def __init__(self, path, version, profiles, k_max, state_dir=None, cache_dir=None):
+        self.path = path
+        self.version = version
+        self.cache_dir = cache_dir
+        with span('server.load', path=path):
+            catalog, fingerprints = read_source(path)
+            state, _ = refresh(path, state_dir, profiles, k_max, source=(catalog, fingerprints))
+            if state.keys != school_keys(catalog):
+                raise RuntimeError(f"neighbour state for {path} does not match its catalog rows")
+            self.catalog = catalog
+            self.engine = SimilarityEngine(self.catalog, profiles)
+        self.state = state
+        # The stored lists share the catalog's row order; attach the engine so k > k_max scans live
+        self.indexes = {profile: NeighborIndex(self.catalog.names, state.results[profile].neighbors,
+                                               state.results[profile].neighbor_scores, self.engine, get_profile(profile))
+                        for profile in state.profiles}
+        self.aggregates = {}
+        self.program_search = None
+        self.loaded = time.time()
+
+    def aggregate(self, k):
+        """Feature-report results for top-k size `k` (one streaming pass per k)"""
+        if k not in self.aggregates:
+            self.aggregates[k] = aggregate(self.path, enhanced_reducers(k)).to_dict()
+        return self.aggregates[k]
+
+    def programs(self):
+        """The program search index, opened (or built) on first use"""
+        if self.program_search is None:
+            self.program_search = program_search(self.path, self.cache_dir, self.catalog)
+        return self.program_search
+
+    def mask(self, params):
+        """Rows matching the categorical filters (type, state, city)"""
+        keep = np.ones(len(self.catalog), dtype=bool)
+        for field in CATEGORICAL_FIELDS:
+            if field in params:
+                categories = self.catalog.categories[field]
+                code = categories.index(params[field]) if params[field] in categories else -2
+                keep &= self.catalog.codes[field] == code
+        return keep
+
+
+class QueryService:
+    """Synchronous query logic and the response cache; the server adds the transport"""
+
+    def __init__(self, path=DATA_PATH, profiles=DEFAULT_PROFILES, k_max=K_MAX, cache_size=CACHE_SIZE,
+                 state_dir=None, cache_dir=None):
+        self.path = path
+        self.profiles = [get_profile(p).name for p in profiles]
+        self.k_max = k_max
+        self.state_dir = state_dir    # analysis.incremental state root (default .cache/state)
+        self.cache_dir = cache_dir    # snapshot root (default .cache/snapshots)
+        self.cache = LRUCache(cache_size)
+        self.dataset = None
+        self.reloads = 0
+        self.endpoints = {
+            'neighbors': self.neighbors,
+            'rank': self.rank,
+            'aggregate': self.aggregate,
+            'summary': self.summary,
+            'clusters': self.clusters,
+            'search': self.search,
+            'status': self.status,
+        }
+
+    def version(self):
+        """Current version of the data file: size and mtime (ns)"""
+        size, mtime = source_key(self.path)
+        return f"{size}-{mtime}"
+
+    def current(self, version):
+        """The dataset for `version`, reloading (and dropping the cache) when the file changed"""
+        if self.dataset is None or self.dataset.version != version:
+            self.cache.clear()
+            self.dataset = Dataset(self.path, version, self.profiles, self.k_max, self.state_dir, self.cache_dir)
+            self.reloads += 1
+        return self.dataset
+
+    @staticmethod
+    def key(version, endpoint, params):
+        return version, endpoint, tuple(sorted(params.items()))
+
+    def execute(self, endpoint, params, version=None):
+        """Encoded JSON response of one query, from the cache or computed"""
+        version = version or self.version()
+        body = self.cache.get(self.key(version, endpoint, params))
+        return body if body is not None else self.compute(endpoint, params, version)
+
+    def compute(self, endpoint, params, version):
+        """Answer a query that missed the cache and cache the encoded response"""
+        if endpoint not in self.endpoints:
+            raise QueryError(404, f"Unknown endpoint /{endpoint}; expected one of {sorted(self.endpoints)}")
+        with span('server.query', endpoint=endpoint):
+            result = self.endpoints[endpoint](self.current(version), params)
+        count('queries_computed')
+        body = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        if endpoint != 'status':
+            self.cache.put(self.key(version, endpoint, params), body)
+        return body
+
+    def query(self, endpoint, **params):
+        """Decoded result of one query (for use from Python)"""
+        return json.loads(self.execute(endpoint, {k: str(v) for k, v in params.items()}))
+
+    def neighbors(self, dataset, params):
+        name = params.get('name')
+        if name not in dataset.catalog.index:
+            raise QueryError(404, f"Unknown school {name!r}")
+        profile = _choice(params, 'profile', set(dataset.indexes), self.profiles[0])
+        k = _int(params, 'k', 10, 1, len(dataset.catalog))
+        found = dataset.indexes[profile].neighbors(name, k, _float(params, 'min_score'))
+        return {'name': name, 'profile': profile, 'neighbors': [{'name': n, 'score': s} for n, s in found]}
+
+    def rank(self, dataset, params):
+        field = _choice(params, 'field', set(NUMERIC_FIELDS))
+        order = _choice(params, 'order', {'asc', 'desc'}, 'desc')
+        k = _int(params, 'k', 5, 1)
+        values, present = dataset.catalog.column(field)
+        keep = present & dataset.mask(params)
+        low, high = _float(params, 'min'), _float(params, 'max')
+        if low is not None:
+            keep &= values >= low
+        if high is not None:
+            keep &= values <= high
+        rows = np.flatnonzero(keep)
+        # Stable: equal values keep file order, as the script rankings do
+        rows = rows[np.argsort(-values[rows] if order == 'desc' else values[rows], kind='stable')][:k]
+        catalog = dataset.catalog
+        cast = int if field in catalog.integer_fields else float
+        return {'field': field, 'order': order, 'matches': int(keep.sum()), 'results': [
+            dict({'name': catalog.names[i], field: cast(values[i])},
+                 **{f: catalog.category(f, i) for f in CATEGORICAL_FIELDS})
+            for i in rows.tolist()]}
+
+    def aggregate(self, dataset, params):
+        k = _int(params, 'k', 5, 1, 1000)
+        result = dataset.aggregate(k)
+        if 'metric' not in params:
+            return result
+        metric = _choice(params, 'metric', set(result['metrics']))
+        return {'metric': metric, 'results': result['metrics'][metric]}
+
+    def summary(self, dataset, params):
+        field = _choice(params, 'field', set(NUMERIC_FIELDS))
+        by = _choice(params, 'by', set(CATEGORICAL_FIELDS), 'type')
+        values, present = dataset.catalog.column(field)
+        keep = present & dataset.mask(params) & (dataset.catalog.codes[by] >= 0)
+        codes, values = dataset.catalog.codes[by][keep], values[keep]
+        groups = len(dataset.catalog.categories[by])
+        cast = int if field in dataset.catalog.integer_fields else float
+        counts = np.bincount(codes, minlength=groups)
+        sums = np.bincount(codes, values, minlength=groups)
+        lows = np.full(groups, np.inf)
+        highs = np.full(groups, -np.inf)
+        np.minimum.at(lows, codes, values)
+        np.maximum.at(highs, codes, values)
+        return {'field': field, 'by': by, 'groups': [
+            {by: dataset.catalog.categories[by][g], 'count': int(counts[g]), 'mean': sums[g] / counts[g],
+             'min': cast(lows[g]), 'max': cast(highs[g])}
+            for g in np.flatnonzero(counts).tolist()]}
+
+    def clusters(self, dataset, params):
+        profile = _choice(params, 'profile', set(dataset.indexes), self.profiles[-1])
+        return {'profile': profile, 'clusters': {str(label): names for label, names in
+                                                 sorted(dataset.state.clusters(profile).items())}}
+
+    def search(self, dataset, params):
+        index = dataset.programs()
+        limit = _int(params, 'limit', 10, 1, 100)
+        query = params.get('q', '')
+        text, filters = (query, {}) if params.get('literal') == '1' else parse_query(query, index)
+        for name in FACETS + ('term', 'opens_after', 'opens_before', 'closes_after', 'closes_before'):
+            if name in params:
+                filters[name] = params[name]
+        try:
+            found = index.search(text, limit, **filters)
+        except ValueError as error:
+            raise QueryError(400, str(error))
+        return dict({'query': text, 'filters': filters}, **found)
+
+    def status(self, dataset, params):
+        return {'path': self.path, 'version': dataset.version, 'schools': len(dataset.catalog),
+                'profiles': self.profiles, 'loaded': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(dataset.loaded)),
+                'reloads': self.reloads, 'cache': {'entries': len(self.cache), 'capacity': self.cache.maxsize,
+                                                   'hits': self.cache.hits, 'misses': self.cache.misses}}
+
+
+class QueryServer:
+    """Minimal asyncio HTTP/1.1 front end (GET only, keep-alive) for a QueryService"""
+
+    def __init__(self, service, host=HOST, port=PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='query')
+        self.inflight = {}
+        self.server = None
+
+    async def respond(self, endpoint, params):
+        """(status, body, cache state) of one request"""
+        service = self.service
+        try:
+            version = service.version()
+        except OSError as e:
+            return 500, json.dumps({'error': f"Cannot read the dataset: {e}"}).encode('utf-8'), 'error'
+        key = service.key(version, endpoint, params)
+        body = service.cache.get(key)
+        if body is not None:
+            return 200, body, 'hit'
+        future = self.inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.worker, service.compute, endpoint, params, version)
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        try:
+            return 200, await asyncio.shield(future), 'miss'
+        except QueryError as e:
+            return e.status, json.dumps({'error': str(e)}).encode('utf-8'), 'error'
+        except Exception as e:  # keep serving other clients
+            return 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode('utf-8'), 'error'
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                method, target, protocol = (lines[0].split(' ') + ['', ''])[:3]
+                headers = dict(line.split(':', 1) for line in lines[1:] if ':' in line)
+                headers = {k.strip().lower(): v.strip() for k, v in headers.items()}
+                if method != 'GET':
+                    status, body, state = 405, b'{"error": "Only GET is supported"}', 'error'
+                else:
+                    url = urlsplit(target)
+                    status, body, state = await self.respond(url.path.strip('/') or 'status', dict(parse_qsl(url.query)))
+                keep_alive = headers.get('connection', '').lower() != 'close' and protocol == 'HTTP/1.1'
+                writer.write((f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                              f"Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(body)}\r\n"
+                              f"X-Cache: {state}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Load the dataset and start listening; returns the asyncio server"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.worker, lambda: self.service.current(self.service.version()))
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.worker.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve similarity and ranking queries over a resident catalog")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help="cached responses kept (LRU)")
+    parser.add_argument('--profiles', nargs='+', default=list(DEFAULT_PROFILES))
+    args = parser.parse_args()
+
+    service = QueryService(os.path.abspath(args.data), args.profiles, cache_size=args.cache_size)
+    server = QueryServer(service, args.host, args.port)
+    print(f"🚀 Serving {args.data} on http://{args.host}:{args.port} (try /status, /neighbors?name=...)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("👋 Stopped")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Vectorized similarity engine for the enhanced German art schools dataset
+
+Encodes every university once into NumPy arrays and scores whole blocks of
+anchors against the full catalog. The weights, windows and thresholds live in
+named scoring profiles ("d3" for analyze_bremen_connections, "3d-clustering"
+for test_3d_clustering, or custom ones); several profiles are evaluated in a
+single fused pass that computes the shared terms only once.
+"""
+
+import numpy as np
+
+from analysis.catalog import Catalog
+from analysis.geo import haversine_km
+from analysis.instrument import active, count, span
+from analysis.inverted import TokenIndex
+
+FACTORS = ('programs', 'specializations', 'ranking', 'students', 'selectivity', 'type', 'geography')
+
+# Raw pairwise term each factor is derived from
+FACTOR_TERMS = {
+    'programs': 'shared_programs',
+    'specializations': 'shared_specializations',
+    'ranking': 'ranking_diff',
+    'students': 'student_ratio',
+    'selectivity': 'acceptance_diff',
+    'type': 'same_type',
+    'geography': 'distance',
+}
+
+
+class ScoringProfile:
+    """Weights, windows and connection threshold of one similarity variant
+
+    Windowed factors (ranking, selectivity, geography) fall off linearly from
+    the full weight at a difference of 0 to nothing at the window edge; the
+    geography window is in great-circle kilometres.
+    """
+
+    def __init__(self, name, program_weight=3.0, specialization_weight=2.0,
+                 ranking_weight=1.5, ranking_window=20,
+                 student_weight=1.0, student_min_ratio=0.4,
+                 selectivity_weight=1.2, selectivity_window=0.3,
+                 type_weight=2.0, geo_weight=0.0, geo_window=400.0,
+                 threshold=1.0, inclusive=False):
+        self.name = name
+        self.program_weight = program_weight
+        self.specialization_weight = specialization_weight
+        self.ranking_weight = ranking_weight
+        self.ranking_window = ranking_window
+        self.student_weight = student_weight
+        self.student_min_ratio = student_min_ratio
+        self.selectivity_weight = selectivity_weight
+        self.selectivity_window = selectivity_window
+        self.type_weight = type_weight
+        self.geo_weight = geo_weight
+        self.geo_window = geo_window
+        self.threshold = threshold
+        self.inclusive = inclusive
+
+    def components(self, include_zero=False):
+        """(factor, component key, weight) for every factor with a non-zero weight (or every factor)"""
+        entries = [
+            ('programs', ('programs',), self.program_weight),
+            ('specializations', ('specializations',), self.specialization_weight),
+            ('ranking', ('ranking', self.ranking_window), self.ranking_weight),
+            ('students', ('students', self.student_min_ratio), self.student_weight),
+            ('selectivity', ('selectivity', self.selectivity_window), self.selectivity_weight),
+            ('type', ('type',), self.type_weight),
+            ('geography', ('geography', self.geo_window), self.geo_weight),
+        ]
+        return [entry for entry in entries if entry[2] or include_zero]
+
+    def passes(self, scores):
+        """Mask of scores that count as a connection under this profile"""
+        mask = scores >= self.threshold if self.inclusive else scores > self.threshold
+        if active():
+            count('pairs_passing', int(np.count_nonzero(mask)))
+        return mask
+
+    def __repr__(self):
+        return f"ScoringProfile({self.name!r})"
+
+
+PROFILES = {
+    # analyze_bremen_connections.calculate_similarity
+    'd3': ScoringProfile('d3'),
+    # test_3d_clustering.test_bremen_connections
+    '3d-clustering': ScoringProfile(
+        '3d-clustering', specialization_weight=4.0, ranking_window=10,
+        student_min_ratio=0.5, selectivity_weight=1.0, selectivity_window=0.2,
+        # 400 km replaces the old 5-degree Euclidean window over raw lat/lng
+        geo_weight=1.0, geo_window=400.0, threshold=3.0, inclusive=True,
+    ),
+}
+
+
+def register_profile(profile):
+    """Make a custom profile available by name"""
+    PROFILES[profile.name] = profile
+    return profile
+
+
+def get_profile(profile):
+    """Resolve a profile name (or pass a ScoringProfile through)"""
+    return profile if isinstance(profile, ScoringProfile) else PROFILES[profile]
+
+
+class EncodedCatalog:
+    """Similarity inputs for every school, taken from the columnar Catalog
+
+    Falsy values (0, missing) count as missing, mirroring the `if a and b`
+    checks of the original per-pair code.
+    """
+
+    NUMERIC = ('ranking', 'students', 'acceptance_rate', 'lat', 'lng')
+
+    def __init__(self, catalog):
+        if not isinstance(catalog, Catalog):
+            catalog = Catalog.from_universities(catalog)
+        self.source = catalog
+        self.names = catalog.names
+        self.index = catalog.index
+
+        with span('encode.token_sets'):
+            self.programs = TokenIndex.from_documents(*catalog.programs.school_token_sets('name'))
+            self.specializations = TokenIndex.from_documents(*catalog.programs.school_token_sets('specializations'))
+        self.types = catalog.categories['type']
+        self.type_codes = catalog.codes['type']
+        for field in self.NUMERIC:
+            values, present = catalog.column(field)
+            setattr(self, field, np.where(present & (values != 0), values, np.nan))
+
+    def arrays(self):
+        """Every array the scoring reads, keyed by a flat name"""
+        arrays = {field: getattr(self, field) for field in self.NUMERIC}
+        arrays['type_codes'] = self.type_codes
+        for field in ('programs', 'specializations'):
+            for part, array in zip(TokenIndex.ARRAYS, getattr(self, field).arrays()):
+                arrays[f'{field}.{part}'] = array
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, names=None, types=None):
+        """Rebuild from arrays() output; names and labels are optional for pure scoring"""
+        encoded = cls.__new__(cls)
+        encoded.source = None
+        encoded.names = names
+        encoded.index = {name: i for i, name in enumerate(names)} if names is not None else None
+        encoded.types = types
+        for field in cls.NUMERIC:
+            setattr(encoded, field, arrays[field])
+        encoded.type_codes = arrays['type_codes']
+        for field in ('programs', 'specializations'):
+            setattr(encoded, field, TokenIndex.from_arrays(*(arrays[f'{field}.{part}'] for part in TokenIndex.ARRAYS)))
+        return encoded
+
+    def __len__(self):
+        return len(self.type_codes)
+
+
+def _auto_block_size(n, budget=4_000_000):
+    """Rows per tile so a single len(rows) x N float64 array stays around 32 MB"""
+    return max(1, budget // max(n, 1))
+
+
+def threshold_edges(rows, scores, profile, in_block=None):
+    """(lo, hi, score) for the pairs of a score block that pass `profile`
+
+    Each undirected pair is reported once with lo < hi. By default only
+    columns above the row are kept, which covers everything when tiles span
+    the whole catalog. For an arbitrary subset of rows, pass `in_block`, a
+    column mask of the schools that are rows of this block, so pairs with
+    schools outside it are kept on both sides of the diagonal.
+    """
+    cols = np.arange(scores.shape[1])
+    passes = profile.passes(scores)
+    keep = passes & (cols[None, :] > rows[:, None])
+    if in_block is not None:
+        keep |= passes & (cols[None, :] < rows[:, None]) & ~in_block[None, :]
+    r, c = np.nonzero(keep)
+    lo, hi = np.minimum(rows[r], c), np.maximum(rows[r], c)
+    return lo.astype(np.int32), hi.astype(np.int32), scores[r, c]
+
+
+def _concat_edges(parts):
+    if not parts:
+        return np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float64)
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+class SimilarityEngine:
+    """Batched replacement for calling a per-pair similarity function N² times"""
+
+    def __init__(self, universities, profiles=('d3',)):
+        self.catalog = universities if isinstance(universities, EncodedCatalog) else EncodedCatalog(universities)
+        self.profiles = [get_profile(p) for p in profiles]
+
+    @property
+    def profile(self):
+        """Default profile used when none is given"""
+        return self.profiles[0]
+
+    def rows(self, names):
+        """Map university names to row indices"""
+        return np.asarray([self.catalog.index[name] for name in names], dtype=np.int64)
+
+    def terms(self, rows, needed=None):
+        """Raw pairwise terms of the anchor `rows` against every school
+
+        Each term is len(rows) x N; missing values make the dependent terms NaN.
+        """
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        return self._terms(rows[:, None], np.arange(len(self.catalog))[None, :], needed,
+                           lambda index: index.overlap_block(rows))
+
+    def pair_terms(self, a, b, needed=None):
+        """Raw terms of the school pairs (a[i], b[i]), one value per pair"""
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        return self._terms(a, b, needed, lambda index: index.overlap_pairs(a, b))
+
+    def _terms(self, left, right, needed, overlap):
+        """Terms of left x right (broadcast index arrays); `overlap(token_index)` counts shared tokens"""
+        c = self.catalog
+        needed = set(FACTOR_TERMS.values()) if needed is None else set(needed)
+        terms = {}
+        with np.errstate(invalid='ignore'):
+            if 'shared_programs' in needed:
+                terms['shared_programs'] = overlap(c.programs).astype(np.float64)
+            if 'shared_specializations' in needed:
+                terms['shared_specializations'] = overlap(c.specializations).astype(np.float64)
+            if 'ranking_diff' in needed:
+                terms['ranking_diff'] = np.abs(c.ranking[left] - c.ranking[right])
+            if 'student_ratio' in needed:
+                a, b = c.students[left], c.students[right]
+                terms['student_ratio'] = np.minimum(a, b) / np.maximum(a, b)
+            if 'acceptance_diff' in needed:
+                terms['acceptance_diff'] = np.abs(c.acceptance_rate[left] - c.acceptance_rate[right])
+            if 'same_type' in needed:
+                terms['same_type'] = (c.type_codes[left] == c.type_codes[right]).astype(np.float64)
+            if 'distance' in needed:
+                terms['distance'] = haversine_km(c.lat[left], c.lng[left], c.lat[right], c.lng[right])
+        return terms
+
+    @staticmethod
+    def _component(key, terms):
+        """Unweighted factor value derived from the raw terms"""
+        factor = key[0]
+        value = terms[FACTOR_TERMS[factor]]
+        if factor in ('programs', 'specializations', 'type'):
+            return value
+        with np.errstate(invalid='ignore'):
+            if factor == 'students':
+                return np.where(value > key[1], value, 0.0)
+            window = key[1]
+            return np.where(value <= window, np.maximum(0, window - value) / window, 0.0)
+
+    def _plan(self, profiles):
+        profiles = [get_profile(p) for p in profiles] if profiles is not None else self.profiles
+        keys = []
+        for profile in profiles:
+            for _, key, _ in profile.components():
+                if key not in keys:
+                    keys.append(key)
+        keys.sort(key=lambda k: FACTORS.index(k[0]))
+        return profiles, keys
+
+    def components(self, rows, keys):
+        """Unweighted component arrays for the given component keys"""
+        terms = self.terms(rows, needed={FACTOR_TERMS[key[0]] for key in keys})
+        return {key: self._component(key, terms) for key in keys}
+
+    def score_profiles(self, rows, profiles=None):
+        """Fused evaluation: {profile name: len(rows) x N scores} in one pass"""
+        profiles, keys = self._plan(profiles)
+        shape = (len(np.atleast_1d(rows)), len(self.catalog))
+        with span('similarity.score', rows=shape[0]):
+            count('pairs_scored', shape[0] * shape[1])
+            components = self.components(rows, keys)
+            scores = {p.name: np.zeros(shape, dtype=np.float64) for p in profiles}
+            for key in keys:
+                for profile in profiles:
+                    for _, profile_key, weight in profile.components():
+                        if profile_key == key:
+                            scores[profile.name] += components[key] * weight
+        return scores
+
+    def contributions(self, rows, profile=None):
+        """Weighted score contribution of every factor of one profile"""
+        profile = get_profile(profile) if profile is not None else self.profile
+        components = self.components(rows, [key for _, key, _ in profile.components()])
+        return {factor: components[key] * weight for factor, key, weight in profile.components()}
+
+    def pair_contributions(self, a, b, profile=None, terms=None):
+        """Weighted factor contributions of the pairs (a[i], b[i]); `terms` from pair_terms() are reused"""
+        profile = get_profile(profile) if profile is not None else self.profile
+        if terms is None:
+            terms = self.pair_terms(a, b, needed={FACTOR_TERMS[key[0]] for _, key, _ in profile.components()})
+        return {factor: self._component(key, terms) * weight for factor, key, weight in profile.components()}
+
+    def block(self, rows, profile=None):
+        """Similarity scores of the anchor `rows` against every school (len(rows) x N)"""
+        profile = get_profile(profile) if profile is not None else self.profile
+        return self.score_profiles(rows, [profile])[profile.name]
+
+    def pair_scores(self, a, b, profile=None):
+        """Exact scores of the pairs (a[i], b[i]), without scoring whole rows"""
+        profile = get_profile(profile) if profile is not None else self.profile
+        keys = [key for _, key, _ in profile.components()]
+        with span('similarity.pair_scores'):
+            count('pairs_scored', len(a))
+            terms = self.pair_terms(a, b, needed={FACTOR_TERMS[key[0]] for key in keys})
+            scores = np.zeros(len(a), dtype=np.float64)
+            for _, key, weight in profile.components():
+                scores += self._component(key, terms) * weight
+        return scores
+
+    def distances(self, rows):
+        """Great-circle distance in km, NaN where coordinates are missing"""
+        return self.terms(rows, needed={'distance'})['distance']
+
+    def iter_blocks(self, block_size=None, profile=None):
+        """Yield (row_slice, scores) tiles covering the full N x N matrix"""
+        n = len(self.catalog)
+        block_size = block_size or _auto_block_size(n)
+        for start in range(0, n, block_size):
+            rows = np.arange(start, min(start + block_size, n))
+            yield slice(start, rows[-1] + 1), self.block(rows, profile)
+
+    def tile_edges(self, rows, profile=None):
+        """Pairs (row, col) with row < col among `rows` x all that pass the threshold
+
+        Every score term is symmetric, so each undirected edge is kept once.
+        Returns (rows, cols, scores) sorted by row, then column.
+        """
+        profile = get_profile(profile) if profile is not None else self.profile
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        return threshold_edges(rows, self.block(rows, profile), profile)
+
+    def edges(self, block_size=None, profile=None):
+        """Thresholded upper-triangle edge list of the whole catalog, tile by tile"""
+        n = len(self.catalog)
+        block_size = block_size or _auto_block_size(n)
+        parts = [self.tile_edges(np.arange(start, min(start + block_size, n)), profile)
+                 for start in range(0, n, block_size)]
+        return _concat_edges(parts)
+
+    def matrix(self, block_size=None, profile=None):
+        """Full N x N weighted similarity matrix"""
+        n = len(self.catalog)
+        out = np.empty((n, n), dtype=np.float64)
+        for row_slice, scores in self.iter_blocks(block_size, profile):
+            out[row_slice] = scores
+        return out
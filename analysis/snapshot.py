@@ -0,0 +1,210 @@
+"""
+Binary snapshot cache for the columnar catalog
+
+The first load of a dataset compiles its Catalog into a directory of `.npy`
+files plus a small `meta.json` for interned strings. Later loads memory-map
+the arrays (no parsing, no copies) as long as the source file's size and
+mtime still match the ones recorded in the snapshot; otherwise the JSON is
+re-parsed and the snapshot rebuilt.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from analysis.catalog import Catalog, ProgramTable
+from analysis.instrument import span, traced
+
+SNAPSHOT_VERSION = 1
+CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', '.cache/snapshots')
+
+
+class StringColumn:
+    """Read-only sequence of strings stored as one UTF-8 blob plus offsets"""
+
+    def __init__(self, blob, offsets, missing):
+        self.blob = blob
+        self.offsets = offsets
+        self.missing = missing
+
+    @classmethod
+    def pack(cls, values):
+        encoded = [(v or '').encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(blob, offsets, np.asarray([v is None for v in values], dtype=bool))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if self.missing[i]:
+            return None
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def source_key(path):
+    """Cheap change detector for the source file: (size, mtime in ns)"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def snapshot_dir(path, cache_dir=None):
+    """Snapshot directory for a source file"""
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:10]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir or CACHE_DIR, f"{name}-{digest}")
+
+
+def _arrays(catalog):
+    """Flatten every array of a Catalog into {file stem: array}"""
+    arrays = {}
+    for field, values in catalog.numeric.items():
+        arrays[f'numeric.{field}'] = values
+        arrays[f'present.{field}'] = catalog.present[field]
+    for field, codes in catalog.codes.items():
+        arrays[f'codes.{field}'] = codes
+    for section, mask in catalog.sections.items():
+        arrays[f'sections.{section}'] = mask
+    arrays['nc_frei'] = catalog.nc_frei
+    arrays['layout_codes'] = catalog.layout_codes
+    arrays['collaborations.left'], arrays['collaborations.right'], arrays['collaborations.strength'] = \
+        catalog.collaborations[:3]
+
+    programs = catalog.programs
+    arrays['programs.offsets'] = programs.offsets
+    arrays['programs.spec_offsets'] = programs.spec_offsets
+    arrays['programs.spec_codes'] = programs.spec_codes
+    for field, codes in programs.codes.items():
+        arrays[f'programs.codes.{field}'] = codes
+    for term, (starts, ends) in programs.deadlines.items():
+        arrays[f'programs.deadlines.{term}.start'] = starts
+        arrays[f'programs.deadlines.{term}.end'] = ends
+    descriptions = programs.descriptions
+    if not isinstance(descriptions, StringColumn):
+        descriptions = StringColumn.pack(descriptions)
+    arrays['programs.descriptions.blob'] = descriptions.blob
+    arrays['programs.descriptions.offsets'] = descriptions.offsets
+    arrays['programs.descriptions.missing'] = descriptions.missing
+    return arrays
+
+
+def write_arrays(directory, arrays, meta):
+    """Write {stem: array} as .npy files plus meta.json into a staging directory and swap it in
+
+    The old directory is renamed aside before the new one is renamed into
+    place and only then deleted, so a crash can leave the previous snapshot
+    next to the target but never lose it; readers may only miss the snapshot
+    between the two renames.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.staging-')
+    try:
+        for stem, array in arrays.items():
+            np.save(os.path.join(staging, f'{stem}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    aside = f'{staging}.old'
+    if os.path.isdir(directory):
+        os.replace(directory, aside)
+    os.replace(staging, directory)
+    shutil.rmtree(aside, ignore_errors=True)
+
+
+@traced('snapshot.save')
+def save_snapshot(catalog, directory, key=None):
+    """Write a Catalog snapshot, swapped into place by write_arrays"""
+    programs = catalog.programs
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'source': key,
+        'names': catalog.names,
+        'ids': catalog.ids,
+        'numeric_fields': list(catalog.numeric),
+        'integer_fields': sorted(catalog.integer_fields),
+        'categories': catalog.categories,
+        'layouts': [list(layout) for layout in catalog.layouts],
+        'sections': list(catalog.sections),
+        'collaborators': catalog.collaborations[3],
+        'extras': catalog.extras,
+        'programs': {
+            'categories': programs.categories,
+            'specializations': programs.specializations,
+            'deadline_terms': list(programs.deadlines),
+            'deadline_dates': programs.deadline_dates,
+        },
+    }
+    write_arrays(directory, _arrays(catalog), meta)
+
+
+def read_meta(directory):
+    with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@traced('load.snapshot')
+def load_snapshot(directory, meta=None):
+    """Open a snapshot with every array memory-mapped read-only"""
+    meta = meta or read_meta(directory)
+
+    def array(stem):
+        return np.load(os.path.join(directory, f'{stem}.npy'), mmap_mode='r')
+
+    numeric = {field: array(f'numeric.{field}') for field in meta['numeric_fields']}
+    present = {field: array(f'present.{field}') for field in meta['numeric_fields']}
+    codes = {field: array(f'codes.{field}') for field in meta['categories']}
+    sections = {section: array(f'sections.{section}') for section in meta['sections']}
+    collaborations = (array('collaborations.left'), array('collaborations.right'),
+                      array('collaborations.strength'), meta['collaborators'])
+
+    pm = meta['programs']
+    programs = ProgramTable(
+        array('programs.offsets'),
+        {field: array(f'programs.codes.{field}') for field in pm['categories']},
+        pm['categories'],
+        array('programs.spec_offsets'),
+        array('programs.spec_codes'),
+        pm['specializations'],
+        StringColumn(array('programs.descriptions.blob'), array('programs.descriptions.offsets'),
+                     array('programs.descriptions.missing')),
+        {term: (array(f'programs.deadlines.{term}.start'), array(f'programs.deadlines.{term}.end'))
+         for term in pm['deadline_terms']},
+        pm['deadline_dates'],
+    )
+    return Catalog(meta['names'], meta['ids'], numeric, present, set(meta['integer_fields']), codes,
+                   meta['categories'], array('nc_frei'), [tuple(layout) for layout in meta['layouts']],
+                   array('layout_codes'), sections, programs, collaborations, meta['extras'])
+
+
+def cached_catalog(path, cache_dir=None):
+    """Catalog for `path`, from a fresh snapshot when possible, rebuilding it otherwise"""
+    directory = snapshot_dir(path, cache_dir)
+    key = source_key(path)
+    if os.path.isfile(os.path.join(directory, 'meta.json')):
+        meta = read_meta(directory)
+        if meta.get('version') == SNAPSHOT_VERSION and meta.get('source') == key:
+            return load_snapshot(directory, meta)
+
+    with open(path, 'r', encoding='utf-8') as f, span('load.parse', path=path):
+        data = json.load(f)
+    catalog = Catalog.from_data(data)
+    try:
+        save_snapshot(catalog, directory, key)
+    except OSError:
+        return catalog  # read-only checkout: keep working without a cache
+    return load_snapshot(directory)
@@ -0,0 +1,163 @@
+"""
+Streaming ingestion for very large catalogs
+
+`json.load` materializes the whole `universities` object before analysis can
+start. iter_items() walks the file incrementally instead and yields the
+entries of one nested object or array at a time, decoding each entry with
+the C JSON decoder, so peak memory is bounded by the largest single entry
+rather than by the file size.
+"""
+
+import json
+import re
+
+from analysis.catalog import DATA_PATH
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class _Reader:
+    """Chunked text buffer with just enough of a JSON tokenizer to walk containers"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, at_least=0):
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        data = self.f.read(max(self.chunk_size, at_least))
+        if not data:
+            self.eof = True
+            return False
+        self.buf += data
+        return True
+
+    def peek(self):
+        """Next non-whitespace character ('' at end of file)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the buffered JSON")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value, reading more input until it fits"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number running up to the buffer edge (or a dangling exponent) may be truncated
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(len(self.buf) - self.pos)  # grow geometrically for large values
+
+
+def _container(reader):
+    """Yield each key (objects) or None (arrays); the caller consumes the value in between"""
+    opener = reader.peek()
+    closer = '}' if opener == '{' else ']'
+    reader.pos += 1
+    if reader.peek() == closer:
+        reader.pos += 1
+        return
+    while True:
+        key = None
+        if opener == '{':
+            key = reader.value()
+            reader.expect(':')
+        yield key
+        char = reader.peek()
+        reader.pos += 1
+        if char == closer:
+            return
+        if char != ',':
+            raise ValueError(f"Expected ',' or {closer!r} at offset {reader.pos - 1} of the buffered JSON")
+
+
+def _skip(reader):
+    """Consume a value without holding more than one of its entries at a time"""
+    if reader.peek() in '{[':
+        for _ in _container(reader):
+            reader.value()
+    else:
+        reader.value()
+
+
+def _descend(reader, paths, prefix=(), last=True):
+    """Yield (path, entry) for every target container reachable from here
+
+    `paths` are key tuples relative to the current value. When `last` is set
+    nothing outside this value is still wanted, so the walk may stop as soon
+    as every path has been served instead of consuming the rest of the file.
+    """
+    char = reader.peek()
+    if () in paths:
+        if char == '{':
+            for key in _container(reader):
+                yield prefix, (key, reader.value())
+        elif char == '[':
+            for _ in _container(reader):
+                yield prefix, reader.value()
+        else:
+            reader.value()
+        return
+    if char != '{':
+        _skip(reader)
+        return
+    pending = list(paths)
+    for key in _container(reader):
+        tails = [path[1:] for path in pending if path[0] == key]
+        if not tails:
+            _skip(reader)
+            continue
+        pending = [path for path in pending if path[0] != key]
+        yield from _descend(reader, tails, prefix + (key,), last and not pending)
+        if last and not pending:
+            return
+
+
+def iter_paths(path, *paths, chunk_size=1 << 20):
+    """Stream the entries of several nested objects or arrays in one pass
+
+    Each of `paths` is a tuple of keys; (path, entry) pairs are yielded in
+    file order, with entries shaped as in iter_items().
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from _descend(_Reader(f, chunk_size), [tuple(keys) for keys in paths])
+
+
+def iter_items(path, *keys, chunk_size=1 << 20):
+    """Stream the entries of the object or array found at `keys`
+
+    Objects yield (key, value) pairs and arrays yield values; nothing is
+    yielded when the path does not exist.
+    """
+    for _, entry in iter_paths(path, keys, chunk_size=chunk_size):
+        yield entry
+
+
+def iter_universities(path=DATA_PATH):
+    """(name, record) for every entry of `universities`"""
+    return iter_items(path, 'universities')
+
+
+def iter_collaborations(path=DATA_PATH):
+    """(inst1, inst2, strength) triples of `relationships.academic_collaborations`"""
+    return iter_items(path, 'relationships', 'academic_collaborations')
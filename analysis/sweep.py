@@ -0,0 +1,290 @@
+"""
+Weight sweeps: how sensitive are neighbours and clusters to the profile weights?
+
+The factor weights of a scoring profile (3.0 programs, 2.0 specializations,
+...) were picked by hand. Trying a variant used to mean editing them and
+rerunning everything. weight_sweep() evaluates a whole S x F matrix of weight
+vectors in one tiled pass instead:
+
+- per row block, the unweighted component arrays of every factor are
+  computed once (F x B x N) and contracted with the weight matrix
+  (S x F) into the S score blocks, a cache-sized chunk of rows at a time;
+- each variant keeps its top-k per row, compared on the fly with row 0 of
+  the weight matrix, the reference (by default the profile's own weights);
+- optionally every variant's top-k lists are kept, clustered as
+  analysis.clustering.cluster_catalog would, and compared with the
+  reference clustering.
+
+Windows, the threshold and component definitions stay those of the profile;
+only the weights vary.
+
+    python -m analysis.sweep --samples 200 --spread 0.5
+    python -m analysis.sweep --grid programs=2,3,4 specializations=1,2,4
+"""
+
+import argparse
+import inspect
+import itertools
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH, load_catalog
+from analysis.clustering import CLUSTER_K, cluster_knn
+from analysis.instrument import count, span, traced
+from analysis.neighbors import select_top_k
+from analysis.similarity import FACTORS, ScoringProfile, SimilarityEngine, _auto_block_size, get_profile
+
+# Scores per variant and row chunk (~1 MB, see weight_sweep)
+_CACHE_BLOCK = 131_072
+
+# ScoringProfile attribute holding each factor's weight
+WEIGHT_ATTRIBUTES = {
+    'programs': 'program_weight',
+    'specializations': 'specialization_weight',
+    'ranking': 'ranking_weight',
+    'students': 'student_weight',
+    'selectivity': 'selectivity_weight',
+    'type': 'type_weight',
+    'geography': 'geo_weight',
+}
+
+
+def profile_weights(profile):
+    """Weight vector of a profile, ordered as FACTORS"""
+    profile = get_profile(profile)
+    return np.array([getattr(profile, WEIGHT_ATTRIBUTES[factor]) for factor in FACTORS], dtype=np.float64)
+
+
+def variant_profile(profile, weights, name=None):
+    """Copy of `profile` with the weights replaced (ordered as FACTORS)"""
+    profile = get_profile(profile)
+    settings = {key: getattr(profile, key) for key in inspect.signature(ScoringProfile).parameters if key != 'name'}
+    for factor, weight in zip(FACTORS, np.asarray(weights).tolist()):
+        settings[WEIGHT_ATTRIBUTES[factor]] = weight
+    return ScoringProfile(name or f'{profile.name}-variant', **settings)
+
+
+def random_weights(profile, samples, spread=0.5, seed=0):
+    """`samples` weight vectors: the profile's own, then log-uniform variations of it
+
+    Each non-zero weight is scaled by exp(U(-spread, spread)) independently;
+    factors the profile does not use stay at zero.
+    """
+    base = profile_weights(profile)
+    rng = np.random.default_rng(seed)
+    scale = np.exp(rng.uniform(-spread, spread, (max(samples - 1, 0), len(base))))
+    return np.vstack((base, base * scale))[:samples]
+
+
+def grid_weights(profile, grid):
+    """The profile's own weights followed by the full grid {factor: values} around them"""
+    base = profile_weights(profile)
+    columns = [FACTORS.index(factor) for factor in grid]
+    rows = [base]
+    for values in itertools.product(*grid.values()):
+        weights = base.copy()
+        weights[columns] = values
+        rows.append(weights)
+    return np.vstack(rows)
+
+
+def adjusted_rand(a, b):
+    """Adjusted Rand index of two labelings (1.0: identical partitions)"""
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    n = len(a)
+    if n < 2:
+        return 1.0
+    pairs = np.bincount(a * (int(b.max()) + 1) + b).astype(np.float64)
+    rows = np.bincount(a).astype(np.float64)
+    cols = np.bincount(b).astype(np.float64)
+    together = (pairs * (pairs - 1)).sum() / 2
+    same_a = (rows * (rows - 1)).sum() / 2
+    same_b = (cols * (cols - 1)).sum() / 2
+    expected = same_a * same_b / (n * (n - 1) / 2)
+    best = (same_a + same_b) / 2
+    return 1.0 if best == expected else float((together - expected) / (best - expected))
+
+
+class SweepResult:
+    """Per-variant statistics of a weight sweep; variant 0 is the reference"""
+
+    def __init__(self, profile, weights, k):
+        self.profile = profile
+        self.weights = weights
+        self.k = k
+        variants = len(weights)
+        self.edges = np.zeros(variants, dtype=np.int64)      # connected pairs
+        self.overlap = np.zeros(variants)                    # mean Jaccard of top-k sets with the reference
+        self.changed = np.zeros(variants, dtype=np.int64)    # schools whose top-k set differs
+        self.clusters = None                                 # community count per variant
+        self.agreement = None                                # adjusted Rand index with the reference
+
+    def sensitivity(self):
+        """{factor: change in mean top-k overlap per +1.0 of its weight}, from a least-squares fit"""
+        varied = [i for i in range(len(FACTORS)) if np.ptp(self.weights[:, i]) > 0]
+        if not varied:
+            return {}
+        design = np.column_stack((np.ones(len(self.weights)), self.weights[:, varied]))
+        slopes = np.linalg.lstsq(design, self.overlap, rcond=None)[0][1:]
+        return {FACTORS[i]: float(slope) for i, slope in zip(varied, slopes)}
+
+    def rows(self):
+        """One plain dict per variant"""
+        rows = []
+        for v, weights in enumerate(self.weights.tolist()):
+            row = {'variant': v, 'weights': dict(zip(FACTORS, weights)), 'edges': int(self.edges[v]),
+                   'overlap': float(self.overlap[v]), 'changed': int(self.changed[v])}
+            if self.clusters is not None:
+                row['clusters'] = int(self.clusters[v])
+                row['agreement'] = float(self.agreement[v])
+            rows.append(row)
+        return rows
+
+
+def _set_overlap(top, reference):
+    """Jaccard similarity of each row's top-k set with the reference row's (S x B)
+
+    Padding (-1) is ignored; two empty sets count as identical.
+    """
+    valid = top >= 0
+    shared = ((top[:, :, :, None] == reference[None, :, None, :]) & valid[:, :, :, None]).sum(axis=(2, 3))
+    union = valid.sum(axis=2) + (reference >= 0).sum(axis=1)[None, :] - shared
+    return np.where(union > 0, shared / np.maximum(union, 1), 1.0), shared != union
+
+
+@traced('sweep.run')
+def weight_sweep(engine, weights, profile=None, k=CLUSTER_K, clusters=True, block_size=None):
+    """Evaluate S weight vectors (S x len(FACTORS), row 0 the reference) in one pass
+
+    Keeping top-k lists for clustering costs S x N x k indices and scores;
+    pass clusters=False for large sweeps that only need the overlap figures.
+    """
+    profile = get_profile(profile) if profile is not None else engine.profile
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    n = len(engine.catalog)
+    variants = len(weights)
+    k = min(k, max(n - 1, 0))
+    result = SweepResult(profile, weights, k)
+
+    # Only factors some variant weighs enter the contraction
+    entries = [entry for entry in profile.components(include_zero=True) if weights[:, FACTORS.index(entry[0])].any()]
+    keys = [key for _, key, _ in entries]
+    matrix = weights[:, [FACTORS.index(factor) for factor, _, _ in entries]]
+    if clusters:
+        kept = np.full((variants, n, k), -1, dtype=np.int32)
+        kept_scores = np.full((variants, n, k), -np.inf)
+
+    block_size = block_size or _auto_block_size(n)
+    chunk = _auto_block_size(n, _CACHE_BLOCK)
+    overlap = np.zeros(variants)
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(start + block_size, n))
+        with span('sweep.block', rows=len(rows)):
+            count('pairs_scored', len(rows) * n * variants)
+            components = engine.components(rows, keys)
+            top = np.empty((variants, len(rows), k), dtype=np.int64)
+            values = np.empty((variants, len(rows), k))
+            out = np.empty((min(chunk, len(rows)), n))
+            scratch = np.empty_like(out)
+            # Each variant's partial sums, threshold count and top-k selection run on
+            # cache-sized row chunks; factors are added in the order SimilarityEngine
+            # adds them, so every variant's scores match a run of its own profile bit for bit
+            for lo in range(0, len(rows), chunk):
+                part = slice(lo, min(lo + chunk, len(rows)))
+                parts = [components[key][part] for key in keys]
+                size = part.stop - part.start
+                diagonal = (np.arange(size), rows[part])
+                for v in range(variants):
+                    scores, tmp = out[:size], scratch[:size]
+                    scores.fill(0.0)
+                    for component, weight in zip(parts, matrix[v].tolist()):
+                        np.multiply(component, weight, out=tmp)
+                        scores += tmp
+                    scores[diagonal] = -np.inf  # never a school's own neighbour
+                    result.edges[v] += np.count_nonzero(profile.passes(scores))
+                    top[v, part], values[v, part] = select_top_k(scores, k)
+            # The top-k neighbour set of a school is its top-k that pass the threshold
+            connected = np.where(profile.passes(values), top, -1)
+            jaccard, differs = _set_overlap(connected, connected[0])
+            overlap += jaccard.sum(axis=1)
+            result.changed += differs.sum(axis=1)
+            if clusters:
+                kept[:, rows] = top
+                kept_scores[:, rows] = values
+    result.edges //= 2  # every pair was seen from both sides
+    result.overlap = overlap / max(n, 1)
+
+    if clusters:
+        with span('sweep.clusters', variants=variants):
+            labels = [cluster_knn(kept[v], kept_scores[v], profile) for v in range(variants)]
+        result.clusters = np.array([int(l.max()) + 1 if len(l) else 0 for l in labels])
+        result.agreement = np.array([adjusted_rand(labels[0], l) for l in labels])
+    return result
+
+
+def _parse_grid(items):
+    grid = {}
+    for item in items:
+        factor, _, values = item.partition('=')
+        if factor not in WEIGHT_ATTRIBUTES or not values:
+            raise argparse.ArgumentTypeError(f"expected factor=w1,w2,... with a factor of {', '.join(FACTORS)}: {item}")
+        try:
+            grid[factor] = [float(value) for value in values.split(',')]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weights must be numbers: {item}") from None
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep similarity weights and report neighbour and cluster stability")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--profile', default='d3')
+    parser.add_argument('--samples', type=int, default=200, help="random variants (including the profile itself)")
+    parser.add_argument('--spread', type=float, default=0.5, help="log-scale range of the random variations")
+    parser.add_argument('--grid', nargs='+', metavar='FACTOR=W1,W2', help="sweep a grid instead of random variants")
+    parser.add_argument('--k', type=int, default=CLUSTER_K)
+    parser.add_argument('--no-clusters', action='store_true', help="skip clustering every variant")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--show', type=int, default=10, help="variants listed at each end of the table")
+    args = parser.parse_args()
+
+    try:
+        grid = _parse_grid(args.grid) if args.grid else None
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+    profile = get_profile(args.profile)
+    weights = grid_weights(profile, grid) if grid else random_weights(profile, args.samples, args.spread, args.seed)
+    engine = SimilarityEngine(load_catalog(args.data), (profile,))
+    print(f"🎛️ Sweeping {len(weights)} weight vectors of profile '{profile.name}' over {len(engine.catalog)} schools")
+    result = weight_sweep(engine, weights, profile, args.k, clusters=not args.no_clusters)
+
+    rows = result.rows()
+    reference = rows[0]
+    print(f"📌 Reference: {reference['edges']} connections"
+          + (f", {reference['clusters']} clusters" if result.clusters is not None else ""))
+    factors = [f for i, f in enumerate(FACTORS) if np.ptp(weights[:, i]) > 0 or weights[0, i]]
+    header = ' '.join(f'{f[:6]:>6}' for f in factors)
+    print(f"\n   {'#':>4} {header}  {'edges':>9} {'top-k':>6} {'changed':>8}"
+          + (f" {'clusters':>8} {'ARI':>6}" if result.clusters is not None else ""))
+    order = np.argsort(-result.overlap, kind='stable').tolist()
+    shown = order if len(order) <= 2 * args.show else order[:args.show] + [None] + order[-args.show:]
+    for v in shown:
+        if v is None:
+            print("   ...")
+            continue
+        row = rows[v]
+        values = ' '.join(f"{row['weights'][f]:6.2f}" for f in factors)
+        line = f"   {v:>4} {values}  {row['edges']:>9} {row['overlap']:6.1%} {row['changed']:>8}"
+        if result.clusters is not None:
+            line += f" {row['clusters']:>8} {row['agreement']:6.3f}"
+        print(line)
+
+    sensitivity = result.sensitivity()
+    if sensitivity:
+        print("\n📈 Top-k overlap per +1.0 weight (least squares over the sweep):")
+        for factor, slope in sorted(sensitivity.items(), key=lambda item: -abs(item[1])):
+            print(f"   {factor:<16} {slope:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,139 +1,130 @@
 #!/usr/bin/env python3
 """
 Analyze connections for Hochschule für Künste Bremen based on enhanced dataset
+
+Reports for every school at once: python -m analysis.reports --out reports.jsonl
 """
 
-import json
-import math
+import heapq
 
-def calculate_similarity(bremen, other_uni, other_name):
-    """Calculate similarity score between Bremen and another university"""
-    
-    similarity = 0
+import numpy as np
+
+from analysis.catalog import load_catalog
+from analysis.clustering import cluster_catalog, dominant_tokens
+from analysis.geo import GeoIndex
+from analysis.instrument import span
+from analysis.similarity import SimilarityEngine, get_profile
+
+ANCHOR = 'Hochschule für Künste Bremen'
+
+
+def describe_connection(terms, j, anchor_type, profile):
+    """Human-readable breakdown of the similarity factors for column j of an anchor row"""
     details = []
     
-    # 1. Program type similarity (weight: 3.0)
-    bremen_programs = set(p.get('name', '') for p in bremen.get('programs', []))
-    other_programs = set(p.get('name', '') for p in other_uni.get('programs', []))
-    shared_programs = len(bremen_programs.intersection(other_programs))
+    # 1. Program type similarity
+    shared_programs = int(terms['shared_programs'][j])
     if shared_programs > 0:
-        similarity += shared_programs * 3.0
-        details.append(f"Shared programs: {shared_programs} (score: +{shared_programs * 3.0})")
-    
-    # 2. Specialization similarity (weight: 2.0)
-    bremen_specs = set()
-    for program in bremen.get('programs', []):
-        bremen_specs.update(program.get('specializations', []))
-    
-    other_specs = set()
-    for program in other_uni.get('programs', []):
-        other_specs.update(program.get('specializations', []))
+        details.append(f"Shared programs: {shared_programs} (score: +{shared_programs * profile.program_weight})")
     
-    shared_specs = len(bremen_specs.intersection(other_specs))
+    # 2. Specialization similarity
+    shared_specs = int(terms['shared_specializations'][j])
     if shared_specs > 0:
-        similarity += shared_specs * 2.0
-        details.append(f"Shared specializations: {shared_specs} (score: +{shared_specs * 2.0})")
-    
-    # 3. Ranking similarity (weight: 1.5)
-    bremen_rank = bremen.get('ranking', {}).get('national')
-    other_rank = other_uni.get('ranking', {}).get('national')
-    if bremen_rank and other_rank:
-        rank_diff = abs(bremen_rank - other_rank)
-        if rank_diff <= 20:
-            rank_similarity = max(0, 20 - rank_diff) / 20
-            similarity += rank_similarity * 1.5
-            details.append(f"Ranking similarity: {rank_similarity:.2f} (score: +{rank_similarity * 1.5:.2f})")
-    
-    # 4. Student body similarity (weight: 1.0)
-    bremen_students = bremen.get('stats', {}).get('students')
-    other_students = other_uni.get('stats', {}).get('students')
-    if bremen_students and other_students:
-        student_ratio = min(bremen_students, other_students) / max(bremen_students, other_students)
-        if student_ratio > 0.4:
-            similarity += student_ratio * 1.0
-            details.append(f"Student body similarity: {student_ratio:.2f} (score: +{student_ratio * 1.0:.2f})")
-    
-    # 5. Selectivity similarity (weight: 1.2)
-    bremen_rate = bremen.get('stats', {}).get('acceptance_rate')
-    other_rate = other_uni.get('stats', {}).get('acceptance_rate')
-    if bremen_rate and other_rate:
-        rate_diff = abs(bremen_rate - other_rate)
-        if rate_diff <= 0.3:
-            selectivity_sim = max(0, 0.3 - rate_diff) / 0.3
-            similarity += selectivity_sim * 1.2
-            details.append(f"Selectivity similarity: {selectivity_sim:.2f} (score: +{selectivity_sim * 1.2:.2f})")
-    
-    # 6. Type similarity (weight: 2.0)
-    bremen_type = bremen.get('type', '')
-    other_type = other_uni.get('type', '')
-    if bremen_type == other_type:
-        similarity += 2.0
-        details.append(f"Same type ({bremen_type}): +2.0")
+        details.append(f"Shared specializations: {shared_specs} (score: +{shared_specs * profile.specialization_weight})")
+    
+    # 3. Ranking similarity
+    rank_diff = terms['ranking_diff'][j]
+    if rank_diff <= profile.ranking_window:
+        rank_similarity = max(0, profile.ranking_window - rank_diff) / profile.ranking_window
+        details.append(f"Ranking similarity: {rank_similarity:.2f} (score: +{rank_similarity * profile.ranking_weight:.2f})")
+    
+    # 4. Student body similarity
+    student_ratio = terms['student_ratio'][j]
+    if student_ratio > profile.student_min_ratio:
+        details.append(f"Student body similarity: {student_ratio:.2f} (score: +{student_ratio * profile.student_weight:.2f})")
+    
+    # 5. Selectivity similarity
+    rate_diff = terms['acceptance_diff'][j]
+    if rate_diff <= profile.selectivity_window:
+        selectivity_sim = max(0, profile.selectivity_window - rate_diff) / profile.selectivity_window
+        details.append(f"Selectivity similarity: {selectivity_sim:.2f} (score: +{selectivity_sim * profile.selectivity_weight:.2f})")
+    
+    # 6. Type similarity
+    if terms['same_type'][j]:
+        details.append(f"Same type ({anchor_type}): +{profile.type_weight}")
+    
+    return details
+
+def calculate_similarity(bremen, other_uni, other_name):
+    """Calculate similarity score between Bremen and another university
+    
+    Per-pair entry point kept for ad-hoc use; the scoring itself comes from the
+    "d3" profile of analysis.similarity, which main() runs on the whole catalog.
+    """
+    engine = SimilarityEngine({0: bremen, 1: other_uni}, profiles=('d3',))
+    terms = {key: values[0] for key, values in engine.terms([0]).items()}
+    similarity = float(engine.block([0])[0][1])
+    details = describe_connection(terms, 1, bremen.get('type', ''), engine.profile)
     
     # 7. Geographic proximity (for 3D positioning)
-    bremen_coords = bremen.get('coordinates', {})
-    other_coords = other_uni.get('coordinates', {})
-    distance = None
-    if bremen_coords.get('lat') and other_coords.get('lat'):
-        lat1, lng1 = bremen_coords['lat'], bremen_coords['lng']
-        lat2, lng2 = other_coords['lat'], other_coords['lng']
-        # Simple distance calculation
-        distance = math.sqrt((lat2 - lat1)**2 + (lng2 - lng1)**2)
-    
-    return similarity, details, distance
+    distance = terms['distance'][1]
+    return similarity, details, None if np.isnan(distance) else float(distance)
 
 def main():
     print("🔍 Analyzing connections for Hochschule für Künste Bremen")
     print("=" * 60)
     
     # Load data
-    with open('src/data/enhanced_german_art_schools.json', 'r') as f:
-        data = json.load(f)
-    
-    universities = data['universities']
-    bremen = universities['Hochschule für Künste Bremen']
+    catalog = load_catalog()
+    bremen = catalog.row(ANCHOR)
     
     print("📊 Bremen University Profile:")
-    print(f"   Type: {bremen.get('type')}")
-    print(f"   National Ranking: {bremen.get('ranking', {}).get('national')}")
-    print(f"   Students: {bremen.get('stats', {}).get('students')}")
-    print(f"   Acceptance Rate: {bremen.get('stats', {}).get('acceptance_rate')}")
-    print(f"   Programs: {len(bremen.get('programs', []))}")
-    print(f"   Founded: {bremen.get('stats', {}).get('founded')}")
-    print(f"   State: {bremen.get('state')}")
-    print(f"   NC-frei: {bremen.get('ncFrei')}")
+    print(f"   Type: {bremen.type}")
+    print(f"   National Ranking: {bremen.ranking}")
+    print(f"   Students: {bremen.students}")
+    print(f"   Acceptance Rate: {bremen.acceptance_rate}")
+    print(f"   Programs: {bremen.program_count}")
+    print(f"   Founded: {bremen.founded}")
+    print(f"   State: {bremen.state}")
+    print(f"   NC-frei: {bremen.nc_frei}")
     
     # Bremen's specializations
-    bremen_specs = set()
-    for program in bremen.get('programs', []):
-        bremen_specs.update(program.get('specializations', []))
-    print(f"   Key Specializations: {', '.join(list(bremen_specs)[:8])}")
+    print(f"   Key Specializations: {', '.join(bremen.specializations()[:8])}")
     
     print("\n🔗 Top Connected Universities (D3 Mode):")
     print("-" * 50)
     
-    # Calculate similarities
+    # Score Bremen against the whole catalog in one vectorized pass
+    engine = SimilarityEngine(catalog, profiles=('d3',))
+    profile = get_profile('d3')
+    anchor = engine.rows([ANCHOR])
+    terms = {key: values[0] for key, values in engine.terms(anchor).items()}
+    scores = engine.block(anchor)[0]
+    
     connections = []
-    for name, uni in universities.items():
-        if name != 'Hochschule für Künste Bremen':
-            similarity, details, distance = calculate_similarity(bremen, uni, name)
-            if similarity > 1.0:  # Only consider meaningful connections
-                connections.append({
-                    'name': name,
-                    'similarity': similarity,
-                    'details': details,
-                    'distance': distance,
-                    'ranking': uni.get('ranking', {}).get('national'),
-                    'type': uni.get('type'),
-                    'students': uni.get('stats', {}).get('students'),
-                    'state': uni.get('state')
-                })
-    
-    # Sort by similarity
-    connections.sort(key=lambda x: x['similarity'], reverse=True)
+    for j in np.flatnonzero(profile.passes(scores)):  # Only consider meaningful connections
+        name = engine.catalog.names[j]
+        if name == ANCHOR:
+            continue
+        uni = catalog.row(j)
+        distance = terms['distance'][j]
+        connections.append({
+            'name': name,
+            'similarity': float(scores[j]),
+            'details': describe_connection(terms, j, bremen.type or '', profile),
+            'distance': None if np.isnan(distance) else float(distance),
+            'ranking': uni.ranking,
+            'type': uni.type,
+            'students': uni.students,
+            'state': uni.state
+        })
+    
+    # Keep the top connections with a bounded heap instead of sorting everything
+    with span('bremen.rank', connections=len(connections)):
+        top_connections = heapq.nlargest(15, connections, key=lambda x: x['similarity'])
     
     # Show top connections
-    for i, conn in enumerate(connections[:15], 1):
+    for i, conn in enumerate(top_connections, 1):
         print(f"{i:2d}. {conn['name']}")
         print(f"    Similarity Score: {conn['similarity']:.1f}")
         print(f"    Type: {conn['type']} | Ranking: {conn['ranking']} | Students: {conn['students']}")
@@ -145,34 +136,40 @@ def main():
     print("\n🌍 Geographic Clusters (3D Mode):")
     print("-" * 40)
     
-    # Sort by geographic distance for 3D positioning
-    geographic_neighbors = [c for c in connections if c['distance'] is not None]
-    geographic_neighbors.sort(key=lambda x: x['distance'])
+    # Nearest connected universities from the spatial index instead of sorting every distance
+    geo_index = GeoIndex(engine.catalog.lat, engine.catalog.lng)
+    connected = np.zeros(len(engine.catalog), dtype=bool)
+    connected[engine.rows([c['name'] for c in connections])] = True
+    by_name = {c['name']: c for c in connections}
+    anchor_row = anchor[0]
+    geographic_neighbors = geo_index.nearest(engine.catalog.lat[anchor_row], engine.catalog.lng[anchor_row], k=10, mask=connected)
     
     print("Universities that should appear closer in 3D space:")
-    for i, conn in enumerate(geographic_neighbors[:10], 1):
-        print(f"{i:2d}. {conn['name']} (Distance: {conn['distance']:.2f}°)")
+    for i, (row, distance) in enumerate(geographic_neighbors, 1):
+        conn = by_name[engine.catalog.names[row]]
+        print(f"{i:2d}. {conn['name']} (Distance: {distance:.0f} km)")
         print(f"    State: {conn['state']} | Type: {conn['type']}")
     
     print("\n📈 Specialized Clusters:")
     print("-" * 25)
     
-    # Group by specialization overlap
-    media_unis = [c for c in connections if any('Media' in d or 'Digital' in d or 'Interactive' in d for d in c['details'])]
-    design_unis = [c for c in connections if any('Design' in d for d in c['details'])]
-    arts_unis = [c for c in connections if any('Art' in d or 'Fine' in d for d in c['details'])]
-    
-    print(f"🎨 Digital Media Cluster: {len(media_unis)} universities")
-    for uni in media_unis[:5]:
-        print(f"   • {uni['name']} (Score: {uni['similarity']:.1f})")
-    
-    print(f"\n🎭 Design Cluster: {len(design_unis)} universities")
-    for uni in design_unis[:5]:
-        print(f"   • {uni['name']} (Score: {uni['similarity']:.1f})")
-    
-    print(f"\n🖼️  Fine Arts Cluster: {len(arts_unis)} universities")
-    for uni in arts_unis[:5]:
-        print(f"   • {uni['name']} (Score: {uni['similarity']:.1f})")
+    # Communities of the whole catalog (Louvain on the top-k similarity graph),
+    # named after the specializations that are over-represented in each
+    with span('bremen.clusters'):
+        clusters = cluster_catalog(engine, profile)
+        cluster_names = dominant_tokens(clusters, engine.catalog.specializations)
+    anchor_cluster = int(clusters[anchor_row])
+    
+    # Bremen's own cluster first, then the others by ID
+    for i, cluster_id in enumerate(sorted(cluster_names, key=lambda c: (c != anchor_cluster, c))):
+        if i:
+            print()
+        members = [by_name[engine.catalog.names[j]] for j in np.flatnonzero((clusters == cluster_id) & connected)]
+        marker = " (Bremen's cluster)" if cluster_id == anchor_cluster else ""
+        print(f"🎨 Cluster {cluster_id} – {', '.join(cluster_names[cluster_id])}: "
+              f"{int((clusters == cluster_id).sum())} universities, {len(members)} connected{marker}")
+        for uni in heapq.nlargest(5, members, key=lambda x: x['similarity']):
+            print(f"   • {uni['name']} (Score: {uni['similarity']:.1f})")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the analysis hot paths (run with `python -m benchmarks.<name>`)
+"""
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Memory per institution: parsed dict-of-dicts vs. the columnar Catalog
+
+The real dataset is replicated under new names to reach each size.
+
+    python -m benchmarks.catalog_memory --copies 1 10 100
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from analysis.catalog import DATA_PATH, Catalog
+
+
+def replicated(copies):
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    universities = {f"{name} #{i}": uni for i in range(copies) for name, uni in data['universities'].items()}
+    return json.dumps({'universities': universities})
+
+
+def retained(build, text):
+    gc.collect()
+    tracemalloc.start()
+    obj = build(text)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    print(f"{'schools':>8} {'dict B/school':>14} {'catalog B/school':>17} {'ratio':>6}")
+    for copies in args.copies:
+        text = replicated(copies)
+        data, dict_bytes = retained(json.loads, text)
+        n = len(data['universities'])
+        del data
+        _, catalog_bytes = retained(lambda t: Catalog.from_data(json.loads(t)), text)
+        print(f"{n:>8} {dict_bytes / n:>14.0f} {catalog_bytes / n:>17.0f} {dict_bytes / catalog_bytes:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
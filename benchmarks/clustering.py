@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Louvain community detection: planted graphs and cluster_catalog end to end
+
+Each synthetic school of a planted-partition graph links to 12 random
+schools of its own group and 4 random others (roughly the shape of a top-k
+similarity graph); the recovered communities are compared with the planted
+groups by modularity. This times louvain() alone, on a prebuilt graph.
+
+With --catalog-sizes, cluster_catalog() is also timed end to end (neighbour
+graph plus Louvain) on schema-faithful synthetic catalogs, with the
+approximate neighbour graph and, up to --exact-limit schools, the exact one.
+
+    python -m benchmarks.clustering --sizes 10000 100000 --catalog-sizes 10000 30000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from analysis.catalog import Catalog
+from analysis.clustering import cluster_catalog, louvain, modularity
+from analysis.graph import symmetric_csr
+from analysis.similarity import SimilarityEngine
+from benchmarks.synthetic import synthetic_dataset
+
+
+def planted_graph(n, groups, inside=12, outside=4, seed=0):
+    rng = np.random.default_rng(seed)
+    group = rng.integers(0, groups, n)
+    order = np.argsort(group, kind='stable')
+    starts = np.searchsorted(group[order], np.arange(groups))
+    sizes = np.bincount(group, minlength=groups)
+    rows = np.repeat(np.arange(n), inside + outside)
+    same = order[starts[group][:, None] + (rng.random((n, inside)) * sizes[group][:, None]).astype(np.int64)]
+    other = rng.integers(0, n, (n, outside))
+    cols = np.concatenate((same, other), axis=1).ravel()
+    keep = rows != cols
+    lo, hi = np.minimum(rows[keep], cols[keep]), np.maximum(rows[keep], cols[keep])
+    _, first = np.unique(lo * n + hi, return_index=True)
+    weights = rng.uniform(1.0, 5.0, len(first))
+    return symmetric_csr(n, lo[first], hi[first], weights), group
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--catalog-sizes', type=int, nargs='*', default=[])
+    parser.add_argument('--exact-limit', type=int, default=10_000, help="largest catalog clustered exactly too")
+    parser.add_argument('--profile', default='3d-clustering')
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        (indptr, indices, weights), group = planted_graph(n, max(2, n // 200))
+        start = time.perf_counter()
+        labels = louvain(indptr, indices, weights)
+        elapsed = time.perf_counter() - start
+        found = modularity(indptr, indices, weights, labels)
+        planted = modularity(indptr, indices, weights, group)
+        print(f"n={n:>7}  edges={len(indices) // 2:>8}  {elapsed:6.2f} s  "
+              f"clusters={len(np.unique(labels))}  modularity {found:.3f} (planted {planted:.3f})")
+
+    for n in args.catalog_sizes:
+        engine = SimilarityEngine(Catalog.from_universities(synthetic_dataset(n)['universities']), (args.profile,))
+        modes = (True, False) if n <= args.exact_limit else (True,)
+        for approximate in modes:
+            start = time.perf_counter()
+            labels = cluster_catalog(engine, approximate=approximate)
+            elapsed = time.perf_counter() - start
+            print(f"n={n:>7}  cluster_catalog {'approximate' if approximate else 'exact':>11}  {elapsed:7.2f} s  "
+                  f"clusters={len(np.unique(labels))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Radius query scaling: GeoIndex vs. a full haversine scan
+
+Points are spread uniformly over Germany's bounding box and the radius shrinks
+with catalog size so every query returns roughly the same number of schools;
+the scan cost grows linearly with N while the index cost should stay nearly flat.
+
+    python -m benchmarks.geo_radius --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from analysis.geo import GeoIndex, haversine_km
+
+LAT_RANGE = (47.3, 55.0)
+LNG_RANGE = (5.9, 15.0)
+AREA_KM2 = 357_000
+
+
+def bench(n, queries=200, expected_hits=25, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(*LAT_RANGE, n)
+    lng = rng.uniform(*LNG_RANGE, n)
+    radius = math.sqrt(expected_hits * AREA_KM2 / n / math.pi)
+    centers = np.column_stack((rng.uniform(*LAT_RANGE, queries), rng.uniform(*LNG_RANGE, queries)))
+
+    start = time.perf_counter()
+    index = GeoIndex(lat, lng)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = sum(len(index.within(a, b, radius)) for a, b in centers)
+    indexed = (time.perf_counter() - start) / queries
+
+    start = time.perf_counter()
+    for a, b in centers:
+        np.flatnonzero(haversine_km(a, b, lat, lng) <= radius)
+    scan = (time.perf_counter() - start) / queries
+
+    return {'n': n, 'radius_km': radius, 'mean_hits': hits / queries, 'build_s': build,
+            'index_query_ms': indexed * 1e3, 'scan_query_ms': scan * 1e3}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'N':>9} {'radius km':>10} {'hits':>6} {'build s':>8} {'index ms':>9} {'scan ms':>8}")
+    for n in args.sizes:
+        r = bench(n, args.queries)
+        print(f"{r['n']:>9} {r['radius_km']:>10.1f} {r['mean_hits']:>6.1f} {r['build_s']:>8.2f} "
+              f"{r['index_query_ms']:>9.3f} {r['scan_query_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
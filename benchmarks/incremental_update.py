@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Editing one school: full similarity rebuild vs. incremental update
+
+The real dataset is replicated under new names and ids (100x by default),
+results are built once, then a single school's stats are edited and the
+results refreshed both ways. Parsing and encoding are excluded from both.
+
+    python -m benchmarks.incremental_update --copies 100
+"""
+
+import argparse
+import copy
+import json
+import time
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH, Catalog
+from analysis.incremental import compute, record_fingerprint, update
+
+
+def prepare(data):
+    fingerprints = [record_fingerprint(uni) for uni in data['universities'].values()]
+    return Catalog.from_data(data), fingerprints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--copies', type=int, default=100)
+    args = parser.parse_args()
+
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    universities = {}
+    for i in range(args.copies):
+        for name, uni in data['universities'].items():
+            uni = dict(copy.deepcopy(uni), id=f"{uni.get('id')}-{i}")
+            universities[f"{name} #{i}"] = uni
+    data['universities'] = universities
+    catalog, fingerprints = prepare(data)
+    state = compute(catalog, fingerprints)
+
+    edited = copy.deepcopy(data)
+    target = next(iter(edited['universities'].values()))
+    target.setdefault('stats', {})['students'] = 1234
+    catalog, fingerprints = prepare(edited)
+
+    start = time.perf_counter()
+    full = compute(catalog, fingerprints)
+    full_s = time.perf_counter() - start
+    start = time.perf_counter()
+    patched, changes = update(state, catalog, fingerprints)
+    incremental_s = time.perf_counter() - start
+    for profile in full.profiles:
+        assert np.array_equal(full.results[profile].neighbors, patched.results[profile].neighbors)
+        assert np.array_equal(full.results[profile].edges[0], patched.results[profile].edges[0])
+
+    print(f"schools:      {len(catalog)}")
+    print(f"changes:      {changes}")
+    print(f"full rebuild: {full_s * 1e3:.0f} ms")
+    print(f"incremental:  {incremental_s * 1e3:.0f} ms  ({full_s / incremental_s:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
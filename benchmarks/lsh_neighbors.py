@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Exact vs. approximate (hubs + MinHash/LSH + blocking) neighbour lists
+
+Two kinds of synthetic catalog are measured at every size:
+
+- "near-duplicate": schools copy a random real school and swap a share of
+  its program names and specializations for variants from a larger
+  vocabulary, so token sets are near-duplicates by construction;
+- "schema": benchmarks.synthetic.synthetic_dataset, with programs and
+  specializations drawn by their real frequencies.
+
+Reports build times, the LSH and blocking candidate pairs scored and the
+recall of the approximate top-k against the exact one, next to the
+sampled estimate approximate_index() stores.
+
+    python -m benchmarks.lsh_neighbors --sizes 2000 10000 --k 10
+"""
+
+import argparse
+import copy
+import json
+import time
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH, Catalog
+from analysis.lsh import approximate_index, candidate_pairs, recall
+from analysis.neighbors import NeighborIndex
+from analysis.similarity import SimilarityEngine
+from benchmarks.synthetic import Pools, synthetic_dataset
+
+
+def synthetic_catalog(universities, n, variants=20, mutate=0.3, seed=0):
+    rng = np.random.default_rng(seed)
+    templates = list(universities.values())
+    schools = {}
+    for i, t in enumerate(rng.integers(0, len(templates), n).tolist()):
+        uni = copy.deepcopy(templates[t])
+        for program in uni.get('programs', []):
+            if rng.random() < mutate:
+                program['name'] = f"{program.get('name', '')} {rng.integers(variants)}"
+            program['specializations'] = [
+                f"{spec} {rng.integers(variants)}" if rng.random() < mutate else spec
+                for spec in program.get('specializations', [])
+            ]
+        schools[f"School {i}"] = dict(uni, id=f"school-{i}")
+    return Catalog.from_universities(schools)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 10000])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--num-perm', type=int, default=96)
+    parser.add_argument('--bands', type=int, default=32)
+    parser.add_argument('--profile', default='3d-clustering')
+    args = parser.parse_args()
+
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        universities = json.load(f)['universities']
+    pools = Pools(universities)
+    catalogs = {
+        'near-duplicate': lambda n: synthetic_catalog(universities, n),
+        'schema': lambda n: Catalog.from_universities(synthetic_dataset(n, pools)['universities']),
+    }
+    for n in args.sizes:
+        for kind, build in catalogs.items():
+            engine = SimilarityEngine(build(n), profiles=(args.profile,))
+            exact, exact_s = timed(lambda: NeighborIndex.build(engine, k_max=args.k))
+            (lo, _), candidates_s = timed(lambda: candidate_pairs(engine, args.num_perm, args.bands))
+            approximate, approximate_s = timed(
+                lambda: approximate_index(engine, args.k, num_perm=args.num_perm, bands=args.bands, min_recall=None))
+            print(f"n={n:>6} {kind:>14}  exact {exact_s:6.2f} s  approximate {approximate_s:6.2f} s "
+                  f"(candidates {candidates_s:.2f} s, {len(lo)} pairs = {2 * len(lo) / (n * (n - 1)):.1%} of all)  "
+                  f"recall@{args.k} {recall(approximate, exact, args.k):.3f} "
+                  f"(estimated {approximate.estimated_recall:.3f})")
+
+if __name__ == "__main__":
+    main()
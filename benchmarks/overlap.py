@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Anchor overlap counting: inverted index vs. pairwise set intersection
+
+Each synthetic school draws a handful of specializations from a large
+vocabulary, so most pairs share nothing; the posting-list path only touches
+schools that share a token with the anchor.
+
+    python -m benchmarks.overlap --sizes 10000 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from analysis.inverted import TokenIndex
+
+
+def bench(n, vocabulary=20_000, per_school=8, anchors=50, seed=0):
+    rng = np.random.default_rng(seed)
+    sets = [set(f"spec-{t}" for t in rng.integers(0, vocabulary, per_school)) for _ in range(n)]
+    index = TokenIndex(sets)
+    picks = rng.integers(0, n, anchors)
+
+    start = time.perf_counter()
+    for a in picks:
+        anchor = sets[a]
+        [len(anchor.intersection(other)) for other in sets]
+    pairwise = (time.perf_counter() - start) / anchors
+
+    start = time.perf_counter()
+    for a in picks:
+        index.overlap(a)
+    indexed = (time.perf_counter() - start) / anchors
+
+    return {'n': n, 'pairwise_ms': pairwise * 1e3, 'index_ms': indexed * 1e3, 'speedup': pairwise / indexed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'N':>9} {'pairwise ms':>12} {'index ms':>9} {'speedup':>8}")
+    for n in args.sizes:
+        r = bench(n)
+        print(f"{r['n']:>9} {r['pairwise_ms']:>12.3f} {r['index_ms']:>9.3f} {r['speedup']:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+All-pairs similarity: serial tiles vs. the shared-memory process pool
+
+The real dataset is replicated under new names (100x by default) and the
+thresholded edge list is computed serially, then with 1, 2, 4, ... workers.
+Worker counts above os.cpu_count() are skipped unless --oversubscribe is
+given, since they cannot show a speedup.
+
+    python -m benchmarks.parallel_similarity --copies 100 --workers 1 2 4 8 16
+"""
+
+import argparse
+import json
+import os
+import time
+
+from analysis.catalog import DATA_PATH, Catalog
+from analysis.parallel import parallel_edges
+from analysis.similarity import SimilarityEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--copies', type=int, default=100)
+    parser.add_argument('--profile', default='d3')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--oversubscribe', action='store_true')
+    args = parser.parse_args()
+
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['universities'] = {f"{name} #{i}": uni for i in range(args.copies)
+                            for name, uni in data['universities'].items()}
+    engine = SimilarityEngine(Catalog.from_data(data), [args.profile])
+    cores = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    edges = len(engine.edges()[0])
+    serial_s = time.perf_counter() - start
+    print(f"schools: {len(engine.catalog)}, edges: {edges}, cores: {cores}")
+    print(f"serial:      {serial_s:.3f} s")
+
+    for workers in args.workers:
+        if workers > cores and not args.oversubscribe:
+            print(f"{workers:2d} workers:  skipped (only {cores} cores)")
+            continue
+        start = time.perf_counter()
+        rows, _, _ = parallel_edges(engine, workers=workers)
+        elapsed = time.perf_counter() - start
+        assert len(rows) == edges
+        print(f"{workers:2d} workers:  {elapsed:.3f} s  ({serial_s / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
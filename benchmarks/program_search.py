@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Program search: index build, reopen and query latency on synthetic catalogs
+
+For every size a synthetic dataset is written to a temporary directory,
+its program search index is built and saved next to the catalog snapshot,
+then reopened (memory-mapped) and a mix of text, facet and combined queries
+is timed. Each query time is the median of --repeat runs.
+
+    python -m benchmarks.program_search --sizes 10000 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from analysis.search import parse_query, program_search
+from analysis.snapshot import cached_catalog
+from benchmarks.synthetic import write_dataset
+
+QUERIES = (
+    "English-language MFA programs in media art with winter deadlines after March",
+    "media art",
+    "sculpture painting installation",
+    "photography in Berlin",
+    "Master of Arts programs in Bavaria with winter deadlines before June",
+    "",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = write_dataset(os.path.join(workdir, f'catalog_{n}.json'), n, seed=args.seed)
+            cache_dir = os.path.join(workdir, 'cache')
+            catalog = cached_catalog(path, cache_dir)
+            start = time.perf_counter()
+            program_search(path, cache_dir, catalog)
+            built = time.perf_counter() - start
+            start = time.perf_counter()
+            search = program_search(path, cache_dir)
+            opened = time.perf_counter() - start
+            print(f"schools={n}  programs={search.count}  words={len(search.terms)}  "
+                  f"build {built:.2f} s  reopen {opened * 1e3:.1f} ms")
+            for query in QUERIES:
+                text, filters = parse_query(query, search)
+                times = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    found = search.search(text, 10, **filters)
+                    times.append(time.perf_counter() - start)
+                print(f"   {np.median(times) * 1e3:8.2f} ms  {found['total']:>8} matches  {query or '(everything)'}")
+
+
+if __name__ == "__main__":
+    main()
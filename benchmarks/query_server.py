@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Latency of the local query server under concurrent clients
+
+Starts analysis.server in-process on a free port, then runs --clients
+keep-alive connections that each replay a mix of neighbour, ranking,
+aggregate and summary queries. The first round fills the cache (misses),
+later rounds are answered from it (hits); latency percentiles are reported
+per round. The server works on a temporary copy of the data file, whose
+mtime is finally bumped to show that the next request reloads the dataset
+and misses again.
+
+    python -m benchmarks.query_server --clients 16 --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH
+from analysis.server import QueryServer, QueryService
+
+
+def query_mix(names, count, seed=0):
+    """`count` request targets over a realistic spread of endpoints"""
+    rng = np.random.default_rng(seed)
+    targets = []
+    for i in range(count):
+        kind = i % 5
+        if kind < 2:
+            params = {'name': names[rng.integers(len(names))], 'k': 10, 'profile': ('d3', '3d-clustering')[kind]}
+            targets.append('/neighbors?' + urlencode(params))
+        elif kind == 2:
+            field = ('students', 'acceptance_rate', 'employment_rate_1_year', 'living_costs_city')[rng.integers(4)]
+            targets.append('/rank?' + urlencode({'field': field, 'k': 5, 'order': 'desc' if rng.random() < 0.5 else 'asc'}))
+        elif kind == 3:
+            targets.append('/aggregate?' + urlencode({'metric': ('employment', 'living_cost', 'research')[rng.integers(3)]}))
+        else:
+            targets.append('/summary?' + urlencode({'field': 'students', 'by': ('type', 'state')[rng.integers(2)]}))
+    return targets
+
+
+async def client(host, port, targets):
+    """Latencies (seconds) of the targets sent over one keep-alive connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    latencies = []
+    for target in targets:
+        start = time.perf_counter()
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('utf-8'))
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = int(next(line.split(b':')[1] for line in head.split(b'\r\n') if line.lower().startswith(b'content-length')))
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    return latencies
+
+
+async def run(args, workdir):
+    path = shutil.copy(args.data, os.path.join(workdir, os.path.basename(args.data)))
+    service = QueryService(path, cache_size=args.cache_size, state_dir=workdir, cache_dir=workdir)
+    server = QueryServer(service, '127.0.0.1', 0)
+    start = time.perf_counter()
+    await server.start()
+    print(f"🚀 Dataset loaded in {time.perf_counter() - start:.2f} s ({len(service.dataset.catalog)} schools)")
+    targets = query_mix(service.dataset.catalog.names, args.queries, args.seed)
+
+    async def round_trip(label):
+        hits, misses = service.cache.hits, service.cache.misses
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client('127.0.0.1', server.port, targets[c::args.clients])
+                                         for c in range(args.clients)))
+        elapsed = time.perf_counter() - start
+        latencies = np.concatenate(results) * 1e3
+        print(f"   {label:<14} {len(latencies):6d} requests  {len(latencies) / elapsed:9.0f} req/s  "
+              f"p50 {np.percentile(latencies, 50):7.3f} ms  p99 {np.percentile(latencies, 99):7.3f} ms  "
+              f"(hits {service.cache.hits - hits}, misses {service.cache.misses - misses})")
+
+    for r in range(args.rounds):
+        await round_trip('cold' if r == 0 else f'warm {r}')
+    os.utime(path)  # a "changed" data file: next requests reload and miss
+    await round_trip('after change')
+    server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--queries', type=int, default=2000, help="requests per round, split over the clients")
+    parser.add_argument('--rounds', type=int, default=4)
+    parser.add_argument('--cache-size', type=int, default=4096)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(run(args, workdir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Cold-start load time: json.load + Catalog build vs. memory-mapped snapshot
+
+The real dataset is replicated under new names (1000x by default) into a
+temporary file, then loaded three ways.
+
+    python -m benchmarks.snapshot_load --copies 1000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from analysis.catalog import DATA_PATH, Catalog
+from analysis.snapshot import cached_catalog
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--copies', type=int, default=1000)
+    args = parser.parse_args()
+
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['universities'] = {f"{name} #{i}": uni for i in range(args.copies)
+                            for name, uni in data['universities'].items()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        del data
+        cache_dir = os.path.join(tmp, 'cache')
+
+        def parse():
+            with open(path, 'r', encoding='utf-8') as f:
+                return Catalog.from_data(json.load(f))
+
+        catalog, parse_s = timed(parse)
+        _, first_s = timed(lambda: cached_catalog(path, cache_dir))
+        warm, warm_s = timed(lambda: cached_catalog(path, cache_dir))
+        assert warm.names == catalog.names
+
+        print(f"schools:                {len(catalog)}")
+        print(f"source size:            {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"json.load + build:      {parse_s:.3f} s")
+        print(f"first run (+ snapshot): {first_s:.3f} s")
+        print(f"snapshot (mmap):        {warm_s:.3f} s  ({parse_s / warm_s:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
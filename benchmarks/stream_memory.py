@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Peak memory of a top-k ranking: json.load vs. streaming ingestion
+
+The real dataset is replicated under new names (1000x by default) into a
+temporary file, then the top-5 schools by student count are computed both
+ways under tracemalloc.
+
+    python -m benchmarks.stream_memory --copies 1000
+"""
+
+import argparse
+import heapq
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from analysis.catalog import DATA_PATH
+from analysis.stream import iter_universities
+
+
+def measured(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def top_students(items):
+    return heapq.nlargest(5, ((name, uni.get('stats', {}).get('students', 0)) for name, uni in items),
+                          key=lambda x: x[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--copies', type=int, default=1000)
+    args = parser.parse_args()
+
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['universities'] = {f"{name} #{i}": uni for i in range(args.copies)
+                            for name, uni in data['universities'].items()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        schools = len(data['universities'])
+        del data
+
+        def loaded():
+            with open(path, 'r', encoding='utf-8') as f:
+                return top_students(json.load(f)['universities'].items())
+
+        expected, load_s, load_peak = measured(loaded)
+        streamed, stream_s, stream_peak = measured(lambda: top_students(iter_universities(path)))
+        assert streamed == expected
+
+        print(f"schools:           {schools}")
+        print(f"source size:       {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"json.load:         {load_s:.3f} s, peak {load_peak / 1e6:.1f} MB")
+        print(f"streaming:         {stream_s:.3f} s, peak {stream_peak / 1e6:.1f} MB  "
+              f"({load_peak / stream_peak:.0f}x less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Timed benchmarks of the analysis hot paths on synthetic catalogs
+
+For every size a schema-faithful synthetic dataset is written to a
+temporary file (benchmarks.synthetic), then loading, pairwise scoring,
+anchor queries (test_bremen_connections), top-k neighbour lists, clustering
+and the feature-report aggregation (test_enhanced_features) are timed. Each
+timing is the best of --repeat runs. Above --exact-limit schools the top-k
+lists come from analysis.lsh.approximate_index; their recall@k against exact
+rows of --recall-anchors sampled anchors is recorded with the top_k and
+clustering results, which also name the mode. Results are saved as JSON;
+pass an earlier results file with --compare to print the change per
+benchmark (flagging a change of mode).
+
+    python -m benchmarks.suite --sizes 1000 10000 100000 --compare .cache/benchmarks/previous.json
+"""
+
+import argparse
+import heapq
+import json
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+
+from analysis.aggregate import aggregate
+from analysis.catalog import load_catalog
+from analysis.clustering import CLUSTER_K, cluster_knn
+from analysis.lsh import approximate_index, estimate_recall
+from analysis.neighbors import NeighborIndex
+from analysis.similarity import SimilarityEngine, get_profile
+from analysis.snapshot import cached_catalog
+from benchmarks.synthetic import Pools, write_dataset
+
+OUT_DIR = '.cache/benchmarks'
+PROFILES = ('d3', '3d-clustering')
+
+
+def measure(fn, repeat=3, budget=10.0):
+    """(last result, best time); stops repeating once `budget` seconds are spent"""
+    times = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - start)
+        if sum(times) > budget:
+            break
+    return value, min(times)
+
+
+def anchor_query(engine, profile, anchor, k=8):
+    """The test_bremen_connections hot path for one anchor: score, threshold, best k"""
+    scores = engine.block([anchor], profile)[0]
+    passing = np.flatnonzero(profile.passes(scores))
+    values = scores.tolist()
+    return heapq.nlargest(k, (j for j in passing.tolist() if j != anchor), key=values.__getitem__)
+
+
+def run_size(n, pools, args, workdir):
+    """Every benchmark for one catalog size, as result dicts"""
+    results = []
+
+    def record(benchmark, seconds, **extra):
+        results.append(dict({'benchmark': benchmark, 'size': n, 'seconds': seconds}, **extra))
+        details = '  '.join(f"{key}={value}" for key, value in extra.items())
+        print(f"   {benchmark:<16} {seconds:10.4f} s  {details}")
+
+    path = os.path.join(workdir, f'catalog_{n}.json')
+    _, seconds = measure(lambda: write_dataset(path, n, pools, args.seed), repeat=1)
+    record('generate', seconds, megabytes=round(os.path.getsize(path) / 2**20, 1))
+
+    catalog, seconds = measure(lambda: load_catalog(path, cache=False), args.repeat)
+    record('load_json', seconds)
+    cache_dir = os.path.join(workdir, 'snapshots')
+    cached_catalog(path, cache_dir)
+    _, seconds = measure(lambda: cached_catalog(path, cache_dir), args.repeat)
+    record('load_snapshot', seconds)
+
+    _, seconds = measure(lambda: aggregate(path), args.repeat)
+    record('aggregate', seconds)
+
+    engine = SimilarityEngine(catalog, PROFILES)
+    anchors = np.random.default_rng(args.seed).choice(n, min(n, args.anchors), replace=False)
+    _, seconds = measure(lambda: engine.score_profiles(anchors), args.repeat)
+    pairs = len(anchors) * n
+    record('pairwise_scoring', seconds, pairs=pairs, pairs_per_second=round(pairs / seconds),
+           full_matrix_estimate_s=round(seconds * n / len(anchors), 2))
+
+    profile = get_profile('3d-clustering')
+    _, seconds = measure(lambda: [anchor_query(engine, profile, a) for a in anchors[:args.queries].tolist()],
+                         args.repeat)
+    record('anchor_query', seconds / min(args.queries, len(anchors)), unit='per anchor')
+
+    if n <= args.exact_limit:
+        index, seconds = measure(lambda: NeighborIndex.build(engine, k_max=CLUSTER_K, profile=profile), 1)
+        mode, recall = 'exact', 1.0
+    else:
+        index, seconds = measure(lambda: approximate_index(engine, k_max=CLUSTER_K, profile=profile, sample=0), 1)
+        # The approximate graph is sparser than the exact one; record how much so that
+        # runs of different modes are not compared blindly
+        mode, recall = 'lsh', round(estimate_recall(index, CLUSTER_K, args.recall_anchors, args.seed), 4)
+    record('top_k', seconds, mode=mode, k=CLUSTER_K, recall=recall)
+
+    labels, seconds = measure(lambda: cluster_knn(index.indices, index.scores, profile), 1)
+    record('clustering', seconds, clusters=int(labels.max()) + 1, mode=mode, recall=recall)
+    return results
+
+
+def compare(results, previous_path):
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+    print(f"\n📈 Compared with {previous_path} (ratio > 1 is slower):")
+    for r in results:
+        before = previous.get((r['benchmark'], r['size']))
+        if before and before['seconds']:
+            note = f"  (mode {before['mode']} -> {r['mode']})" if before.get('mode') != r.get('mode') else ''
+            print(f"   {r['benchmark']:<16} n={r['size']:<7} {before['seconds']:9.3f} s -> {r['seconds']:9.3f} s  "
+                  f"x{r['seconds'] / before['seconds']:.2f}{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--anchors', type=int, default=256, help="anchor rows for pairwise scoring")
+    parser.add_argument('--queries', type=int, default=32, help="anchors for the per-anchor query")
+    parser.add_argument('--exact-limit', type=int, default=10000, help="largest size for exact top-k")
+    parser.add_argument('--recall-anchors', type=int, default=200,
+                        help="anchors scored exactly to estimate the recall of approximate top-k")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="results file (default: timestamped file in .cache/benchmarks)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    pools = Pools.from_file()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            print(f"🏫 {n} synthetic schools")
+            results.extend(run_size(n, pools, args, workdir))
+
+    out = args.out or os.path.join(OUT_DIR, time.strftime('suite-%Y%m%d-%H%M%S.json'))
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'arguments': {key: value for key, value in vars(args).items() if key not in ('out', 'compare')},
+        'results': results,
+    }
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Synthetic catalogs with the schema of the enhanced dataset, at any size
+
+Every field is sampled from the real file: type, state, city and
+coordinates (jittered) from a random real school; ranking and stats from the
+empirical distributions with noise; programs from the pool of real programs,
+each with specializations drawn by their real frequency. The enhanced
+sections read by the feature report, collaborations and overlap clusters are
+generated too, so every analysis has work to do.
+
+    python -m benchmarks.synthetic 10000 --out /tmp/catalog_10k.json
+"""
+
+import argparse
+import json
+from collections import Counter
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH
+
+PROGRAM_FIELDS = ('name', 'degree', 'applicationDeadlines', 'language', 'duration', 'description')
+
+
+class Pools:
+    """Empirical value pools of the real dataset"""
+
+    def __init__(self, universities):
+        schools = list(universities.values())
+        self.places = [(u.get('type'), u.get('state'), u.get('city'), u.get('coordinates')) for u in schools]
+        self.descriptions = [u['description'] for u in schools if u.get('description')]
+        self.rankings = [u['ranking']['national'] for u in schools if u.get('ranking', {}).get('national')]
+        stats = [u.get('stats', {}) for u in schools]
+        self.stats = {field: [s[field] for s in stats if s.get(field)]
+                      for field in ('students', 'acceptance_rate', 'student_staff_ratio', 'founded')}
+        self.programs = [p for u in schools for p in u.get('programs', [])]
+        self.program_counts = [len(u.get('programs', [])) for u in schools]
+        self.spec_counts = [len(p.get('specializations', [])) for p in self.programs]
+        counts = Counter(spec for p in self.programs for spec in p.get('specializations', []))
+        self.specializations = list(counts)
+        weights = np.asarray([counts[s] for s in self.specializations], dtype=np.float64)
+        self.spec_cdf = np.cumsum(weights / weights.sum())
+
+    @classmethod
+    def from_file(cls, path=DATA_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['universities'])
+
+
+def _program(pools, rng):
+    template = pools.programs[rng.integers(len(pools.programs))]
+    program = {field: template[field] for field in PROGRAM_FIELDS if field in template}
+    count = pools.spec_counts[rng.integers(len(pools.spec_counts))]
+    # Frequency-weighted draws, duplicates dropped (rng.choice without replacement is far slower)
+    picks = np.searchsorted(pools.spec_cdf, rng.random(2 * count), side='right').clip(max=len(pools.specializations) - 1)
+    program['specializations'] = [pools.specializations[i] for i in dict.fromkeys(picks.tolist())][:count]
+    return program
+
+
+def _enhanced(rng):
+    return {
+        'employment_outcomes': {'employment_rate_1_year': round(float(rng.uniform(0.5, 0.95)), 2)},
+        'financial_data': {'living_costs_city': int(rng.choice([780, 850, 900, 950, 1000, 1150]))},
+        'international_profile': {'international_students_percentage': round(float(rng.uniform(0.05, 0.4)), 2)},
+        'sustainability': {'renewable_energy_percentage': round(float(rng.uniform(0.2, 1.0)), 1),
+                           'carbon_neutral_target': int(rng.choice([2030, 2035, 2040]))},
+        'research_innovation': {'research_projects_active': int(rng.integers(1, 40)),
+                                'research_funding_millions': round(float(rng.uniform(0.1, 10)), 1)},
+        'digital_infrastructure': {'digital_fabrication_labs': int(rng.integers(0, 6)),
+                                   'vr_ar_facilities': int(rng.integers(0, 4)),
+                                   'tech_equipment_budget_per_student': int(rng.choice([200, 500, 800]))},
+    }
+
+
+def synthetic_dataset(n, pools=None, seed=0, collaborations=2.0, enhanced=0.8):
+    """Dataset dict with `n` schools; `collaborations` per school on average"""
+    pools = pools or Pools.from_file()
+    rng = np.random.default_rng(seed)
+    universities = {}
+    for i in range(n):
+        school_type, state, city, coordinates = pools.places[rng.integers(len(pools.places))]
+        stats = {field: values[rng.integers(len(values))] for field, values in pools.stats.items() if values}
+        if 'students' in stats:
+            stats['students'] = int(stats['students'] * rng.uniform(0.7, 1.3))
+        if 'acceptance_rate' in stats:
+            stats['acceptance_rate'] = round(float(np.clip(stats['acceptance_rate'] + rng.normal(0, 0.03), 0.01, 1)), 2)
+        uni = {'id': f'synthetic-{i}'}
+        if coordinates:
+            uni['coordinates'] = {'lat': round(coordinates['lat'] + float(rng.normal(0, 0.05)), 4),
+                                  'lng': round(coordinates['lng'] + float(rng.normal(0, 0.05)), 4)}
+        uni.update({
+            'ranking': {'national': int(max(1, pools.rankings[rng.integers(len(pools.rankings))] + rng.integers(-5, 6)))},
+            'stats': stats,
+            'city': city,
+            'state': state,
+            'type': school_type,
+            'programs': [_program(pools, rng) for _ in range(max(1, pools.program_counts[rng.integers(len(pools.program_counts))]))],
+            'website': f'https://synthetic-{i}.example',
+        })
+        if pools.descriptions:
+            uni['description'] = pools.descriptions[rng.integers(len(pools.descriptions))]
+        if rng.random() < enhanced:
+            uni.update(_enhanced(rng))
+        universities[f"Synthetic {str(school_type).replace('_', ' ').title()} {city} {i}"] = uni
+
+    names = list(universities)
+    edges = int(n * collaborations / 2)
+    left, right = rng.integers(0, n, edges), rng.integers(0, n, edges)
+    strength = np.round(rng.uniform(0.1, 1.0, edges), 2)
+    clusters = {}
+    for school_type in sorted({str(u['type']) for u in universities.values()}):
+        members = [name for name, u in universities.items() if str(u['type']) == school_type]
+        clusters[f'{school_type}_cluster'] = members[:50]
+    return {
+        'statistics': {'total_schools': n, 'total_programs': sum(len(u['programs']) for u in universities.values())},
+        'universities': universities,
+        'relationships': {'academic_collaborations': [[names[a], names[b], s] for a, b, s in
+                                                      zip(left.tolist(), right.tolist(), strength.tolist())]},
+        'similarity_matrix': {'program_overlap': clusters},
+    }
+
+
+def write_dataset(path, n, pools=None, seed=0):
+    """Generate and write a synthetic dataset file; returns its path"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(synthetic_dataset(n, pools, seed), f, ensure_ascii=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('size', type=int)
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_dataset(args.out, args.size, seed=args.seed)
+    print(f"📦 Wrote {args.size} synthetic schools to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+One batched weight sweep vs. one full run per weight vector
+
+On a synthetic catalog, --variants random weight vectors around a profile
+are evaluated with analysis.sweep.weight_sweep (with and without clustering
+every variant). The per-variant baseline builds a NeighborIndex, counts the
+connections and clusters for a few of the vectors, and is extrapolated to
+the whole sweep; the sweep's figures are checked against those runs.
+
+    python -m benchmarks.weight_sweep --size 5000 --variants 200
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from analysis.catalog import load_catalog
+from analysis.clustering import cluster_knn
+from analysis.neighbors import NeighborIndex
+from analysis.similarity import SimilarityEngine
+from analysis.sweep import random_weights, variant_profile, weight_sweep
+from benchmarks.synthetic import write_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=5000)
+    parser.add_argument('--variants', type=int, default=200)
+    parser.add_argument('--profile', default='d3')
+    parser.add_argument('--baseline-runs', type=int, default=3, help="full runs timed for the extrapolation")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'catalog.json')
+        write_dataset(path, args.size, seed=args.seed)
+        catalog = load_catalog(path, cache=False)
+    weights = random_weights(args.profile, args.variants, seed=args.seed)
+    engine = SimilarityEngine(catalog, (args.profile,))
+    print(f"schools: {len(catalog)}, weight vectors: {len(weights)}")
+
+    start = time.perf_counter()
+    weight_sweep(engine, weights, args.profile, clusters=False)
+    print(f"sweep, neighbours only:   {time.perf_counter() - start:8.2f} s")
+    start = time.perf_counter()
+    result = weight_sweep(engine, weights, args.profile)
+    sweep_s = time.perf_counter() - start
+    print(f"sweep, with clusters:     {sweep_s:8.2f} s")
+
+    start = time.perf_counter()
+    runs = range(min(args.baseline_runs, len(weights)))
+    for v in runs:
+        profile = variant_profile(args.profile, weights[v])
+        single = SimilarityEngine(engine.catalog, (profile,))
+        index = NeighborIndex.build(single, k_max=result.k, profile=profile)
+        clusters = int(cluster_knn(index.indices, index.scores, profile).max()) + 1
+        edges = len(single.edges(profile=profile)[0])
+        assert (clusters, edges) == (result.clusters[v], result.edges[v])
+    per_run = (time.perf_counter() - start) / len(runs)
+    print(f"one run per vector:       {per_run * len(weights):8.2f} s  "
+          f"(extrapolated from {len(runs)} x {per_run:.2f} s, {per_run * len(weights) / sweep_s:.1f}x the sweep)")
+
+
+if __name__ == "__main__":
+    main()
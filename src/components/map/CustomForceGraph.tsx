@@ -6,6 +6,7 @@ import { Line, Html, Instance, Instances } from '@react-three/drei'
 import * as THREE from 'three'
 // import * as d3 from 'd3' // Remove D3 import
 import { useSchoolStore, ProcessedUniversity } from '@/stores/schoolStore'
+import { loadSimilarityGraph, graphPosition, SimilarityGraph } from '@/utils/similarityGraph'
 
 // Constants
 const LERP_FACTOR = 0.1;
@@ -15,6 +16,7 @@ const REPULSION_STRENGTH = 0.8 * FORCE_SCALE; // How strongly nodes push each ot
 const REPULSION_DISTANCE_MIN = 0.5; // Minimum distance before repulsion starts
 const REPULSION_DISTANCE_MAX = 4.0; // Maximum distance where repulsion has effect
 const DAMPING = 0.95; // Slows down node movement
+const LAYOUT_SCALE = 2.0; // Spreads the precomputed layout (about +-2 units) over the random start volume
 
 // Interface for node data managed within R3F
 interface GraphNode {
@@ -81,6 +83,18 @@ export default function CustomForceGraph({
   const [nodes, setNodes] = useState<GraphNode[]>([])
   const [links, setLinks] = useState<GraphLink[]>([])
   const nodesRef = useRef<GraphNode[]>([]); // Ref to access current node state in useFrame
+  const settledRef = useRef(false); // True when positions come from the precomputed layout
+
+  // Precomputed layout from `npm run build:graph`: undefined while loading, null when unavailable
+  const [layout, setLayout] = useState<SimilarityGraph | null | undefined>(undefined)
+
+  useEffect(() => {
+    let cancelled = false;
+    loadSimilarityGraph('3d-clustering').then(graph => {
+      if (!cancelled) setLayout(graph);
+    });
+    return () => { cancelled = true; };
+  }, []);
 
   const [hoveredInstanceId, setHoveredInstanceId] = useState<number | null>(null)
   const [selectedInstanceId, setSelectedInstanceId] = useState<number | null>(null)
@@ -108,20 +122,29 @@ export default function CustomForceGraph({
         return;
     };
 
+    if (layout === undefined) return; // Wait for the precomputed layout (or its absence)
+
     console.log("GraphLayout: Creating initial data structure.");
 
+    // Use the offline layout (analysis/layout.py) only if it covers every school
+    const precomputed = layout ? processedUniversities.map(uni => graphPosition(layout, uni.name)) : [];
+    const settled = precomputed.length === processedUniversities.length && precomputed.every(p => p !== null);
+    settledRef.current = settled;
+
     const newNodes: GraphNode[] = processedUniversities.map((uni, i) => ({
       id: uni.name,
       name: uni.name,
       type: uni.type,
       state: uni.state,
       university: uni,
-      // Initial random position and zero velocity
-      pos: new THREE.Vector3(
-        (Math.random() - 0.5) * 8,
-        (Math.random() - 0.5) * 8,
-        (Math.random() - 0.5) * 8
-      ),
+      // Initial position (precomputed or random) and zero velocity
+      pos: settled
+        ? new THREE.Vector3(...precomputed[i]!).multiplyScalar(LAYOUT_SCALE)
+        : new THREE.Vector3(
+            (Math.random() - 0.5) * 8,
+            (Math.random() - 0.5) * 8,
+            (Math.random() - 0.5) * 8
+          ),
       vel: new THREE.Vector3(0, 0, 0),
       // Initial visual states
       currentScale: 1.0, targetScale: 1.0,
@@ -191,7 +214,7 @@ export default function CustomForceGraph({
     nodesRef.current = newNodes; // Update ref
 
     console.log("GraphLayout: Initial data structure created.");
-  }, [processedUniversities, getNodeColor, getEmissiveColor]); // Dependencies remain
+  }, [processedUniversities, getNodeColor, getEmissiveColor, layout]); // Dependencies remain
 
 
   // Effect to update target visual properties based on hover/selection
@@ -272,8 +295,8 @@ export default function CustomForceGraph({
 
     const currentNodes = nodesRef.current;
 
-    // --- Calculate Forces and Update Positions ---
-    currentNodes.forEach((node) => {
+    // --- Calculate Forces and Update Positions (skipped for a precomputed layout) ---
+    if (!settledRef.current) currentNodes.forEach((node) => {
         // 1. Center Attraction
         tempVec3.copy(node.pos).multiplyScalar(-CENTER_ATTRACTION);
         node.vel.addScaledVector(tempVec3, dt); // Apply force towards center (0,0,0)
@@ -1,10 +1,11 @@
 // src/components/map/NetworkGraph.tsx
-import React, { useRef, useEffect, useMemo } from 'react';
+import React, { useRef, useEffect, useMemo, useState } from 'react';
 import { useFrame } from '@react-three/fiber';
 import * as THREE from 'three';
 import * as d3 from 'd3-force-3d';
 import { type ProcessedUniversity } from '@/stores/schoolStore';
 import { type Simulation as D3Simulation } from 'd3-force';
+import { loadSimilarityGraph, graphPosition, type SimilarityGraph } from '@/utils/similarityGraph';
 // No longer using shader material
 
 // Constants for node appearance - significantly increased for better visibility
@@ -191,6 +192,16 @@ export default function NetworkGraph({
   // Add refs to store current and target scales for smooth interpolation
   const currentScalesRef = useRef<Float32Array | null>(null);
   const targetScalesRef = useRef<Float32Array | null>(null);
+  // Precomputed layout from `npm run build:graph`: undefined while loading, null when unavailable
+  const [layout, setLayout] = useState<SimilarityGraph | null | undefined>(undefined);
+
+  useEffect(() => {
+    let cancelled = false;
+    loadSimilarityGraph('3d-clustering').then(graph => {
+      if (!cancelled) setLayout(graph);
+    });
+    return () => { cancelled = true; };
+  }, []);
 
   const createMaterialsForTypes = () => {
     const materials: { [key: string]: THREE.Material } = {};
@@ -498,18 +509,26 @@ export default function NetworkGraph({
 
   // --- D3 Force Simulation ---
   useEffect(() => {
+    if (layout === undefined) return; // Wait for the precomputed layout (or its absence)
     console.log('NetworkGraph: Initializing enhanced similarity-based simulation for InstancedMesh.');
 
-    nodesRef.current = universities.map((uni) => ({
-      id: uni.name,
-      type: uni.type,
-      programCount: uni.programTypes?.length || 0,
-      originalData: uni,
-      // Initialize positions based on geographical coordinates with some randomization
-      x: uni.coordinates?.lng ? (uni.coordinates.lng - 10) * 0.8 + (Math.random() - 0.5) * 1 : Math.random() * 8 - 4,
-      y: uni.coordinates?.lat ? (uni.coordinates.lat - 50) * 0.8 + (Math.random() - 0.5) * 1 : Math.random() * 8 - 4,
-      z: Math.random() * 3 - 1.5, // Smaller Z range for better clustering visibility
-    }));
+    // Use the offline layout (analysis/layout.py) only if it covers every school
+    const precomputed = layout ? universities.map(uni => graphPosition(layout, uni.name)) : [];
+    const settled = precomputed.length === universities.length && precomputed.every(p => p !== null);
+
+    nodesRef.current = universities.map((uni, i) => {
+      const p = settled ? precomputed[i] : null;
+      return {
+        id: uni.name,
+        type: uni.type,
+        programCount: uni.programTypes?.length || 0,
+        originalData: uni,
+        // Initialize positions from the precomputed layout, or from geographical coordinates with some randomization
+        x: p ? p[0] : uni.coordinates?.lng ? (uni.coordinates.lng - 10) * 0.8 + (Math.random() - 0.5) * 1 : Math.random() * 8 - 4,
+        y: p ? p[1] : uni.coordinates?.lat ? (uni.coordinates.lat - 50) * 0.8 + (Math.random() - 0.5) * 1 : Math.random() * 8 - 4,
+        z: p ? p[2] : Math.random() * 3 - 1.5, // Smaller Z range for better clustering visibility
+      };
+    });
 
     // Create similarity-based links
     const similarityLinks = createSimilarityLinks(universities);
@@ -615,8 +634,13 @@ export default function NetworkGraph({
     };
 
     simulation.on('tick', handleTick)
-    console.log("NetworkGraph: Starting simulation heating.");
-    simulation.alpha(1).restart();
+    if (settled) {
+      console.log("NetworkGraph: Using precomputed layout, skipping the force settle.");
+      handleTick();
+    } else {
+      console.log("NetworkGraph: Starting simulation heating.");
+      simulation.alpha(1).restart();
+    }
 
     return () => {
       console.log('NetworkGraph: Stopping simulation and cleaning up.')
@@ -628,7 +652,7 @@ export default function NetworkGraph({
       nodesRef.current = []
       positionMapRef.current.clear()
     }
-  }, [universities, onLayoutUpdate])
+  }, [universities, onLayoutUpdate, layout])
 
   if (universities.length === 0) return null
   console.log(`Rendering InstancedMesh with ${universities.length} instances.`);
@@ -3,6 +3,7 @@
 import React, { useEffect, useRef, useState } from 'react'
 import * as d3 from 'd3'
 import { useSchoolStore, ProcessedUniversity } from '@/stores/schoolStore'
+import { loadSimilarityGraph, graphNeighbors, SimilarityGraph } from '@/utils/similarityGraph'
 // --- Interfaces ---
 // Ensure ProcessedUniversity includes coordinates or adjust access
 // REMOVE temporary interface
@@ -165,6 +166,16 @@ export default function D3NetworkGraph({
   const [links, setLinks] = useState<D3Link[]>([]) // State for dynamic links
   const [neighborMap, setNeighborMap] = useState<Map<string, Set<string>>>(new Map()); // Store neighbors based on current links
   const [zoomScale, setZoomScale] = useState(1); // Track zoom scale
+  const [similarityGraph, setSimilarityGraph] = useState<SimilarityGraph | null>(null); // Precomputed 'd3' profile graph
+
+  // --- Precomputed similarity graph (public/data/similarity_graph.*) ---
+  useEffect(() => {
+    let cancelled = false;
+    loadSimilarityGraph('d3').then(graph => {
+      if (!cancelled) setSimilarityGraph(graph);
+    });
+    return () => { cancelled = true; };
+  }, []);
 
   // --- Data Processing --- Create nodes
   useEffect(() => {
@@ -418,9 +429,29 @@ export default function D3NetworkGraph({
     const selectedNodeData = selectedNodeId ? nodeMapRef.current.get(selectedNodeId) : null;
 
     // Function to Calculate Shared Program Links for the selected node
+    // Links from the exported 'd3' profile graph (analysis/similarity.py), scored at build time
+    const precomputedLinks = (selectedNode: D3Node): D3Link[] | null => {
+        const neighbors = similarityGraph ? graphNeighbors(similarityGraph, selectedNode.id) : null;
+        if (!neighbors) return null;
+
+        const newLinks: D3Link[] = [];
+        for (const neighbor of neighbors) {
+            const targetNode = nodeMapRef.current.get(neighbor.name);
+            if (!targetNode || !doesNodeMatchFilters(targetNode, timelineFilter, activeStateFilter, activeProgramFilter)) {
+                continue;
+            }
+            newLinks.push({ source: selectedNode.id, target: targetNode.id, value: neighbor.score, type: 'program' });
+            if (newLinks.length === 15) break; // Neighbours are already sorted by score
+        }
+        return newLinks;
+    }
+
     const calculateLinks = (selectedNode: D3Node | null | undefined): D3Link[] => {
         if (!selectedNode?.university?.programTypes) return [];
 
+        const precomputed = precomputedLinks(selectedNode);
+        if (precomputed) return precomputed;
+
         const newLinks: D3Link[] = [];
         const selectedPrograms = new Set(selectedNode.university.programTypes);
         const selectedSpecializations = new Set(selectedNode.university.specializationVector || []);
@@ -518,7 +549,7 @@ export default function D3NetworkGraph({
     });
     setNeighborMap(newNeighborMap);
 
-  }, [selectedUniversity, nodes, timelineFilter, activeStateFilter, activeProgramFilter]);
+  }, [selectedUniversity, nodes, timelineFilter, activeStateFilter, activeProgramFilter, similarityGraph]);
 
 
   // --- Effect for Handling Selection, Hover, Filter Updates, and Link Drawing ---
@@ -0,0 +1,148 @@
+import { getAssetPath } from './paths';
+
+/**
+ * Loader for the similarity graphs exported by `npm run build:graph`
+ * (analysis/export.py). The manifest lists school ids/names and, per
+ * profile, where each little-endian array lives in the binary file:
+ * CSR `indptr`/`indices` (int32), `weights` as uint16 codes (score =
+ * code * scale), `clusters` (int32) and `positions` (float32, N x 3).
+ */
+
+export type ArrayDtype = 'int32' | 'uint16' | 'float32';
+
+export interface ArrayEntry {
+  offset: number;
+  length: number;
+  dtype: ArrayDtype;
+}
+
+export interface GraphEntry {
+  threshold: number;
+  inclusive: boolean;
+  edges: number;
+  scale: number;
+  indptr: ArrayEntry;
+  indices: ArrayEntry;
+  weights: ArrayEntry;
+  clusters: ArrayEntry;
+  cluster_count: number;
+  positions?: ArrayEntry;
+  layout_stress?: number;
+}
+
+export interface GraphManifest {
+  version: number;
+  binary: string;
+  ids: string[];
+  names: string[];
+  graphs: Record<string, GraphEntry>;
+}
+
+export interface SimilarityGraph {
+  profile: string;
+  ids: string[];
+  names: string[];
+  scale: number;
+  indptr: Int32Array;
+  indices: Int32Array;
+  weights: Uint16Array;
+  clusters: Int32Array;
+  positions: Float32Array | null;
+  rowByName: Map<string, number>;
+}
+
+export interface GraphNeighbor {
+  name: string;
+  score: number;
+}
+
+const MANIFEST_PATH = 'data/similarity_graph.json';
+
+const isLittleEndian = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+
+let filesPromise: Promise<{ manifest: GraphManifest; buffer: ArrayBuffer } | null> | null = null;
+
+function loadFiles() {
+  if (!filesPromise) {
+    filesPromise = (async () => {
+      try {
+        const manifestResponse = await fetch(getAssetPath(MANIFEST_PATH));
+        if (!manifestResponse.ok) return null;
+        const manifest: GraphManifest = await manifestResponse.json();
+        if (manifest.version !== 1) return null;
+        const binaryResponse = await fetch(getAssetPath(`data/${manifest.binary}`));
+        if (!binaryResponse.ok) return null;
+        return { manifest, buffer: await binaryResponse.arrayBuffer() };
+      } catch (error) {
+        console.warn('Similarity graph not available, falling back to in-browser scores:', error);
+        return null;
+      }
+    })();
+  }
+  return filesPromise;
+}
+
+function view(buffer: ArrayBuffer, entry: ArrayEntry): Int32Array | Uint16Array | Float32Array {
+  const { offset, length, dtype } = entry;
+  if (!isLittleEndian) {
+    // The export is little-endian; decode element by element on big-endian hosts.
+    const data = new DataView(buffer, offset);
+    if (dtype === 'uint16') return Uint16Array.from({ length }, (_, i) => data.getUint16(i * 2, true));
+    if (dtype === 'float32') return Float32Array.from({ length }, (_, i) => data.getFloat32(i * 4, true));
+    return Int32Array.from({ length }, (_, i) => data.getInt32(i * 4, true));
+  }
+  if (dtype === 'uint16') return new Uint16Array(buffer, offset, length);
+  if (dtype === 'float32') return new Float32Array(buffer, offset, length);
+  return new Int32Array(buffer, offset, length);
+}
+
+const graphCache = new Map<string, Promise<SimilarityGraph | null>>();
+
+/**
+ * Exported graph for one profile ('d3' or '3d-clustering'), or null when
+ * the files are missing or do not contain that profile. Fetched once per
+ * page load.
+ */
+export function loadSimilarityGraph(profile: string): Promise<SimilarityGraph | null> {
+  let cached = graphCache.get(profile);
+  if (!cached) {
+    cached = loadFiles().then(files => {
+      const entry = files?.manifest.graphs[profile];
+      if (!files || !entry) return null;
+      const { manifest, buffer } = files;
+      return {
+        profile,
+        ids: manifest.ids,
+        names: manifest.names,
+        scale: entry.scale,
+        indptr: view(buffer, entry.indptr) as Int32Array,
+        indices: view(buffer, entry.indices) as Int32Array,
+        weights: view(buffer, entry.weights) as Uint16Array,
+        clusters: view(buffer, entry.clusters) as Int32Array,
+        positions: entry.positions ? view(buffer, entry.positions) as Float32Array : null,
+        rowByName: new Map(manifest.names.map((name, row) => [name, row] as [string, number])),
+      };
+    });
+    graphCache.set(profile, cached);
+  }
+  return cached;
+}
+
+/** Neighbours of a school above the export threshold, strongest first */
+export function graphNeighbors(graph: SimilarityGraph, name: string): GraphNeighbor[] | null {
+  const row = graph.rowByName.get(name);
+  if (row === undefined) return null;
+  const neighbors: GraphNeighbor[] = [];
+  for (let i = graph.indptr[row]; i < graph.indptr[row + 1]; i++) {
+    neighbors.push({ name: graph.names[graph.indices[i]], score: graph.weights[i] * graph.scale });
+  }
+  return neighbors.sort((a, b) => b.score - a.score);
+}
+
+/** Precomputed [x, y, z] layout position of a school, if the export has one */
+export function graphPosition(graph: SimilarityGraph, name: string): [number, number, number] | null {
+  const row = graph.rowByName.get(name);
+  if (row === undefined || !graph.positions) return null;
+  const p = graph.positions;
+  return [p[row * 3], p[row * 3 + 1], p[row * 3 + 2]];
+}
@@ -3,7 +3,13 @@
 Test script to verify 3D clustering enhancement based on similarity metrics
 """
 
-import json
+import heapq
+
+import numpy as np
+
+from analysis.catalog import load_catalog
+from analysis.instrument import span
+from analysis.similarity import SimilarityEngine, get_profile
 
 def test_bremen_connections():
     """Test which universities should cluster around Bremen in 3D mode"""
@@ -12,120 +18,95 @@ def test_bremen_connections():
     print("=" * 60)
     
     # Load enhanced data
-    with open('src/data/enhanced_german_art_schools.json', 'r') as f:
-        data = json.load(f)
-    
-    unis = data['universities']
-    bremen = unis.get('Hochschule für Künste Bremen')
+    catalog = load_catalog()
     
-    if not bremen:
+    if 'Hochschule für Künste Bremen' not in catalog.index:
         print("❌ Bremen not found in dataset")
         return
+    bremen = catalog.row('Hochschule für Künste Bremen')
     
-    print(f"✅ Found Bremen: {bremen['city']}, {bremen['state']}")
-    print(f"   - Type: {bremen['type']}")
-    print(f"   - Ranking: {bremen['ranking']['national']}")
-    print(f"   - Students: {bremen['stats']['students']}")
-    print(f"   - Acceptance Rate: {bremen['stats']['acceptance_rate']}")
+    print(f"✅ Found Bremen: {bremen.city}, {bremen.state}")
+    print(f"   - Type: {bremen.type}")
+    print(f"   - Ranking: {bremen.ranking}")
+    print(f"   - Students: {bremen.students}")
+    print(f"   - Acceptance Rate: {bremen.acceptance_rate}")
     print()
     
-    # Calculate similarities for 3D clustering
+    # Calculate similarities for 3D clustering in one vectorized pass
+    engine = SimilarityEngine(catalog, profiles=('3d-clustering',))
+    profile = get_profile('3d-clustering')
+    anchor = engine.rows(['Hochschule für Künste Bremen'])
+    terms = {key: values[0] for key, values in engine.terms(anchor).items()}
+    contributions = {key: values[0] for key, values in engine.contributions(anchor).items()}
+    scores = engine.block(anchor)[0]
+    
     similarities = []
     
-    for name, uni in unis.items():
+    for j in np.flatnonzero(profile.passes(scores)):  # Minimum threshold for 3D clustering
+        name = engine.catalog.names[j]
         if name == 'Hochschule für Künste Bremen':
             continue
-            
-        similarity = 0
+        uni = catalog.row(j)
         details = []
         
-        # 1. Type similarity (weight: 2.0)
-        if bremen['type'] == uni['type']:
-            similarity += 2.0
-            details.append("Same type (+2.0)")
+        # 1. Type similarity
+        if contributions['type'][j]:
+            details.append(f"Same type (+{contributions['type'][j]:.1f})")
         
-        # 2. Program overlap (weight: 3.0)
-        bremen_programs = set(p.get('name', '') for p in bremen.get('programs', []))
-        uni_programs = set(p.get('name', '') for p in uni.get('programs', []))
-        shared = len(bremen_programs.intersection(uni_programs))
+        # 2. Program overlap
+        shared = int(terms['shared_programs'][j])
         if shared > 0:
-            similarity += shared * 3.0
-            details.append(f"Shared programs: {shared} (+{shared * 3.0})")
-        
-        # 3. Specialization overlap (weight: 4.0)
-        bremen_spec = []
-        for p in bremen.get('programs', []):
-            bremen_spec.extend(p.get('specializations', []))
-        
-        uni_spec = []
-        for p in uni.get('programs', []):
-            uni_spec.extend(p.get('specializations', []))
+            details.append(f"Shared programs: {shared} (+{contributions['programs'][j]})")
         
-        shared_spec = len(set(bremen_spec).intersection(set(uni_spec)))
+        # 3. Specialization overlap
+        shared_spec = int(terms['shared_specializations'][j])
         if shared_spec > 0:
-            similarity += shared_spec * 4.0
-            details.append(f"Shared specializations: {shared_spec} (+{shared_spec * 4.0})")
+            details.append(f"Shared specializations: {shared_spec} (+{contributions['specializations'][j]})")
         
-        # 4. Ranking proximity (weight: 1.5)
-        if bremen['ranking'].get('national') and uni['ranking'].get('national'):
-            rank_diff = abs(bremen['ranking']['national'] - uni['ranking']['national'])
-            if rank_diff <= 10:
-                rank_bonus = (10 - rank_diff) * 0.15
-                similarity += rank_bonus
-                details.append(f"Ranking proximity: {rank_diff} (+{rank_bonus:.2f})")
+        # 4. Ranking proximity
+        if terms['ranking_diff'][j] <= profile.ranking_window:
+            details.append(f"Ranking proximity: {int(terms['ranking_diff'][j])} (+{contributions['ranking'][j]:.2f})")
         
-        # 5. Stats similarity (weight: 1.0)
-        if bremen['stats'].get('students') and uni['stats'].get('students'):
-            student_ratio = min(bremen['stats']['students'], uni['stats']['students']) / max(bremen['stats']['students'], uni['stats']['students'])
-            if student_ratio > 0.5:
-                similarity += student_ratio
-                details.append(f"Student count similarity: {student_ratio:.2f} (+{student_ratio:.2f})")
+        # 5. Stats similarity
+        if contributions['students'][j]:
+            details.append(f"Student count similarity: {terms['student_ratio'][j]:.2f} (+{contributions['students'][j]:.2f})")
         
-        # 6. Acceptance rate similarity (weight: 1.0)
-        if bremen['stats'].get('acceptance_rate') and uni['stats'].get('acceptance_rate'):
-            rate_diff = abs(bremen['stats']['acceptance_rate'] - uni['stats']['acceptance_rate'])
-            if rate_diff < 0.2:
-                rate_bonus = (0.2 - rate_diff) * 5.0
-                similarity += rate_bonus
-                details.append(f"Acceptance rate similarity: {rate_diff:.3f} (+{rate_bonus:.2f})")
+        # 6. Acceptance rate similarity
+        if terms['acceptance_diff'][j] < profile.selectivity_window:
+            details.append(f"Acceptance rate similarity: {terms['acceptance_diff'][j]:.3f} (+{contributions['selectivity'][j]:.2f})")
         
-        # 7. Geographic proximity (weight: 1.0)
-        if (bremen['coordinates'].get('lat') and uni['coordinates'].get('lat') and
-            bremen['coordinates'].get('lng') and uni['coordinates'].get('lng')):
-            lat_diff = abs(bremen['coordinates']['lat'] - uni['coordinates']['lat'])
-            lng_diff = abs(bremen['coordinates']['lng'] - uni['coordinates']['lng'])
-            distance = (lat_diff ** 2 + lng_diff ** 2) ** 0.5
-            if distance < 5:
-                geo_bonus = (5 - distance) * 0.2
-                similarity += geo_bonus
-                details.append(f"Geographic proximity: {distance:.2f} (+{geo_bonus:.2f})")
+        # 7. Geographic proximity
+        if terms['distance'][j] < profile.geo_window:
+            details.append(f"Geographic proximity: {terms['distance'][j]:.0f} km (+{contributions['geography'][j]:.2f})")
         
-        if similarity >= 3.0:  # Minimum threshold for 3D clustering
-            similarities.append({
-                'name': name,
-                'similarity': similarity,
-                'details': details,
-                'type': uni['type'],
-                'city': uni['city']
-            })
+        similarities.append({
+            'name': name,
+            'similarity': float(scores[j]),
+            'details': details,
+            'type': uni.type,
+            'city': uni.city
+        })
     
-    # Sort by similarity
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
+    # Only the strongest matches are printed, so select them with a bounded heap
+    with span('clustering3d.rank', candidates=len(similarities)):
+        closest = heapq.nlargest(8, similarities, key=lambda x: x['similarity'])
     
     print("🎯 Universities that should be CLOSE to Bremen in 3D mode:")
     print("   (These should form a cluster around Bremen)")
     print()
     
-    for i, sim in enumerate(similarities[:8]):
+    for i, sim in enumerate(closest):
         print(f"{i+1:2d}. {sim['name']}")
         print(f"    Similarity: {sim['similarity']:.1f} | {sim['type']} | {sim['city']}")
         print(f"    Reasons: {', '.join(sim['details'])}")
         print()
     
     print(f"📊 Total universities that should cluster: {len(similarities)}")
-    print(f"📏 Similarity range: {similarities[-1]['similarity']:.1f} to {similarities[0]['similarity']:.1f}")
+    scores = [sim['similarity'] for sim in similarities]
+    print(f"📏 Similarity range: {min(scores):.1f} to {max(scores):.1f}")
     
-    return similarities
+    # Callers get every match, strongest first
+    return sorted(similarities, key=lambda x: x['similarity'], reverse=True)
 
 if __name__ == "__main__":
     test_bremen_connections() 
\ No newline at end of file
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Regression checks for the cached and incremental load paths
+
+Each check compares a shortcut against the plain dict / json.load path:
+incremental updates against a full rebuild, streamed entries against
+json.load at arbitrary chunk boundaries, and snapshot reuse against a fresh
+parse after the source file changes.
+"""
+
+import copy
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from analysis.catalog import DATA_PATH, Catalog
+from analysis.incremental import compute, record_fingerprint, school_keys, update
+from analysis.snapshot import _arrays, cached_catalog
+from analysis.stream import iter_items, iter_paths
+
+CHUNK_SIZES = (1, 2, 3, 7, 64, 4096)
+
+
+def _load_data():
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _source(data):
+    universities = data['universities']
+    return Catalog.from_data(data), [record_fingerprint(uni) for uni in universities.values()]
+
+
+def _with_universities(data, items):
+    data = dict(data)
+    data['universities'] = dict(items)
+    return data
+
+
+def _profile_view(state, profile):
+    """Results of one profile keyed by school, independent of row order"""
+    keys = state.keys
+    result = state.results[profile]
+    lo, hi, scores = result.edges
+    edges = {tuple(sorted((keys[a], keys[b]))): round(float(s), 9) for a, b, s in zip(lo, hi, scores)}
+    # A full list may break a tie at its last score either way: compare the
+    # scores, and the members strictly above that cut-off
+    k = result.neighbors.shape[1]
+    neighbors = {}
+    for row, key in enumerate(keys):
+        found = result.neighbors[row] >= 0
+        scores = np.round(result.neighbor_scores[row][found], 9)
+        members = [keys[j] for j in result.neighbors[row][found]]
+        cutoff = scores.min() if len(scores) == k else -np.inf
+        neighbors[key] = (sorted(scores), sorted(m for m, s in zip(members, scores) if s > cutoff))
+    groups = {}
+    for key, label in zip(keys, result.clusters):
+        groups.setdefault(int(label), set()).add(key)
+    return edges, neighbors, sorted(sorted(group) for group in groups.values())
+
+
+def _assert_same_state(patched, rebuilt):
+    assert sorted(patched.keys) == sorted(rebuilt.keys)
+    for profile in rebuilt.profiles:
+        edges, neighbors, clusters = _profile_view(patched, profile)
+        expected_edges, expected_neighbors, expected_clusters = _profile_view(rebuilt, profile)
+        assert edges == expected_edges, f"{profile}: edges differ from a full rebuild"
+        assert neighbors == expected_neighbors, f"{profile}: neighbour lists differ from a full rebuild"
+        assert clusters == expected_clusters, f"{profile}: clusters differ from a full rebuild"
+
+
+def test_incremental_matches_rebuild():
+    """update() after add, edit, remove and reorder equals compute() on the new data"""
+    print("🧪 Incremental update vs full rebuild")
+    data = _load_data()
+    items = list(data['universities'].items())
+    base = _with_universities(data, items[:-1])
+
+    edited = copy.deepcopy(dict(items[:-1]))
+    name = items[3][0]
+    edited[name]['stats']['students'] = edited[name]['stats'].get('students', 0) * 3 + 100
+    edited[name]['ranking']['national'] = 1
+
+    scenarios = {
+        'add': _with_universities(data, items),
+        'edit': _with_universities(data, edited.items()),
+        'remove': _with_universities(data, items[:-1][:10] + items[:-1][11:]),
+        'reorder': _with_universities(data, reversed(items[:-1])),
+    }
+    state = compute(*_source(base))
+    for label, new_data in scenarios.items():
+        catalog, fingerprints = _source(new_data)
+        patched, changes = update(state, catalog, fingerprints)
+        assert not changes.full, f"{label}: expected an incremental update, got a full rebuild"
+        assert patched.keys == school_keys(catalog)
+        _assert_same_state(patched, compute(catalog, fingerprints))
+        print(f"   ✅ {label}: {changes!r}")
+
+
+def _sample_document():
+    """Small document with strings, escapes and nesting that straddle any chunk boundary"""
+    return {
+        'statistics': {'note': 'braces { } [ ] and "quotes" \\ backslash', 'total': 3},
+        'universities': {
+            'Kunsthochschule "A"': {'id': 'a', 'tags': ['x', {'y': [1, 2.5e-3, -7]}], 'ok': True},
+            'Hochschule für Künste': {'id': None, 'text': 'ümlaut é ☃ \n tab\t', 'empty': {}},
+            'C': {'id': 'c', 'list': [], 'nested': {'deep': {'deeper': [None, False]}}},
+        },
+        'relationships': {'academic_collaborations': [['a', 'c', 0.5], ['c', 'Hochschule für Künste', 1]]},
+    }
+
+
+def test_stream_matches_json_load():
+    """iter_paths/iter_items yield exactly the json.load entries at any chunk size"""
+    print("🧪 Streamed entries vs json.load")
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = os.path.join(tmp, 'sample.json')
+        with open(sample, 'w', encoding='utf-8') as f:
+            json.dump(_sample_document(), f, ensure_ascii=False, indent=1)
+
+        for path in (sample, DATA_PATH):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            universities = list(data['universities'].items())
+            collaborations = data.get('relationships', {}).get('academic_collaborations', [])
+            for chunk_size in CHUNK_SIZES:
+                assert list(iter_items(path, 'universities', chunk_size=chunk_size)) == universities
+                streamed = list(iter_paths(path, ('universities',), ('relationships', 'academic_collaborations'),
+                                           chunk_size=chunk_size))
+                assert [e for p, e in streamed if p == ('universities',)] == universities
+                assert [e for p, e in streamed if p != ('universities',)] == collaborations
+                assert list(iter_items(path, 'missing', 'path', chunk_size=chunk_size)) == []
+            print(f"   ✅ {os.path.basename(path)}: chunk sizes {', '.join(map(str, CHUNK_SIZES))}")
+
+
+def _assert_same_catalog(cached, fresh):
+    assert cached.names == fresh.names and cached.ids == fresh.ids
+    assert cached.categories == fresh.categories
+    expected = _arrays(fresh)
+    actual = _arrays(cached)
+    assert sorted(actual) == sorted(expected)
+    for stem, array in expected.items():
+        assert np.array_equal(np.asarray(actual[stem]), np.asarray(array), equal_nan=array.dtype.kind == 'f'), stem
+
+
+def test_snapshot_tracks_source_changes():
+    """cached_catalog() equals a fresh parse after the file changes size or only mtime"""
+    print("🧪 Snapshot invalidation vs fresh load")
+    data = _load_data()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'schools.json')
+        cache_dir = os.path.join(tmp, 'snapshots')
+
+        def write(document, mtime_ns):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+        def check(label):
+            with open(path, 'r', encoding='utf-8') as f:
+                fresh = Catalog.from_data(json.load(f))
+            _assert_same_catalog(cached_catalog(path, cache_dir), fresh)
+            print(f"   ✅ {label}")
+
+        write(data, 1_000_000_000_000_000_000)
+        check('first load builds the snapshot')
+        check('unchanged file reuses it')
+
+        grown = copy.deepcopy(data)
+        name = next(iter(grown['universities']))
+        grown['universities'][name]['city'] = 'Neustadt an der Weinstraße'
+        write(grown, 1_000_000_000_000_000_000)
+        check('size change with the same mtime')
+
+        # Same byte length, different content: only the mtime tells the versions apart
+        size = os.path.getsize(path)
+        same_size = copy.deepcopy(grown)
+        same_size['universities'][name]['stats']['students'] += 1  # 850 -> 851
+        write(same_size, 1_000_000_000_000_000_001)
+        assert os.path.getsize(path) == size
+        check('mtime change with the same size')
+
+
+if __name__ == "__main__":
+    test_incremental_matches_rebuild()
+    test_stream_matches_json_load()
+    test_snapshot_tracks_source_changes()
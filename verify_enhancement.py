@@ -3,8 +3,9 @@
 Verify Enhanced Dataset Integration in Visualizations
 """
 
-import json
-import os
+from analysis.catalog import DATA_PATH
+from analysis.schema import SchemaValidator, print_report
+from analysis.stream import iter_universities
 
 def main():
     print("🔍 Verifying Enhanced Dataset Integration")
@@ -12,24 +13,23 @@ def main():
     
     # 1. Check enhanced data
     try:
-        with open('src/data/enhanced_german_art_schools.json', 'r') as f:
-            data = json.load(f)
-        
-        unis = data['universities']
-        sample_uni = list(unis.values())[0]
+        # One streaming pass: every record goes through the compiled schema
+        # validator, which tallies problems and per-field coverage without
+        # holding the universities in memory
+        validator = SchemaValidator()
+        unis_with_data = 0
+        for name, uni in iter_universities(DATA_PATH):
+            validator.check(name, uni)
+            # Non-object records are reported by the validator, not fatal here
+            if isinstance(uni, dict) and uni.get('ranking') and uni.get('stats'):
+                unis_with_data += 1
+        total_unis = validator.records
         
         print("✅ Enhanced data loaded successfully")
-        print(f"   Universities: {len(unis)}")
-        print(f"   Sample university fields: {list(sample_uni.keys())}")
-        
-        # Check for key enhanced fields
-        has_ranking = 'ranking' in sample_uni
-        has_stats = 'stats' in sample_uni
-        has_coords = 'coordinates' in sample_uni
-        
-        print(f"   Has ranking: {has_ranking}")
-        print(f"   Has stats: {has_stats}")
-        print(f"   Has coordinates: {has_coords}")
+        print(f"   Universities: {total_unis}")
+        print_report(validator, top_level_only=True)
+        if validator.invalid:
+            print(f"⚠️  {validator.invalid} universities fail the schema (python -m analysis.schema for details)")
         
     except Exception as e:
         print(f"❌ Failed to load enhanced data: {e}")
@@ -117,9 +117,7 @@ def main():
     print("🎉 Verification Complete!")
     
     # Summary
-    total_unis = len(unis)
-    unis_with_data = sum(1 for uni in unis.values() if uni.get('ranking') and uni.get('stats'))
-    coverage = unis_with_data / total_unis * 100
+    coverage = unis_with_data / total_unis * 100 if total_unis else 0.0
     
     print(f"\n📈 Data Coverage: {coverage:.1f}% of universities have enhanced data")
     